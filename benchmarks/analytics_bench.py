@@ -0,0 +1,169 @@
+"""
+Analytics benchmark suite.
+Times and memory-profiles each core.logic.analytics function on synthetic
+rosters and appends the results to a JSON Lines file for tracking over time.
+
+Usage:
+    python -m benchmarks.analytics_bench
+    python -m benchmarks.analytics_bench --sizes 1000 100000 --repeat 3
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from core.logic.analytics import (
+    calculate_class_statistics,
+    get_subject_performance,
+    get_grade_performance,
+    get_top_students,
+    get_struggling_students,
+    get_behavior_distribution,
+    get_teacher_performance,
+)
+from benchmarks.synthetic_roster import generate_roster
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "analytics.jsonl")
+
+BENCHMARKS = {
+    "calculate_class_statistics": calculate_class_statistics,
+    "get_subject_performance": get_subject_performance,
+    "get_grade_performance": get_grade_performance,
+    "get_top_students": get_top_students,
+    "get_struggling_students": get_struggling_students,
+    "get_behavior_distribution": get_behavior_distribution,
+    "get_teacher_performance": get_teacher_performance,
+}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_environment():
+    """Describe the machine and versions a benchmark run used."""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def time_function(func, df, repeat):
+    """
+    Time a function on a DataFrame.
+
+    Returns:
+        list[float]: Wall-clock seconds for each run
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_memory(func, df):
+    """
+    Measure the peak Python heap allocated during one call.
+
+    Returns:
+        float: Peak allocation in MiB (tracemalloc sees numpy/pandas buffers too)
+    """
+    tracemalloc.start()
+    try:
+        func(df)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def run_benchmarks(sizes=None, repeat=5, seed=42, functions=None):
+    """
+    Benchmark each analytics function at each roster size.
+
+    Args:
+        sizes (list[int]): Roster sizes in rows (default: 1k, 100k, 1M)
+        repeat (int): Timed runs per function and size
+        seed (int): Seed for the synthetic roster
+        functions (list[str]): Subset of function names to run (default: all)
+
+    Returns:
+        list[dict]: One result record per (function, size)
+    """
+    sizes = sizes or DEFAULT_SIZES
+    names = functions or list(BENCHMARKS)
+    environment = run_environment()
+    results = []
+
+    for rows in sizes:
+        df = generate_roster(rows=rows, seed=seed)
+        for name in names:
+            func = BENCHMARKS[name]
+            # Warm-up run so imports and lazy initialization don't skew timings
+            func(df)
+            timings = time_function(func, df, repeat)
+            results.append({
+                **environment,
+                "function": name,
+                "rows": rows,
+                "repeat": repeat,
+                "best_s": min(timings),
+                "median_s": statistics.median(timings),
+                "peak_mib": peak_memory(func, df),
+            })
+            print(
+                f"{name:<28} {rows:>9,} rows  best {min(timings) * 1000:9.2f} ms  "
+                f"median {statistics.median(timings) * 1000:9.2f} ms  peak {results[-1]['peak_mib']:8.1f} MiB"
+            )
+    return results
+
+
+def write_results(results, output):
+    """Append result records to a JSON Lines file."""
+    output_dir = os.path.dirname(output)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    with open(output, "a", encoding="utf-8") as f:
+        for record in results:
+            f.write(json.dumps(record) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark core.logic.analytics on synthetic rosters")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Roster sizes in rows")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per function and size")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic roster")
+    parser.add_argument("--function", action="append", choices=sorted(BENCHMARKS), help="Only run this function (repeatable)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON Lines file to append results to")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, repeat=args.repeat, seed=args.seed, functions=args.function)
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Import-time budget check for the dashboard's cold start.
+Imports the project modules dashboard.py loads at module level in a fresh
+interpreter and fails if they take longer than the budget or drag in a
+heavy dependency that should only load with the page that needs it.
+
+Usage:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 150 --repeat 5 --verbose
+
+Exits with status 1 when the budget is exceeded, so it can gate CI.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(PROJECT_ROOT, "dashboard.py")
+
+# Loaded lazily by the pages that use them; none of these may appear at cold start
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "gspread",
+    "google.genai",
+    "google.oauth2",
+    "core.logic.analytics",
+    "core.logic.lesson_generator",
+    "core.logic.report_generator",
+    "core.logic.parent_writer",
+    "integrations.google_sheets",
+]
+
+# Streamlit (and dotenv, which config.settings needs) are imported by every
+# page render regardless, so they're loaded before the clock starts
+BASELINE_MODULES = ["streamlit", "dotenv"]
+
+DEFAULT_BUDGET_MS = 250
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+for name in {baseline!r}:
+    try:
+        __import__(name)
+    except ImportError:
+        pass
+before = set(sys.modules)
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+loaded = sorted(set(sys.modules) - before)
+print(json.dumps({{"elapsed_ms": elapsed * 1000, "loaded": loaded}}))
+"""
+
+
+def dashboard_imports(path: str = DASHBOARD) -> list:
+    """
+    Project modules imported at the top level of dashboard.py.
+
+    Imports inside functions and page branches are ignored: they only run
+    when that page (or helper) is used.
+
+    Returns:
+        list: Module names, in import order
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            top = name.split('.')[0]
+            if os.path.isdir(os.path.join(PROJECT_ROOT, top)) and name not in modules:
+                modules.append(name)
+    return modules
+
+
+def probe(modules: list) -> dict:
+    """Import modules in a fresh interpreter and report time and newly loaded modules."""
+    code = _PROBE.format(root=PROJECT_ROOT, baseline=BASELINE_MODULES, modules=modules)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=PROJECT_ROOT
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{output.stderr.strip()}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(modules: list, top: int = 10) -> list:
+    """Top cumulative import times (ms) from python -X importtime."""
+    code = f"import sys; sys.path.insert(0, {PROJECT_ROOT!r})\n" + "\n".join(
+        f"import {name}" for name in modules
+    )
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=PROJECT_ROOT
+    )
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check the dashboard's cold-start import budget")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum median import time in milliseconds (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh-interpreter runs to take the median of")
+    parser.add_argument("--modules", nargs="+", help="Modules to check (default: dashboard.py's top-level imports)")
+    parser.add_argument("--verbose", action="store_true", help="Show the slowest imports")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or dashboard_imports()
+    runs = [probe(modules) for _ in range(max(1, args.repeat))]
+    median_ms = statistics.median(run['elapsed_ms'] for run in runs)
+    heavy = [name for name in HEAVY_MODULES if name in runs[0]['loaded']]
+
+    print(f"Modules: {', '.join(modules)}")
+    print(f"Median import time: {median_ms:.1f} ms (budget {args.budget_ms:.0f} ms, {len(runs)} runs)")
+    if args.verbose:
+        for elapsed, name in slowest_imports(modules):
+            print(f"  {elapsed:8.1f} ms  {name}")
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time over budget by {median_ms - args.budget_ms:.1f} ms")
+        failed = True
+    if heavy:
+        print(f"FAIL: heavy modules loaded at cold start: {', '.join(heavy)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Deterministic synthetic roster generator.
+Builds Students-sheet shaped DataFrames of any size for benchmarks, with the
+kind of messy Score values real sheets contain.
+"""
+
+import numpy as np
+import pandas as pd
+
+SUBJECTS = [
+    "Math", "Reading", "Writing", "Science", "Social Studies",
+    "Art", "Music", "Physical Education", "Spelling", "Geography",
+]
+BEHAVIORS = ["Excellent", "Good", "Fair", "Needs Improvement"]
+NOTES = [
+    "Strong understanding of core concepts.",
+    "Needs help with word problems.",
+    "Reading above grade level.",
+    "Enjoys hands-on experiments.",
+    "Good progress this term.",
+    "Needs reminders to stay on task.",
+]
+# Non-numeric values seen in hand-maintained sheets
+MESSY_SCORES = np.array(["", "N/A", "absent", "TBD", "-"], dtype=object)
+
+
+def generate_roster(
+    rows=1000,
+    students=None,
+    subjects=8,
+    teachers=10,
+    grades=6,
+    messy_fraction=0.05,
+    seed=42,
+):
+    """
+    Generate a synthetic student roster.
+
+    Every student has a fixed grade and teacher; each row is one subject
+    record. The same arguments always produce the same DataFrame.
+
+    Args:
+        rows (int): Number of subject records
+        students (int): Number of distinct students (default: rows / subjects)
+        subjects (int): Number of distinct subjects
+        teachers (int): Number of distinct teachers
+        grades (int): Number of grade levels
+        messy_fraction (float): Share of Score cells that are messy strings
+            (padded, decimal, percent-suffixed or non-numeric)
+        seed (int): Random seed
+
+    Returns:
+        pd.DataFrame: Columns Name, Grade, Teacher, Subject, Score, Notes, Behavior
+    """
+    rng = np.random.default_rng(seed)
+    students = students or max(1, rows // max(1, subjects))
+    subject_names = np.array(
+        [SUBJECTS[i] if i < len(SUBJECTS) else f"Subject {i + 1}" for i in range(subjects)],
+        dtype=object,
+    )
+
+    student_ids = rng.integers(0, students, size=rows)
+    student_grades = rng.integers(1, grades + 1, size=students)
+    student_teachers = rng.integers(1, teachers + 1, size=students)
+
+    names = pd.Series(student_ids).map("Student {:06d}".format).to_numpy(dtype=object)
+    grade_labels = pd.Series(student_grades[student_ids]).map("Grade {}".format).to_numpy(dtype=object)
+    teacher_labels = pd.Series(student_teachers[student_ids]).map("Teacher {:03d}".format).to_numpy(dtype=object)
+
+    # Clean scores arrive from Sheets as ints
+    clean = np.clip(rng.normal(75, 12, size=rows), 0, 100).round().astype(int)
+    scores = clean.astype(object)
+
+    messy = rng.random(size=rows) < messy_fraction
+    kinds = rng.integers(0, 4, size=rows)
+    padded = messy & (kinds == 0)
+    decimal = messy & (kinds == 1)
+    percent = messy & (kinds == 2)
+    missing = messy & (kinds == 3)
+    scores[padded] = [f" {score} " for score in clean[padded]]
+    scores[decimal] = [f"{score}.5" for score in np.clip(clean[decimal], 0, 99)]
+    scores[percent] = [f"{score}%" for score in clean[percent]]
+    scores[missing] = rng.choice(MESSY_SCORES, size=int(missing.sum()))
+
+    return pd.DataFrame({
+        "Name": names,
+        "Grade": grade_labels,
+        "Teacher": teacher_labels,
+        "Subject": rng.choice(subject_names, size=rows),
+        "Score": scores,
+        "Notes": rng.choice(np.array(NOTES, dtype=object), size=rows),
+        "Behavior": rng.choice(np.array(BEHAVIORS, dtype=object), size=rows),
+    })
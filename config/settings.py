@@ -2,49 +2,439 @@
 Environment configuration and API client setup.
 Centralizes all environment variables and credentials.
 Supports both local development and Streamlit Cloud deployment.
+
+Values are resolved once into a typed, validated Settings snapshot
+(Streamlit secrets first, then environment variables and .env). Modules
+keep reading them as settings.GOOGLE_MODEL etc. reload() re-reads the
+sources and swaps in a new snapshot atomically; it runs when .env or
+secrets.toml changes (start_watching) or on SIGHUP (install_reload_signal),
+so rate limits, model names and cache sizes can be tuned without a restart.
 """
 import os
-from dotenv import load_dotenv
+import signal
+import sys
+import threading
+import time
+import types
+import warnings
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union, get_type_hints
+
+from dotenv import dotenv_values, find_dotenv, load_dotenv
+
+ENV_FILE = find_dotenv() or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+SECRETS_FILES = (
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+)
+
+# Variables set by the real environment win over .env, on reload too
+_startup_env_keys = frozenset(os.environ)
 
 # Load environment variables from .env file (local development)
-load_dotenv()
+load_dotenv(ENV_FILE)
+_dotenv_keys = set(key for key in dotenv_values(ENV_FILE) if key not in _startup_env_keys)
 
-# Check if running on Streamlit Cloud
-def get_config_value(key, default=None):
-    """Get configuration from Streamlit secrets or environment variables."""
+
+class ConfigError(ValueError):
+    """Raised when configuration values are missing or invalid."""
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Resolved configuration. Field names are the environment variable / secret keys."""
+
+    # Google Gemini Configuration
+    GOOGLE_API_KEY: Optional[str] = field(default=None, repr=False)
+    GOOGLE_MODEL: str = "gemini-1.5-flash"
+    GOOGLE_TEMPERATURE: float = 0.7
+    GOOGLE_MAX_TOKENS: int = 1000
+    # Minimum seconds between model calls (15 keeps the free tier under its rate limit)
+    GOOGLE_MIN_CALL_INTERVAL: float = 15.0
+    # Estimated input tokens a report prompt may use; longer student notes are compacted (0 = no limit)
+    REPORT_PROMPT_TOKEN_BUDGET: int = 1500
+
+    # Google Sheets Configuration
+    # GOOGLE_SHEETS_CREDENTIALS is only needed for local development
+    # On Streamlit Cloud, service account info comes from secrets.gcp_service_account
+    GOOGLE_SHEETS_CREDENTIALS: Optional[str] = None
+    GOOGLE_SHEET_ID: Optional[str] = None
+    GCP_SERVICE_ACCOUNT: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    # Local write-ahead queue for rows written to the Reports tab
+    SHEETS_OUTBOX_DB: str = "data/outbox/sheet_writes.db"
+    # Seconds between background retries of queued sheet writes (0 disables them)
+    SHEETS_OUTBOX_REPLAY_INTERVAL: float = 60.0
+    # Give up on a queued write after this many failed attempts (0 retries forever)
+    SHEETS_OUTBOX_MAX_ATTEMPTS: int = 12
+
+    # Logging Configuration
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: str = "logs/app.log"
+    # "size" (rotate at LOG_MAX_BYTES), "time" (rotate at LOG_ROTATION_WHEN) or "none"
+    LOG_ROTATION: str = "size"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_ROTATION_WHEN: str = "midnight"
+    LOG_BACKUP_COUNT: int = 5
+    # "text" or "json" (one JSON object per line)
+    LOG_FORMAT: str = "text"
+
+    # Output Configuration
+    OUTPUT_DIR: str = "data/output"
+
+    # Output Archive Configuration
+    # Generated content is stored in an indexed SQLite archive instead of one .txt per generation
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_DB: str = "data/archive/outputs.db"
+    # Also write the legacy timestamped .txt files under OUTPUT_DIR
+    ARCHIVE_WRITE_FILES: bool = False
+    # Text compression: auto (zstd if the zstandard package is installed, else zlib), zstd, zlib or none
+    ARCHIVE_COMPRESSION: str = "auto"
+    # Remove outputs older than this many days (0 keeps everything)
+    ARCHIVE_RETENTION_DAYS: float = 0.0
+    # Seconds between background compaction/retention passes (0 disables them)
+    ARCHIVE_MAINTENANCE_INTERVAL: float = 3600.0
+
+    # Data Cache Configuration
+    # Seconds a loaded roster stays fresh
+    DATA_CACHE_TTL: float = 300.0
+    # Minimum seconds between manual refreshes of the same source
+    REFRESH_COOLDOWN_SECONDS: float = 30.0
+
+    # Startup Warm-up Configuration
+    # Prefetch the roster, prime caches and create clients when the process starts
+    WARMUP_ENABLED: bool = True
+    # Steps to run, in order: prompts, sheets, roster, analytics, model
+    WARMUP_STEPS: str = "prompts,sheets,roster,analytics,model"
+
+    # Metrics Configuration
+    # Prometheus text format served at http://METRICS_HOST:METRICS_PORT/metrics (port 0 disables it)
+    METRICS_PORT: int = 9108
+    METRICS_HOST: str = "127.0.0.1"
+
+    # Profiling Configuration
+    # Profile a sampled fraction of dashboard reruns (also switchable from the Admin page)
+    PROFILING_ENABLED: bool = False
+    # Fraction of reruns to profile while enabled (0-1)
+    PROFILING_SAMPLE_RATE: float = 0.05
+    # Milliseconds between stack samples
+    PROFILING_INTERVAL_MS: float = 5.0
+    # Stop sampling a session after this many seconds
+    PROFILING_MAX_SECONDS: float = 120.0
+    PROFILING_DIR: str = "data/profiles"
+
+    # Student View Configuration
+    # Ceiling on table rows / expanders rendered per page
+    MAX_RENDER_ROWS: int = 250
+    # Maximum names offered in a student selectbox (search narrows the rest)
+    MAX_SELECT_OPTIONS: int = 200
+
+    # Background Jobs Configuration
+    # Worker threads running queued generation jobs
+    JOB_WORKERS: int = 2
+
+    # Analytics Configuration
+    # Rows per batch when streaming history from disk (bounds peak memory)
+    ANALYTICS_CHUNK_ROWS: int = 50000
+    # Worker processes for partitioned analytics (0 = one per CPU core)
+    ANALYTICS_MAX_WORKERS: int = 0
+    # Maximum number of cached analytics results kept in memory
+    ANALYTICS_CACHE_SIZE: int = 256
+
+    # Score History Configuration
+    # Snapshot every roster sync into a local store for term-over-term trends
+    SCORE_HISTORY_ENABLED: bool = False
+    SCORE_HISTORY_DB: str = "data/history/scores.db"
+    # Term assigned to synced records that have no Term column
+    CURRENT_TERM: str = "Term 1"
+
+    # Configuration Reload
+    # Seconds between checks of .env / secrets.toml for changes (0 disables watching)
+    CONFIG_RELOAD_INTERVAL: float = 5.0
+
+    @property
+    def sheets_configured(self) -> bool:
+        """True if a sheet ID and service account credentials (secrets or local file) are set."""
+        return bool(self.GOOGLE_SHEET_ID and (self.GCP_SERVICE_ACCOUNT or self.GOOGLE_SHEETS_CREDENTIALS))
+
+
+_TYPES = get_type_hints(Settings)
+FIELD_NAMES = frozenset(f.name for f in fields(Settings))
+# Only read from Streamlit secrets, under their lower-case TOML table names
+_SECRET_ONLY = {'GCP_SERVICE_ACCOUNT': 'gcp_service_account'}
+
+
+def _plain(value: Any) -> Any:
+    """Copy Streamlit's AttrDict sections into plain dicts."""
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def _read_secrets() -> Dict[str, Any]:
+    """Read every Streamlit secret once (empty outside Streamlit or without secrets.toml)."""
     try:
         import streamlit as st
-        if hasattr(st, 'secrets') and key in st.secrets:
-            return st.secrets[key]
-    except (ImportError, AttributeError, FileNotFoundError):
-        pass
-    return os.getenv(key, default)
-
-# Google Gemini Configuration
-GOOGLE_API_KEY = get_config_value("GOOGLE_API_KEY")
-GOOGLE_MODEL = get_config_value("GOOGLE_MODEL", "gemini-1.5-flash")
-GOOGLE_TEMPERATURE = float(get_config_value("GOOGLE_TEMPERATURE", "0.7"))
-GOOGLE_MAX_TOKENS = int(get_config_value("GOOGLE_MAX_TOKENS", "1000"))
-
-# Google Sheets Configuration
-# GOOGLE_SHEETS_CREDENTIALS is only needed for local development
-# On Streamlit Cloud, service account info comes from secrets.gcp_service_account
-GOOGLE_SHEETS_CREDENTIALS = get_config_value("GOOGLE_SHEETS_CREDENTIALS")
-GOOGLE_SHEET_ID = get_config_value("GOOGLE_SHEET_ID")
-
-# Logging Configuration
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-LOG_FILE = os.getenv("LOG_FILE", "logs/app.log")
-
-# Output Configuration
-OUTPUT_DIR = os.getenv("OUTPUT_DIR", "data/output")
+        secrets = st.secrets
+        return {key: _plain(secrets[key]) for key in secrets}
+    except Exception:
+        # ImportError, no secrets file, or a malformed one
+        return {}
+
+
+def _refresh_dotenv() -> None:
+    """Apply the current .env to os.environ, without touching variables set by the real environment."""
+    values = {key: value for key, value in dotenv_values(ENV_FILE).items()
+              if key not in _startup_env_keys and value is not None}
+    for key in _dotenv_keys - set(values):
+        os.environ.pop(key, None)
+    os.environ.update(values)
+    _dotenv_keys.clear()
+    _dotenv_keys.update(values)
+
+
+def _convert(name: str, raw: Any, kind: Any) -> Any:
+    if getattr(kind, '__origin__', None) is Union:
+        if raw is None or raw == "":
+            return None
+        kind = next(arg for arg in kind.__args__ if arg is not type(None))
+    if kind is bool:
+        return str(raw).lower() in ("1", "true", "yes")
+    if kind in (int, float):
+        try:
+            return kind(raw)
+        except (TypeError, ValueError):
+            raise ConfigError(f"{name} must be a{'n integer' if kind is int else ' number'}, got {raw!r}")
+    if getattr(kind, '__origin__', None) is dict:
+        if not isinstance(raw, Mapping):
+            raise ConfigError(f"{name} must be a table of values")
+        return dict(raw)
+    return str(raw)
+
+
+def _validate(config: Settings) -> None:
+    problems = []
+
+    def check(ok: bool, message: str):
+        if not ok:
+            problems.append(message)
+
+    check(0 <= config.GOOGLE_TEMPERATURE <= 2, "GOOGLE_TEMPERATURE must be between 0 and 2")
+    check(config.GOOGLE_MAX_TOKENS > 0, "GOOGLE_MAX_TOKENS must be positive")
+    check(config.REPORT_PROMPT_TOKEN_BUDGET >= 0, "REPORT_PROMPT_TOKEN_BUDGET must be 0 or more")
+    check(config.LOG_ROTATION in ("size", "time", "none"), "LOG_ROTATION must be size, time or none")
+    check(config.LOG_FORMAT in ("text", "json"), "LOG_FORMAT must be text or json")
+    check(config.ARCHIVE_COMPRESSION.lower() in ("auto", "zstd", "zlib", "none"),
+          "ARCHIVE_COMPRESSION must be auto, zstd, zlib or none")
+    check(0 <= config.PROFILING_SAMPLE_RATE <= 1, "PROFILING_SAMPLE_RATE must be between 0 and 1")
+    check(config.PROFILING_INTERVAL_MS > 0, "PROFILING_INTERVAL_MS must be positive")
+    check(0 <= config.METRICS_PORT <= 65535, "METRICS_PORT must be a port number (0 disables the endpoint)")
+    check(config.JOB_WORKERS >= 1, "JOB_WORKERS must be at least 1")
+    check(config.ANALYTICS_CHUNK_ROWS > 0, "ANALYTICS_CHUNK_ROWS must be positive")
+    check(config.ANALYTICS_CACHE_SIZE > 0, "ANALYTICS_CACHE_SIZE must be positive")
+    for name in ("GOOGLE_MIN_CALL_INTERVAL", "ARCHIVE_RETENTION_DAYS", "ARCHIVE_MAINTENANCE_INTERVAL",
+                 "DATA_CACHE_TTL", "REFRESH_COOLDOWN_SECONDS", "PROFILING_MAX_SECONDS",
+                 "MAX_RENDER_ROWS", "MAX_SELECT_OPTIONS", "ANALYTICS_MAX_WORKERS", "CONFIG_RELOAD_INTERVAL",
+                 "SHEETS_OUTBOX_REPLAY_INTERVAL", "SHEETS_OUTBOX_MAX_ATTEMPTS"):
+        check(getattr(config, name) >= 0, f"{name} must be 0 or more")
+    if problems:
+        raise ConfigError("Invalid configuration: " + "; ".join(problems))
+
+
+def load_settings(environ: Optional[Mapping[str, str]] = None, secrets: Optional[Mapping[str, Any]] = None) -> Settings:
+    """
+    Resolve and validate every setting.
+
+    Args:
+        environ: Environment variables (default: os.environ)
+        secrets: Streamlit secrets (default: read st.secrets once)
+
+    Returns:
+        Settings: The resolved configuration
+
+    Raises:
+        ConfigError: If a value has the wrong type or is out of range
+    """
+    environ = os.environ if environ is None else environ
+    secrets = _read_secrets() if secrets is None else secrets
+    values = {}
+    for item in fields(Settings):
+        name = item.name
+        if name in _SECRET_ONLY:
+            raw = secrets.get(_SECRET_ONLY[name])
+        elif name in secrets:
+            raw = secrets[name]
+        else:
+            raw = environ.get(name)
+        if raw is not None:
+            values[name] = _convert(name, raw, _TYPES[name])
+    config = Settings(**values)
+    _validate(config)
+    return config
+
+
+_current = load_settings()
+# Values set in code (CLI flags, tests); they survive reloads
+_overrides: Dict[str, Any] = {}
+_reload_lock = threading.Lock()
+_listeners: List[Callable[[Settings, Settings], None]] = []
+_watcher = {'thread': None, 'mtimes': None}
+
+
+def get_settings() -> Settings:
+    """Current settings snapshot; hold on to it to read several values consistently."""
+    return _current
+
+
+def get_config_value(key, default=None):
+    """Get a resolved setting by name (None-valued settings return default)."""
+    value = getattr(_current, key, None)
+    return default if value is None else value
+
+
+def on_reload(callback: Callable[[Settings, Settings], None]) -> None:
+    """Call callback(old, new) after each reload or override that changed something."""
+    _listeners.append(callback)
+
+
+def _swap(new: Settings, message: str) -> None:
+    global _current
+    old, _current = _current, new
+    if old == new:
+        return
+    from utils.helpers import setup_logger
+    logger = setup_logger(__name__)
+    changed = sorted(name for name in FIELD_NAMES if getattr(old, name) != getattr(new, name))
+    logger.info(f"{message}: {', '.join(changed)}")
+    for callback in list(_listeners):
+        try:
+            callback(old, new)
+        except Exception as e:
+            logger.error(f"Configuration reload hook {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+
+def override(**values) -> Settings:
+    """
+    Set values in code (e.g. from CLI flags); they take precedence over the sources, across reloads.
+
+    Raises:
+        ConfigError: If a name is unknown or a value is invalid
+    """
+    unknown = set(values) - FIELD_NAMES
+    if unknown:
+        raise ConfigError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    with _reload_lock:
+        new = replace(_current, **values)
+        _validate(new)
+        _overrides.update(values)
+        _swap(new, "Settings overridden in code")
+    return new
+
+
+def reload() -> bool:
+    """
+    Re-read .env, the environment and Streamlit secrets and swap in the new settings.
+
+    An invalid configuration is logged and the current settings stay in place.
+
+    Returns:
+        bool: True if the new settings were applied
+    """
+    with _reload_lock:
+        try:
+            _refresh_dotenv()
+            new = replace(load_settings(), **_overrides)
+            _validate(new)
+        except Exception as e:
+            from utils.helpers import setup_logger
+            setup_logger(__name__).error(f"Configuration not reloaded, keeping current settings: {e}")
+            return False
+        _swap(new, "Configuration reloaded; changed")
+        return True
+
+
+def _watched_mtimes() -> Dict[str, Optional[float]]:
+    mtimes = {}
+    for path in (ENV_FILE,) + SECRETS_FILES:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+def _watch() -> None:
+    while True:
+        interval = _current.CONFIG_RELOAD_INTERVAL
+        if interval <= 0:
+            _watcher['thread'] = None
+            return
+        time.sleep(interval)
+        mtimes = _watched_mtimes()
+        if mtimes != _watcher['mtimes']:
+            _watcher['mtimes'] = mtimes
+            reload()
+
+
+def start_watching() -> bool:
+    """
+    Reload whenever .env or secrets.toml changes, checking every CONFIG_RELOAD_INTERVAL seconds.
+
+    Returns:
+        bool: True if the watcher is running
+    """
+    if _current.CONFIG_RELOAD_INTERVAL <= 0:
+        return False
+    with _reload_lock:
+        if _watcher['thread'] is None:
+            _watcher['mtimes'] = _watched_mtimes()
+            _watcher['thread'] = threading.Thread(target=_watch, name="config-watcher", daemon=True)
+            _watcher['thread'].start()
+    return True
+
+
+def install_reload_signal() -> bool:
+    """
+    Reload on SIGHUP (e.g. `kill -HUP <pid>`).
+
+    Returns:
+        bool: False where signals can't be installed (Windows, or off the main thread)
+    """
+    if not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(target=reload, daemon=True).start())
+    except ValueError:
+        return False
+    return True
+
+
+def __getattr__(name):
+    if name in FIELD_NAMES:
+        return getattr(_current, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | FIELD_NAMES)
+
+
+class _SettingsModule(types.ModuleType):
+    """Routes `settings.NAME = value` through override(), so assignments keep working across reloads."""
+
+    def __setattr__(self, name, value):
+        if name in FIELD_NAMES:
+            override(**{name: value})
+        else:
+            super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _SettingsModule
 
 # Validate critical settings lazily: Gemini calls will check at runtime
 
 # Google Sheets validation - only check for SHEET_ID
 # Credentials can come from secrets (Streamlit Cloud) or local file
-if not GOOGLE_SHEET_ID:
-    import warnings
+if not _current.GOOGLE_SHEET_ID:
     warnings.warn(
         "Google Sheets integration not configured. "
         "You can still use lesson/report/parent message generators with manual input. "
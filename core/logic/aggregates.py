@@ -0,0 +1,315 @@
+"""
+Mergeable partial aggregates for student performance analytics.
+Lets the analytics functions run over data that arrives in batches
+(streamed from disk, or computed in separate processes).
+"""
+
+import pandas as pd
+from typing import Dict, Any
+
+from core.logic.analytics import (
+    _finish_subject_stats,
+    _finish_grade_stats,
+    _finish_top_students,
+    _finish_struggling_students,
+    _finish_teacher_stats,
+)
+
+# Columns the per-group analytics are keyed on
+GROUP_KEYS = ('Subject', 'Grade', 'Teacher')
+
+
+def _add_counts(left: pd.Series, right: pd.Series) -> pd.Series:
+    """Add two count Series, keeping the first-seen order of their index."""
+    if left.empty:
+        return right.copy()
+    if right.empty:
+        return left
+    order = left.index.append(right.index[~right.index.isin(left.index)])
+    return left.add(right, fill_value=0).reindex(order)
+
+
+def _median_by_group(counts: pd.Series) -> pd.Series:
+    """
+    Exact per-group median from a (group, score) -> count Series.
+
+    Matches pandas' median: the mean of the two middle values for even counts.
+    """
+    if counts.empty:
+        return pd.Series(dtype='float64')
+
+    frame = counts.sort_index().rename('count').reset_index()
+    frame.columns = ['key', 'score', 'count']
+    frame['upto'] = frame.groupby('key', sort=False)['count'].cumsum()
+    frame['before'] = frame['upto'] - frame['count']
+    total = frame.groupby('key', sort=False)['count'].transform('sum')
+
+    def value_at(position):
+        hit = (frame['before'] <= position) & (frame['upto'] > position)
+        return frame[hit].set_index('key')['score']
+
+    return (value_at((total - 1) // 2) + value_at(total // 2)) / 2
+
+
+class AnalyticsPartial:
+    """
+    Partial aggregates for the functions in core.logic.analytics.
+
+    Fold batches of records in with update() and combine partials built
+    elsewhere with merge(). Memory grows with the number of distinct
+    students, groups and score values, not with the number of records.
+    The finishing methods return the same results as the in-memory
+    functions run on all batches concatenated in order (up to floating
+    point rounding of averages).
+    """
+
+    def __init__(self):
+        self.columns = set()
+        self.total_records = 0
+        self.names = set()
+        self.subjects = set()
+        self.score_sum = 0.0
+        self.score_counts = pd.Series(dtype='float64')
+        self.group_sums = {}
+        self.group_score_counts = {}
+        self.group_names = {}
+        self.student_sums = pd.DataFrame(columns=['score_sum', 'score_count', 'subject_count'], dtype='float64')
+        self.student_grades = pd.Series(dtype=object)
+        self.behavior_counts = pd.Series(dtype='float64')
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'AnalyticsPartial':
+        """Build a partial from a single DataFrame."""
+        return cls().update(df)
+
+    def update(self, df: pd.DataFrame) -> 'AnalyticsPartial':
+        """
+        Fold a batch of student records into the aggregates.
+
+        Args:
+            df: DataFrame with student data (same columns as the Students sheet)
+
+        Returns:
+            self, for chaining
+        """
+        return self.merge(self._summarize(df))
+
+    @classmethod
+    def _summarize(cls, df: pd.DataFrame) -> 'AnalyticsPartial':
+        """Aggregate one batch with vectorized groupbys."""
+        part = cls()
+        part.columns = set(df.columns)
+        part.total_records = len(df)
+        if df.empty:
+            return part
+
+        df = df.copy()
+        if 'Score' in df.columns:
+            df['Score'] = pd.to_numeric(df['Score'], errors='coerce')
+        else:
+            df['Score'] = float('nan')
+        has_subject = 'Subject' in df.columns
+
+        if 'Name' in df.columns:
+            part.names = set(df['Name'].dropna().unique())
+        if has_subject:
+            part.subjects = set(df['Subject'].dropna().unique())
+
+        scores = df['Score'].dropna()
+        part.score_sum = float(scores.sum())
+        part.score_counts = scores.value_counts(sort=False).astype('float64')
+
+        for key in GROUP_KEYS:
+            if key not in df.columns:
+                continue
+            grouped = df.groupby(key)
+            sums = pd.DataFrame({
+                'score_sum': grouped['Score'].sum(),
+                'score_count': grouped['Score'].count(),
+                'subject_count': grouped['Subject'].count() if has_subject else 0,
+            }).astype('float64')
+            part.group_sums[key] = sums
+            part.group_score_counts[key] = (
+                df.dropna(subset=['Score']).groupby([key, 'Score']).size().astype('float64')
+            )
+            if 'Name' in df.columns:
+                part.group_names[key] = df[[key, 'Name']].dropna().drop_duplicates()
+
+        if 'Name' in df.columns:
+            grouped = df.groupby('Name')
+            part.student_sums = pd.DataFrame({
+                'score_sum': grouped['Score'].sum(),
+                'score_count': grouped['Score'].count(),
+                'subject_count': grouped['Subject'].count() if has_subject else 0,
+            }).astype('float64')
+            if 'Grade' in df.columns:
+                part.student_grades = grouped['Grade'].first()
+
+        if 'Behavior' in df.columns:
+            part.behavior_counts = df['Behavior'].value_counts(sort=False).astype('float64')
+
+        return part
+
+    def merge(self, other: 'AnalyticsPartial') -> 'AnalyticsPartial':
+        """
+        Combine another partial into this one.
+
+        Order matters only for "first" values (a student's Grade): records
+        in self are treated as coming before records in other.
+
+        Args:
+            other: Partial aggregates for a later batch
+
+        Returns:
+            self, for chaining
+        """
+        self.columns |= other.columns
+        self.total_records += other.total_records
+        self.names |= other.names
+        self.subjects |= other.subjects
+        self.score_sum += other.score_sum
+        self.score_counts = _add_counts(self.score_counts, other.score_counts)
+
+        for key, sums in other.group_sums.items():
+            mine = self.group_sums.get(key)
+            self.group_sums[key] = sums.copy() if mine is None else mine.add(sums, fill_value=0)
+        for key, counts in other.group_score_counts.items():
+            mine = self.group_score_counts.get(key)
+            self.group_score_counts[key] = counts.copy() if mine is None else mine.add(counts, fill_value=0)
+        for key, pairs in other.group_names.items():
+            mine = self.group_names.get(key)
+            self.group_names[key] = pairs.copy() if mine is None else (
+                pd.concat([mine, pairs], ignore_index=True).drop_duplicates()
+            )
+
+        if self.student_sums.empty:
+            self.student_sums = other.student_sums.copy()
+        elif not other.student_sums.empty:
+            self.student_sums = self.student_sums.add(other.student_sums, fill_value=0)
+        if self.student_grades.empty:
+            self.student_grades = other.student_grades.copy()
+        elif not other.student_grades.empty:
+            self.student_grades = self.student_grades.combine_first(other.student_grades)
+
+        self.behavior_counts = _add_counts(self.behavior_counts, other.behavior_counts)
+        return self
+
+    # ------------------------------------------------------------------
+    # Finishers: same shapes as the in-memory analytics functions
+    # ------------------------------------------------------------------
+
+    def _has(self, *columns) -> bool:
+        return self.total_records > 0 and all(column in self.columns for column in columns)
+
+    def _group_frame(self, key: str) -> pd.DataFrame:
+        """Per-group mean/median/min/max/count, sorted by group like groupby()."""
+        sums = self.group_sums[key].sort_index()
+        counts = self.group_score_counts[key].sort_index()
+        score_values = counts.index.get_level_values(1).to_series(index=counts.index)
+        frame = pd.DataFrame(index=sums.index)
+        frame['mean'] = sums['score_sum'] / sums['score_count'].where(sums['score_count'] > 0)
+        frame['median'] = _median_by_group(counts)
+        frame['min'] = score_values.groupby(level=0).min()
+        frame['max'] = score_values.groupby(level=0).max()
+        frame['count'] = sums['score_count'].astype('int64')
+        frame['subject_count'] = sums['subject_count'].astype('int64')
+        if key in self.group_names:
+            frame['unique_names'] = self.group_names[key].groupby(key).size()
+            frame['unique_names'] = frame['unique_names'].fillna(0).astype('int64')
+        frame.index.name = key
+        return frame
+
+    def _student_frame(self) -> pd.DataFrame:
+        sums = self.student_sums.sort_index()
+        frame = pd.DataFrame(index=sums.index)
+        frame['Score'] = sums['score_sum'] / sums['score_count'].where(sums['score_count'] > 0)
+        frame['Grade'] = self.student_grades.reindex(sums.index)
+        frame['Subject'] = sums['subject_count'].astype('int64')
+        frame.index.name = 'Name'
+        return frame
+
+    def class_statistics(self) -> Dict[str, Any]:
+        """Same as calculate_class_statistics()."""
+        if self.total_records == 0:
+            return {}
+
+        score_count = self.score_counts.sum()
+        if score_count:
+            counts = pd.concat({0: self.score_counts.sort_index()}, names=['key', 'score'])
+            average = self.score_sum / score_count
+            median = float(_median_by_group(counts).iloc[0])
+            highest = self.score_counts.index.max()
+            lowest = self.score_counts.index.min()
+        else:
+            average = median = highest = lowest = float('nan')
+
+        return {
+            'total_students': len(self.names) if 'Name' in self.columns else 0,
+            'total_records': self.total_records,
+            'average_score': average,
+            'median_score': median,
+            'highest_score': highest,
+            'lowest_score': lowest,
+            'total_subjects': len(self.subjects) if 'Subject' in self.columns else 0,
+        }
+
+    def subject_performance(self) -> pd.DataFrame:
+        """Same as get_subject_performance()."""
+        if not self._has('Subject', 'Score'):
+            return pd.DataFrame()
+        frame = self._group_frame('Subject')
+        return _finish_subject_stats(frame[['mean', 'median', 'min', 'max', 'count']])
+
+    def grade_performance(self) -> pd.DataFrame:
+        """Same as get_grade_performance()."""
+        if not self._has('Grade', 'Score'):
+            return pd.DataFrame()
+        frame = self._group_frame('Grade')
+        return _finish_grade_stats(frame[['mean', 'median', 'count', 'unique_names']])
+
+    def top_students(self, n: int = 5) -> pd.DataFrame:
+        """Same as get_top_students()."""
+        if not self._has('Name', 'Score'):
+            return pd.DataFrame()
+        return _finish_top_students(self._student_frame(), n)
+
+    def struggling_students(self, threshold: float = 60, n: int = 5) -> pd.DataFrame:
+        """Same as get_struggling_students()."""
+        if not self._has('Name', 'Score'):
+            return pd.DataFrame()
+        return _finish_struggling_students(self._student_frame(), threshold, n)
+
+    def behavior_distribution(self) -> Dict[str, int]:
+        """Same as get_behavior_distribution()."""
+        if not self._has('Behavior'):
+            return {}
+        counts = self.behavior_counts.astype('int64')
+        return counts.sort_values(ascending=False, kind='stable').to_dict()
+
+    def teacher_performance(self) -> pd.DataFrame:
+        """Same as get_teacher_performance()."""
+        if not self._has('Teacher', 'Score'):
+            return pd.DataFrame()
+        frame = self._group_frame('Teacher')
+        return _finish_teacher_stats(frame[['mean', 'median', 'unique_names', 'subject_count']])
+
+    def results(self, n: int = 5, threshold: float = 60) -> Dict[str, Any]:
+        """
+        Finish every analytic at once.
+
+        Args:
+            n: Number of top / struggling students to return
+            threshold: Score threshold for struggling students
+
+        Returns:
+            Dictionary keyed by analytic name
+        """
+        return {
+            'class_statistics': self.class_statistics(),
+            'subject_performance': self.subject_performance(),
+            'grade_performance': self.grade_performance(),
+            'top_students': self.top_students(n),
+            'struggling_students': self.struggling_students(threshold, n),
+            'behavior_distribution': self.behavior_distribution(),
+            'teacher_performance': self.teacher_performance(),
+        }
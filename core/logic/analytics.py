@@ -36,6 +36,36 @@ def calculate_class_statistics(df: pd.DataFrame) -> Dict[str, Any]:
     return stats
 
 
+def get_quick_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Headline numbers for the Home page, in one vectorized pass.
+    
+    Args:
+        df: DataFrame with student data
+        
+    Returns:
+        Dictionary with total_students (unique non-empty names),
+        average_score (over numeric scores, 0 if none) and total_subjects
+    """
+    def distinct(column: str) -> int:
+        if column not in df.columns:
+            return 0
+        values = df[column]
+        return values[values.notna() & (values.astype(str) != '')].nunique()
+    
+    average_score = 0.0
+    if 'Score' in df.columns:
+        scores = pd.to_numeric(df['Score'], errors='coerce')
+        if scores.notna().any():
+            average_score = float(scores.mean())
+    
+    return {
+        'total_students': distinct('Name'),
+        'average_score': average_score,
+        'total_subjects': distinct('Subject'),
+    }
+
+
 def get_subject_performance(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate average performance by subject.
@@ -55,8 +85,14 @@ def get_subject_performance(df: pd.DataFrame) -> pd.DataFrame:
     
     subject_stats = df.groupby('Subject').agg({
         'Score': ['mean', 'median', 'min', 'max', 'count']
-    }).round(1)
+    })
     
+    return _finish_subject_stats(subject_stats)
+
+
+def _finish_subject_stats(subject_stats: pd.DataFrame) -> pd.DataFrame:
+    """Round, rename and sort grouped subject aggregates."""
+    subject_stats = subject_stats.round(1)
     subject_stats.columns = ['Average', 'Median', 'Min', 'Max', 'Students']
     subject_stats = subject_stats.reset_index()
     subject_stats = subject_stats.sort_values('Average', ascending=False)
@@ -84,8 +120,14 @@ def get_grade_performance(df: pd.DataFrame) -> pd.DataFrame:
     grade_stats = df.groupby('Grade').agg({
         'Score': ['mean', 'median', 'count'],
         'Name': 'nunique'
-    }).round(1)
+    })
     
+    return _finish_grade_stats(grade_stats)
+
+
+def _finish_grade_stats(grade_stats: pd.DataFrame) -> pd.DataFrame:
+    """Round, rename and sort grouped grade aggregates."""
+    grade_stats = grade_stats.round(1)
     grade_stats.columns = ['Average Score', 'Median Score', 'Total Records', 'Unique Students']
     grade_stats = grade_stats.reset_index()
     grade_stats = grade_stats.sort_values('Grade')
@@ -115,8 +157,14 @@ def get_top_students(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
         'Score': 'mean',
         'Grade': 'first',
         'Subject': 'count'
-    }).round(1)
+    })
     
+    return _finish_top_students(top_students, n)
+
+
+def _finish_top_students(top_students: pd.DataFrame, n: int) -> pd.DataFrame:
+    """Round, rename and rank per-student aggregates, best first."""
+    top_students = top_students.round(1)
     top_students.columns = ['Average Score', 'Grade', 'Subjects Taken']
     top_students = top_students.reset_index()
     top_students = top_students.sort_values('Average Score', ascending=False).head(n)
@@ -147,8 +195,14 @@ def get_struggling_students(df: pd.DataFrame, threshold: float = 60, n: int = 5)
         'Score': 'mean',
         'Grade': 'first',
         'Subject': 'count'
-    }).round(1)
+    })
     
+    return _finish_struggling_students(struggling, threshold, n)
+
+
+def _finish_struggling_students(struggling: pd.DataFrame, threshold: float, n: int) -> pd.DataFrame:
+    """Round, rename and filter per-student aggregates below the threshold."""
+    struggling = struggling.round(1)
     struggling.columns = ['Average Score', 'Grade', 'Subjects']
     struggling = struggling.reset_index()
     struggling = struggling[struggling['Average Score'] < threshold]
@@ -195,10 +249,86 @@ def get_teacher_performance(df: pd.DataFrame) -> pd.DataFrame:
         'Score': ['mean', 'median'],
         'Name': 'nunique',
         'Subject': 'count'
-    }).round(1)
+    })
     
+    return _finish_teacher_stats(teacher_stats)
+
+
+def _finish_teacher_stats(teacher_stats: pd.DataFrame) -> pd.DataFrame:
+    """Round, rename and sort grouped teacher aggregates."""
+    teacher_stats = teacher_stats.round(1)
     teacher_stats.columns = ['Average Score', 'Median Score', 'Students', 'Total Records']
     teacher_stats = teacher_stats.reset_index()
     teacher_stats = teacher_stats.sort_values('Average Score', ascending=False)
     
     return teacher_stats
+
+
+def get_student_summary(df: pd.DataFrame, max_subjects: int = 3) -> pd.DataFrame:
+    """
+    Summarize each student on one row.
+    
+    Vectorized replacement for per-group lambdas: Subject and Behavior are
+    converted to categorical codes so first-k subjects and the most common
+    behavior come from built-in groupby operations.
+    
+    Args:
+        df: DataFrame with student data
+        max_subjects: Number of subjects listed before "..." is appended
+        
+    Returns:
+        DataFrame with Name, Average Score (0 if no numeric scores), Subjects
+        (first subjects in sheet order) and Overall Behavior (most common,
+        ties broken alphabetically, 'N/A' if none), sorted by Name
+    """
+    columns = ['Name', 'Average Score', 'Subjects', 'Overall Behavior']
+    if df.empty or 'Name' not in df.columns:
+        return pd.DataFrame(columns=columns)
+    
+    df = df[df['Name'].notna()]
+    names = df['Name']
+    summary = pd.DataFrame(index=pd.Index(names.unique(), name='Name').sort_values())
+    
+    # Average Score
+    if 'Score' in df.columns:
+        scores = pd.to_numeric(df['Score'], errors='coerce')
+        summary['Average Score'] = scores.groupby(names).mean().reindex(summary.index).fillna(0).round(1)
+    else:
+        summary['Average Score'] = 0.0
+    
+    # First subjects per student, in the order they appear
+    summary['Subjects'] = ''
+    if 'Subject' in df.columns:
+        pairs = pd.DataFrame({
+            'Name': names,
+            'Subject': pd.Categorical(df['Subject'].astype(str).where(df['Subject'].notna()))
+        }).dropna().drop_duplicates()
+        rank = pairs.groupby('Name', sort=False).cumcount()
+        subject_counts = pairs.groupby('Name', sort=False).size()
+        listed = pairs[rank < max_subjects].assign(rank=rank)
+        wide = listed.pivot(index='Name', columns='rank', values='Subject')
+        joined = wide[0].astype(str)
+        for position in range(1, wide.shape[1]):
+            following = wide[position]
+            joined = joined.where(following.isna(), joined + ', ' + following.astype(str))
+        joined = joined.where(subject_counts.reindex(joined.index) <= max_subjects, joined + '...')
+        summary['Subjects'] = joined.reindex(summary.index).fillna('')
+    
+    # Most common behavior; categories are sorted, so the smallest code wins ties
+    summary['Overall Behavior'] = 'N/A'
+    if 'Behavior' in df.columns:
+        behaviors = pd.Categorical(df['Behavior'])
+        counts = (
+            pd.DataFrame({'Name': names, 'code': behaviors.codes})
+            .query('code >= 0')
+            .groupby(['Name', 'code'], sort=False)
+            .size()
+            .rename('count')
+            .reset_index()
+        )
+        counts = counts.sort_values(['Name', 'count', 'code'], ascending=[True, False, True], kind='stable')
+        mode = counts.drop_duplicates('Name').set_index('Name')['code']
+        modes = pd.Series(behaviors.categories.take(mode.to_numpy()), index=mode.index)
+        summary['Overall Behavior'] = modes.reindex(summary.index).fillna('N/A')
+    
+    return summary.reset_index()[columns]
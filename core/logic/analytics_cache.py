@@ -0,0 +1,171 @@
+"""
+Fingerprint-keyed result cache for the analytics functions.
+Results are keyed by a content hash of the input frame plus the call
+parameters, so reruns that don't change the data are served from memory.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from config import settings
+from utils.cache import CACHE_REQUESTS
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Compute a cheap content fingerprint of a DataFrame.
+
+    Hashes the column names, shape and a vectorized per-row hash of the
+    values, so any edit to the data produces a different fingerprint.
+
+    Args:
+        df: DataFrame to fingerprint
+
+    Returns:
+        str: Hex digest identifying the frame's contents
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((list(df.columns), df.shape)).encode("utf-8"))
+    if not df.empty:
+        hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return hasher.hexdigest()
+
+
+def _copy_result(result: Any) -> Any:
+    """Return a copy so callers can't mutate cached values."""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+class AnalyticsCache:
+    """
+    Bounded LRU cache of analytics results.
+
+    Entries are keyed by (function, frame fingerprint, parameters). When the
+    data changes its fingerprint changes too, so stale entries are never
+    returned; they simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        func: Callable,
+        df: pd.DataFrame,
+        fingerprint: Optional[str] = None,
+        teacher: Optional[str] = None,
+        **params,
+    ) -> Any:
+        """
+        Return func(df, **params), computing it only on a cache miss.
+
+        Args:
+            func: Analytics function (e.g. get_top_students)
+            df: Full (unfiltered) DataFrame with student data
+            fingerprint: Precomputed frame_fingerprint(df), if known
+            teacher: Restrict to this teacher's records before computing (optional)
+            **params: Extra arguments for func (e.g. n, threshold)
+
+        Returns:
+            A copy of the (possibly cached) result
+        """
+        fingerprint = fingerprint or frame_fingerprint(df)
+        key = (func.__module__, func.__qualname__, fingerprint, teacher, tuple(sorted(params.items())))
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.inc(region="analytics", result="hit")
+                return _copy_result(self._entries[key])
+            self.misses += 1
+            CACHE_REQUESTS.inc(region="analytics", result="miss")
+
+        if teacher and 'Teacher' in df.columns:
+            df = df[df['Teacher'] == teacher]
+        result = func(df, **params)
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return _copy_result(result)
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> None:
+        """
+        Drop cached results.
+
+        Args:
+            fingerprint: Only drop results for this frame (default: drop everything)
+        """
+        with self._lock:
+            if fingerprint is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[2] == fingerprint]:
+                del self._entries[key]
+
+    def info(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+# Process-wide cache shared by every dashboard session
+_cache = AnalyticsCache(max_entries=settings.ANALYTICS_CACHE_SIZE)
+
+
+def _apply_settings(old, new):
+    # A smaller limit takes effect as new results are cached
+    _cache.max_entries = new.ANALYTICS_CACHE_SIZE
+
+
+settings.on_reload(_apply_settings)
+
+
+def cached_analytics(
+    func: Callable,
+    df: pd.DataFrame,
+    fingerprint: Optional[str] = None,
+    teacher: Optional[str] = None,
+    **params,
+) -> Any:
+    """
+    Call an analytics function through the shared result cache.
+
+    Args:
+        func: Analytics function (e.g. calculate_class_statistics)
+        df: Full (unfiltered) DataFrame with student data
+        fingerprint: Precomputed frame_fingerprint(df), if known
+        teacher: Restrict to this teacher's records (None or "All Teachers" for everyone)
+        **params: Extra arguments for func (e.g. n, threshold)
+
+    Returns:
+        The function's result
+    """
+    if teacher == "All Teachers":
+        teacher = None
+    return _cache.get_or_compute(func, df, fingerprint=fingerprint, teacher=teacher, **params)
+
+
+def get_analytics_cache() -> AnalyticsCache:
+    """Return the process-wide analytics cache."""
+    return _cache
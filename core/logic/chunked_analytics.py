@@ -0,0 +1,149 @@
+"""
+Out-of-core analytics over multi-year student history.
+Streams records from CSV, Parquet or SQLite files in bounded-size batches
+and merges partial aggregates, so memory stays flat as history grows.
+"""
+
+import os
+import sqlite3
+import pandas as pd
+from typing import Dict, Any, Iterable, Iterator, Optional, Union
+
+from config import settings
+from core.logic.aggregates import AnalyticsPartial
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+CSV_EXTENSIONS = ('.csv',)
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+Source = Union[str, os.PathLike]
+
+
+def _iter_csv(path: Source, chunksize: int) -> Iterator[pd.DataFrame]:
+    # Read every column as text (blank cells as ''), like get_all_records()
+    with pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def _iter_parquet(path: Source, chunksize: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet history requires pyarrow. Install it with: pip install pyarrow")
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def _iter_sqlite(path: Source, chunksize: int, table: str, query: Optional[str]) -> Iterator[pd.DataFrame]:
+    query = query or f'SELECT * FROM "{table}"'
+    conn = sqlite3.connect(path)
+    try:
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunksize):
+            yield chunk
+    finally:
+        conn.close()
+
+
+def iter_record_chunks(
+    sources: Union[Source, Iterable[Source]],
+    chunksize: Optional[int] = None,
+    table: str = "students",
+    query: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream student records from one or more files in bounded-size batches.
+
+    The file type is picked from the extension: .csv, .parquet/.pq or
+    .db/.sqlite/.sqlite3. Multiple sources (e.g. one file per year) are
+    read one after another, in the order given.
+
+    Args:
+        sources: A file path or a list of file paths
+        chunksize: Rows per batch (default: settings.ANALYTICS_CHUNK_ROWS)
+        table: Table to read from SQLite sources
+        query: Optional SQL query for SQLite sources (overrides table)
+
+    Yields:
+        pd.DataFrame: At most chunksize records at a time
+    """
+    chunksize = chunksize or settings.ANALYTICS_CHUNK_ROWS
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+
+    for source in sources:
+        extension = os.path.splitext(str(source))[1].lower()
+        if extension in CSV_EXTENSIONS:
+            chunks = _iter_csv(source, chunksize)
+        elif extension in PARQUET_EXTENSIONS:
+            chunks = _iter_parquet(source, chunksize)
+        elif extension in SQLITE_EXTENSIONS:
+            chunks = _iter_sqlite(source, chunksize, table, query)
+        else:
+            raise ValueError(f"Unsupported history file type: {source}")
+
+        logger.info(f"Streaming records from {source} in batches of {chunksize}")
+        yield from chunks
+
+
+def aggregate_chunks(chunks: Iterable[pd.DataFrame], teacher: Optional[str] = None) -> AnalyticsPartial:
+    """
+    Fold a stream of record batches into one set of partial aggregates.
+
+    Args:
+        chunks: Iterable of DataFrames with student data
+        teacher: Only include records for this teacher (optional)
+
+    Returns:
+        AnalyticsPartial: Merged aggregates for every batch
+    """
+    partial = AnalyticsPartial()
+    batches = 0
+    for chunk in chunks:
+        if teacher and 'Teacher' in chunk.columns:
+            chunk = chunk[chunk['Teacher'] == teacher]
+        partial.update(chunk)
+        batches += 1
+
+    logger.info(f"Aggregated {partial.total_records} records from {batches} batches")
+    return partial
+
+
+def compute_analytics_chunked(
+    sources: Union[Source, Iterable[Source]],
+    chunksize: Optional[int] = None,
+    teacher: Optional[str] = None,
+    n: int = 5,
+    threshold: float = 60,
+    table: str = "students",
+    query: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run every analytics function over history files without loading them whole.
+
+    Peak memory is bounded by one batch plus the merged aggregates, which
+    grow with the number of distinct students/groups rather than records.
+
+    Args:
+        sources: A file path or a list of file paths (CSV, Parquet or SQLite)
+        chunksize: Rows per batch (default: settings.ANALYTICS_CHUNK_ROWS)
+        teacher: Only include records for this teacher (optional)
+        n: Number of top / struggling students to return
+        threshold: Score threshold for struggling students
+        table: Table to read from SQLite sources
+        query: Optional SQL query for SQLite sources
+
+    Returns:
+        Dictionary with the same results as the in-memory functions:
+        class_statistics, subject_performance, grade_performance,
+        top_students, struggling_students, behavior_distribution,
+        teacher_performance
+    """
+    chunks = iter_record_chunks(sources, chunksize=chunksize, table=table, query=query)
+    partial = aggregate_chunks(chunks, teacher=teacher)
+    return partial.results(n=n, threshold=threshold)
@@ -2,12 +2,16 @@
 Lesson Note Generator
 Generates structured lesson plans for teachers.
 """
-import os
-from utils.helpers import call_openai, save_to_file, setup_logger
+from utils.helpers import GENERATION_SECONDS, GENERATIONS, call_openai, hash_text, load_prompt, save_to_file, setup_logger
+from utils.metrics import timed
+from utils.singleflight import single_flight
 
 logger = setup_logger(__name__)
 
 
+# Identical concurrent requests share one model call
+@single_flight
+@timed(GENERATION_SECONDS, kind="lesson")
 def generate_lesson(subject, topic, age_group, objectives, duration=60):
     """
     Generate a comprehensive lesson note.
@@ -25,10 +29,8 @@ def generate_lesson(subject, topic, age_group, objectives, duration=60):
     logger.info(f"Generating lesson note for {subject} - {topic}")
     
     try:
-        # Load prompt template
-        prompt_path = os.path.join("core", "prompts", "lesson_prompt.txt")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            prompt_template = f.read()
+        # Load prompt template (cached until the file changes)
+        prompt_template = load_prompt("lesson")
         
         # Fill in template variables
         prompt = prompt_template.format(
@@ -44,9 +46,13 @@ def generate_lesson(subject, topic, age_group, objectives, duration=60):
         
         # Save output
         output_filename = f"lesson_{subject}_{topic}".replace(" ", "_").lower()
-        output_path = save_to_file(response, output_filename, folder="lessons")
+        output_path = save_to_file(response, output_filename, folder="lessons", metadata={
+            "subject": subject,
+            "prompt_hash": hash_text(prompt),
+        })
         
         logger.info(f"Lesson note generated successfully: {output_path}")
+        GENERATIONS.inc(kind="lesson", outcome="success")
         
         return {
             "success": True,
@@ -62,6 +68,7 @@ def generate_lesson(subject, topic, age_group, objectives, duration=60):
     
     except Exception as e:
         logger.error(f"Failed to generate lesson note: {str(e)}")
+        GENERATIONS.inc(kind="lesson", outcome="failure")
         return {
             "success": False,
             "error": str(e)
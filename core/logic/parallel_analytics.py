@@ -0,0 +1,141 @@
+"""
+Parallel multi-school analytics.
+Computes partial aggregates per partition (school, teacher or file) in a
+process pool and merges them into the final statistics.
+"""
+
+import os
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from config import settings
+from core.logic.aggregates import AnalyticsPartial
+from core.logic.chunked_analytics import Source, aggregate_chunks, iter_record_chunks
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _resolve_workers(max_workers: Optional[int], tasks: int) -> int:
+    workers = max_workers or settings.ANALYTICS_MAX_WORKERS or os.cpu_count() or 1
+    return max(1, min(workers, tasks))
+
+
+def _run_partials(func: Callable, tasks: List[Any], max_workers: Optional[int]) -> AnalyticsPartial:
+    """
+    Compute one partial per task and merge them in task order.
+
+    Runs inline when there is a single task or a single worker, so small
+    jobs don't pay for starting a process pool.
+    """
+    merged = AnalyticsPartial()
+    if not tasks:
+        return merged
+
+    workers = _resolve_workers(max_workers, len(tasks))
+    logger.info(f"Computing analytics for {len(tasks)} partitions on {workers} workers")
+
+    if workers == 1:
+        for partial in map(func, tasks):
+            merged.merge(partial)
+        return merged
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields in submission order, which keeps "first" values stable
+        for partial in executor.map(func, tasks):
+            merged.merge(partial)
+    return merged
+
+
+def _partial_for_frame(df: pd.DataFrame) -> AnalyticsPartial:
+    return AnalyticsPartial.from_frame(df)
+
+
+def _partial_for_source(task: Dict[str, Any]) -> AnalyticsPartial:
+    chunks = iter_record_chunks(
+        task['source'],
+        chunksize=task['chunksize'],
+        table=task['table'],
+        query=task['query'],
+    )
+    return aggregate_chunks(chunks, teacher=task['teacher'])
+
+
+def partition_frame(df: pd.DataFrame, by: str) -> List[pd.DataFrame]:
+    """
+    Split student records into one DataFrame per value of a column.
+
+    Args:
+        df: DataFrame with student data
+        by: Column to partition on (e.g. "School" or "Teacher")
+
+    Returns:
+        List of DataFrames, in order of first appearance
+    """
+    if by not in df.columns:
+        raise ValueError(f"Cannot partition by '{by}': column not found")
+    return [group for _, group in df.groupby(by, sort=False, dropna=False)]
+
+
+def compute_analytics_partitioned(
+    df: pd.DataFrame,
+    by: str = "School",
+    max_workers: Optional[int] = None,
+    n: int = 5,
+    threshold: float = 60,
+) -> Dict[str, Any]:
+    """
+    Run every analytics function over a district roster, one partition per process.
+
+    Args:
+        df: DataFrame with student data
+        by: Column to partition on (e.g. "School" or "Teacher")
+        max_workers: Worker processes (default: settings.ANALYTICS_MAX_WORKERS, 0 = all cores)
+        n: Number of top / struggling students to return
+        threshold: Score threshold for struggling students
+
+    Returns:
+        Dictionary with the same results as the in-memory functions
+        (see core.logic.chunked_analytics.compute_analytics_chunked)
+    """
+    partitions = partition_frame(df, by) if not df.empty else []
+    partial = _run_partials(_partial_for_frame, partitions, max_workers)
+    return partial.results(n=n, threshold=threshold)
+
+
+def compute_analytics_by_file(
+    sources: Iterable[Source],
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    teacher: Optional[str] = None,
+    n: int = 5,
+    threshold: float = 60,
+    table: str = "students",
+    query: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run every analytics function over many roster files, one file per process.
+
+    Each worker streams its file in bounded batches, so this combines with
+    the chunked mode for large per-school histories.
+
+    Args:
+        sources: File paths (CSV, Parquet or SQLite), e.g. one per school
+        max_workers: Worker processes (default: settings.ANALYTICS_MAX_WORKERS, 0 = all cores)
+        chunksize: Rows per batch inside each worker
+        teacher: Only include records for this teacher (optional)
+        n: Number of top / struggling students to return
+        threshold: Score threshold for struggling students
+        table: Table to read from SQLite sources
+        query: Optional SQL query for SQLite sources
+
+    Returns:
+        Dictionary with the same results as the in-memory functions
+    """
+    tasks = [
+        {'source': source, 'chunksize': chunksize, 'table': table, 'query': query, 'teacher': teacher}
+        for source in sources
+    ]
+    partial = _run_partials(_partial_for_source, tasks, max_workers)
+    return partial.results(n=n, threshold=threshold)
@@ -2,13 +2,17 @@
 Parent Communication Writer
 Drafts messages for parent communication.
 """
-import os
-from utils.helpers import call_openai, save_to_file, setup_logger
+from utils.helpers import GENERATION_SECONDS, GENERATIONS, call_openai, hash_text, load_prompt, save_to_file, setup_logger
+from utils.metrics import timed
+from utils.singleflight import single_flight
 
 logger = setup_logger(__name__)
 
 
-def generate_parent_message(purpose, child_name, context, teacher_name=""):
+# Identical concurrent requests share one model call
+@single_flight
+@timed(GENERATION_SECONDS, kind="parent_message")
+def generate_parent_message(purpose, child_name, context, teacher_name="", grade=None):
     """
     Generate a parent communication message.
     
@@ -17,6 +21,7 @@ def generate_parent_message(purpose, child_name, context, teacher_name=""):
         child_name (str): Name of the student
         context (str): Specific details about the message content
         teacher_name (str): Name of the teacher (optional)
+        grade (str): Child's grade, recorded in the archive for search (optional)
     
     Returns:
         dict: Generated message with metadata
@@ -24,10 +29,8 @@ def generate_parent_message(purpose, child_name, context, teacher_name=""):
     logger.info(f"Generating parent message ({purpose}) for {child_name}")
     
     try:
-        # Load prompt template
-        prompt_path = os.path.join("core", "prompts", "parent_prompt.txt")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            prompt_template = f.read()
+        # Load prompt template (cached until the file changes)
+        prompt_template = load_prompt("parent")
         
         # Fill in template variables
         prompt = prompt_template.format(
@@ -45,9 +48,15 @@ def generate_parent_message(purpose, child_name, context, teacher_name=""):
         
         # Save output
         output_filename = f"parent_message_{purpose}_{child_name}".replace(" ", "_").lower()
-        output_path = save_to_file(response, output_filename, folder="parent_messages")
+        output_path = save_to_file(response, output_filename, folder="parent_messages", metadata={
+            "student": child_name,
+            "teacher": teacher_name or None,
+            "grade": grade,
+            "prompt_hash": hash_text(prompt),
+        })
         
         logger.info(f"Parent message generated successfully: {output_path}")
+        GENERATIONS.inc(kind="parent_message", outcome="success")
         
         return {
             "success": True,
@@ -61,6 +70,7 @@ def generate_parent_message(purpose, child_name, context, teacher_name=""):
     
     except Exception as e:
         logger.error(f"Failed to generate parent message: {str(e)}")
+        GENERATIONS.inc(kind="parent_message", outcome="failure")
         return {
             "success": False,
             "error": str(e)
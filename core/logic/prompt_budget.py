@@ -0,0 +1,224 @@
+"""
+Token-budgeted compaction of report notes.
+Student histories arrive as one "- Subject: note" line per roster row;
+repeated notes are merged (subjects are kept). When the notes exceed the
+prompt's input budget, near-identical notes are merged too, long notes are
+shortened and the lowest-priority ones (later rows, behavior before
+performance) are dropped with a one-line mention of what was left out.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Rough size of a token for English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# Over budget only: share of word sets two notes must have in common to be merged
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# When over budget, no single note keeps more than this many tokens
+MAX_NOTE_TOKENS = 80
+# Below this, a partly fitting note is dropped rather than cut to a stub
+MIN_NOTE_TOKENS = 12
+# Behavior notes get at least this share of the budget if they need it
+BEHAVIOR_SHARE = 1 / 3
+
+_NOTE = re.compile(r"^\s*[-*•]\s*(?:(?P<labels>[^:\n]{1,80}):\s+)?(?P<text>.*\S)\s*$")
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+# Words that flip a note's meaning; "t" is what \w+ leaves of "isn't", "doesn't"...
+_NEGATIONS = frozenset({"not", "no", "never", "none", "nothing", "nobody", "neither", "nor", "cannot", "without", "t"})
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about 4 characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class Note:
+    """One note line: the subjects it applies to and its text."""
+    text: str
+    labels: List[str] = field(default_factory=list)
+    bullet: bool = True
+
+    def render(self) -> str:
+        if not self.bullet:
+            return self.text
+        if self.labels:
+            return f"- {', '.join(self.labels)}: {self.text}"
+        return f"- {self.text}"
+
+    def tokens(self) -> int:
+        # +1 for the line break
+        return estimate_tokens(self.render()) + 1
+
+
+def parse_notes(text: str) -> List[Note]:
+    """Split notes into lines; "- Subject: text" bullets keep their subject."""
+    notes = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        match = _NOTE.match(line)
+        if match:
+            labels = [match.group('labels').strip()] if match.group('labels') else []
+            notes.append(Note(match.group('text'), labels))
+        else:
+            notes.append(Note(line.strip(), bullet=False))
+    return notes
+
+
+def render_notes(notes: List[Note]) -> str:
+    return "\n".join(note.render() for note in notes)
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(_WORD.findall(text.casefold()))
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _near_duplicates(words: frozenset, other: frozenset, threshold: float) -> bool:
+    union = words | other
+    if not union or len(words & other) / len(union) < threshold:
+        return False
+    # "completing" vs "not completing", "scored 45" vs "scored 85": similar wording, different facts
+    difference = words ^ other
+    return not (difference & _NEGATIONS or any(char.isdigit() for word in difference for char in word))
+
+
+def dedupe_notes(notes: List[Note], threshold: Optional[float] = None) -> Tuple[List[Note], int]:
+    """
+    Merge repeated notes into their first occurrence.
+
+    "Excellent" for eight subjects becomes one "- Math, Art, ...: Excellent"
+    line. By default only notes that are identical apart from case and
+    whitespace are merged. With a threshold, notes whose word sets overlap
+    by at least that much (Jaccard similarity) are merged too, unless they
+    differ by a negation or a number.
+
+    Returns:
+        tuple: (remaining notes, number merged away)
+    """
+    kept: List[Tuple[Note, str, frozenset]] = []
+    merged = 0
+    for note in notes:
+        normalized = _normalized(note.text)
+        words = _words(note.text)
+        for existing, existing_normalized, existing_words in kept:
+            if normalized == existing_normalized or \
+                    (threshold is not None and _near_duplicates(words, existing_words, threshold)):
+                existing.labels.extend(label for label in note.labels if label not in existing.labels)
+                merged += 1
+                break
+        else:
+            kept.append((Note(note.text, list(note.labels), note.bullet), normalized, words))
+    return [note for note, _, _ in kept], merged
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Shorten text to about max_tokens, preferring a sentence, then a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(cut + " ")]
+    if sentence_ends and sentence_ends[-1] >= max_chars // 2:
+        return cut[:sentence_ends[-1]]
+    space = cut.rfind(" ")
+    if space >= max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:") + "…"
+
+
+def fit_notes(notes: List[Note], budget: int) -> Tuple[List[Note], int, int]:
+    """
+    Keep notes in order until the token budget runs out.
+
+    The note that crosses the budget is shortened if a useful part of it
+    fits; the rest are replaced by one line naming what was omitted.
+
+    Returns:
+        tuple: (notes that fit, number truncated, number omitted)
+    """
+    if sum(note.tokens() for note in notes) <= budget:
+        return notes, 0, 0
+    # Leave room for the "omitted" line
+    budget -= 16
+    kept, used, truncated = [], 0, 0
+    for position, note in enumerate(notes):
+        cost = note.tokens()
+        if used + cost <= budget:
+            kept.append(note)
+            used += cost
+            continue
+        room = budget - used - (cost - estimate_tokens(note.text))
+        if room >= MIN_NOTE_TOKENS:
+            kept.append(Note(truncate_text(note.text, room), note.labels, note.bullet))
+            truncated += 1
+            position += 1
+        omitted = notes[position:]
+        if omitted:
+            labels = [label for note in omitted for label in note.labels]
+            detail = f": {truncate_text(', '.join(labels), 10)}" if labels else ""
+            kept.append(Note(f"({len(omitted)} more notes omitted{detail})", bullet=True))
+        return kept, truncated, len(omitted)
+    return kept, truncated, 0
+
+
+def compact_report_notes(
+    performance_notes: str,
+    behavior_notes: str,
+    budget: Optional[int],
+) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Merge repeated report notes and fit them into a token budget.
+
+    Args:
+        performance_notes (str): Academic notes, one per line
+        behavior_notes (str): Behavior notes, one per line
+        budget (int): Tokens available for both sets of notes (None or
+            <= 0: merge exact repeats only)
+
+    Returns:
+        tuple: (performance_notes, behavior_notes, stats) where stats has
+        tokens_before, tokens_after, merged, truncated and omitted counts
+    """
+    tokens_before = estimate_tokens(performance_notes or "") + estimate_tokens(behavior_notes or "")
+    performance, merged_performance = dedupe_notes(parse_notes(performance_notes))
+    behavior, merged_behavior = dedupe_notes(parse_notes(behavior_notes))
+    truncated = omitted = 0
+
+    def total(notes):
+        return sum(note.tokens() for note in notes)
+
+    if budget and budget > 0 and total(performance) + total(behavior) > budget:
+        performance, merged = dedupe_notes(performance, NEAR_DUPLICATE_THRESHOLD)
+        merged_performance += merged
+        behavior, merged = dedupe_notes(behavior, NEAR_DUPLICATE_THRESHOLD)
+        merged_behavior += merged
+        # Very long single notes go first, so one essay can't crowd out every other subject
+        for notes in (performance, behavior):
+            for position, note in enumerate(notes):
+                if estimate_tokens(note.text) > MAX_NOTE_TOKENS:
+                    notes[position] = Note(truncate_text(note.text, MAX_NOTE_TOKENS), note.labels, note.bullet)
+                    truncated += 1
+        needed_performance, needed_behavior = total(performance), total(behavior)
+        if needed_performance + needed_behavior > budget:
+            behavior_budget = min(needed_behavior, max(int(budget * BEHAVIOR_SHARE), budget - needed_performance))
+            performance, cut, dropped = fit_notes(performance, budget - behavior_budget)
+            truncated, omitted = truncated + cut, omitted + dropped
+            behavior, cut, dropped = fit_notes(behavior, budget - total(performance))
+            truncated, omitted = truncated + cut, omitted + dropped
+
+    performance_text, behavior_text = render_notes(performance), render_notes(behavior)
+    stats = {
+        'tokens_before': tokens_before,
+        'tokens_after': estimate_tokens(performance_text) + estimate_tokens(behavior_text),
+        'merged': merged_performance + merged_behavior,
+        'truncated': truncated,
+        'omitted': omitted,
+    }
+    return performance_text, behavior_text, stats
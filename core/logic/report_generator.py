@@ -2,13 +2,51 @@
 Student Report Generator
 Creates professional progress reports for students.
 """
-import os
-from utils.helpers import call_openai, save_to_file, setup_logger
+from config import settings
+from core.logic.prompt_budget import compact_report_notes, estimate_tokens
+from utils import metrics
+from utils.helpers import GENERATION_SECONDS, GENERATIONS, call_openai, hash_text, load_prompt, save_to_file, setup_logger
+from utils.metrics import timed
+from utils.singleflight import single_flight
 
 logger = setup_logger(__name__)
 
+PROMPT_TOKENS_SAVED = metrics.counter(
+    "report_prompt_tokens_saved_total", "Estimated prompt tokens removed by report note compaction")
 
-def generate_report(student_name, period, subject, performance_notes, behavior_notes):
+
+def build_report_prompt(template, student_name, period, subject, performance_notes, behavior_notes):
+    """
+    Fill the report template, compacting the notes to fit REPORT_PROMPT_TOKEN_BUDGET.
+    
+    Duplicate notes are always merged; long or low-priority notes are only
+    shortened or dropped when the whole prompt would exceed the budget.
+    
+    Returns:
+        str: The prompt to send
+    """
+    fields = dict(student_name=student_name, period=period, subject=subject)
+    budget = settings.REPORT_PROMPT_TOKEN_BUDGET
+    notes_budget = None
+    if budget > 0:
+        overhead = estimate_tokens(template.format(performance_notes="", behavior_notes="", **fields))
+        notes_budget = max(budget - overhead, 0) or 1
+    performance_notes, behavior_notes, stats = compact_report_notes(performance_notes, behavior_notes, notes_budget)
+    
+    saved = stats['tokens_before'] - stats['tokens_after']
+    if saved > 0:
+        PROMPT_TOKENS_SAVED.inc(saved)
+        logger.info(
+            f"Compacted report notes for {student_name}: ~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens "
+            f"({stats['merged']} duplicates merged, {stats['truncated']} shortened, {stats['omitted']} omitted)"
+        )
+    return template.format(performance_notes=performance_notes, behavior_notes=behavior_notes, **fields)
+
+
+# Identical concurrent requests share one model call
+@single_flight
+@timed(GENERATION_SECONDS, kind="report")
+def generate_report(student_name, period, subject, performance_notes, behavior_notes, grade=None, teacher=None):
     """
     Generate a student progress report.
     
@@ -18,6 +56,8 @@ def generate_report(student_name, period, subject, performance_notes, behavior_n
         subject (str): Subject or area being reported on
         performance_notes (str): Academic performance observations
         behavior_notes (str): Behavioral and social-emotional observations
+        grade (str): Student's grade, recorded in the archive for search (optional)
+        teacher (str): Student's teacher, recorded in the archive for search (optional)
     
     Returns:
         dict: Generated report with metadata
@@ -25,13 +65,12 @@ def generate_report(student_name, period, subject, performance_notes, behavior_n
     logger.info(f"Generating report for student: {student_name}")
     
     try:
-        # Load prompt template
-        prompt_path = os.path.join("core", "prompts", "report_prompt.txt")
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            prompt_template = f.read()
+        # Load prompt template (cached until the file changes)
+        prompt_template = load_prompt("report")
         
-        # Fill in template variables
-        prompt = prompt_template.format(
+        # Fill in template variables, within the prompt token budget
+        prompt = build_report_prompt(
+            prompt_template,
             student_name=student_name,
             period=period,
             subject=subject,
@@ -44,9 +83,17 @@ def generate_report(student_name, period, subject, performance_notes, behavior_n
         
         # Save output
         output_filename = f"report_{student_name}_{period}".replace(" ", "_").lower()
-        output_path = save_to_file(response, output_filename, folder="reports")
+        output_path = save_to_file(response, output_filename, folder="reports", metadata={
+            "student": student_name,
+            "subject": subject,
+            "period": period,
+            "grade": grade,
+            "teacher": teacher,
+            "prompt_hash": hash_text(prompt),
+        })
         
         logger.info(f"Report generated successfully: {output_path}")
+        GENERATIONS.inc(kind="report", outcome="success")
         
         return {
             "success": True,
@@ -61,12 +108,33 @@ def generate_report(student_name, period, subject, performance_notes, behavior_n
     
     except Exception as e:
         logger.error(f"Failed to generate report: {str(e)}")
+        GENERATIONS.inc(kind="report", outcome="failure")
         return {
             "success": False,
             "error": str(e)
         }
 
 
+def collect_student_notes(records):
+    """
+    Combine a student's per-subject roster rows into report notes.
+    
+    Args:
+        records (list[dict]): The student's records (Subject, Notes, Behavior)
+    
+    Returns:
+        tuple: (performance_notes, behavior_notes), one "- Subject: text" line
+        per record, or "" if there's nothing to combine
+    """
+    performance_notes = "\n".join(
+        f"- {record['Subject']}: {record['Notes']}" for record in records if 'Subject' in record and 'Notes' in record
+    )
+    behavior_notes = "\n".join(
+        f"- {record['Subject']}: {record['Behavior']}" for record in records if 'Subject' in record and 'Behavior' in record
+    )
+    return performance_notes, behavior_notes
+
+
 if __name__ == "__main__":
     # Test the generator
     result = generate_report(
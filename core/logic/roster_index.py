@@ -0,0 +1,131 @@
+"""
+Pre-sorted roster index for paginated, searchable student views.
+Built once per data snapshot so each page render only slices the rows it
+shows instead of re-sorting and re-filtering the whole roster.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Page:
+    """One page of results plus enough context to render a pager."""
+    items: Any
+    page: int
+    pages: int
+    total: int
+    page_size: int
+
+    @property
+    def first(self) -> int:
+        """1-based position of the first item on this page (0 if empty)."""
+        return (self.page - 1) * self.page_size + 1 if self.total else 0
+
+    @property
+    def last(self) -> int:
+        """1-based position of the last item on this page."""
+        return min(self.page * self.page_size, self.total)
+
+
+def _paginate(total: int, page: int, page_size: int):
+    page_size = max(1, int(page_size))
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return page, pages, page_size, start, min(start + page_size, total)
+
+
+class RosterIndex:
+    """
+    Roster rows sorted by student name, with per-student row ranges.
+
+    Rows for one student are contiguous, so a page of students maps to one
+    contiguous slice of rows and looking up a student is a binary search.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if 'Name' in df.columns and not df.empty:
+            keys = df['Name'].astype(str).to_numpy()
+            order = np.argsort(keys, kind='stable')
+            self.frame = df.iloc[order].reset_index(drop=True)
+            sorted_keys = keys[order]
+            self.names, self._starts = np.unique(sorted_keys, return_index=True)
+            self._ends = np.append(self._starts[1:], len(sorted_keys))
+        else:
+            self.frame = df.reset_index(drop=True)
+            self.names = np.array([], dtype=object)
+            self._starts = self._ends = np.array([], dtype=int)
+        self._folded = pd.Series(self.names, dtype=object).str.casefold()
+
+    @property
+    def total_students(self) -> int:
+        return len(self.names)
+
+    @property
+    def total_records(self) -> int:
+        return len(self.frame)
+
+    def search(self, query: Optional[str] = None) -> np.ndarray:
+        """
+        Positions of students whose name contains the query (case-insensitive).
+
+        Args:
+            query: Text to look for (empty or None matches everyone)
+
+        Returns:
+            np.ndarray: Positions into self.names, in name order
+        """
+        query = (query or "").strip().casefold()
+        if not query:
+            return np.arange(len(self.names))
+        return np.flatnonzero(self._folded.str.contains(query, regex=False).to_numpy())
+
+    def name_page(self, query: Optional[str] = None, page: int = 1, page_size: int = 50) -> Page:
+        """
+        One page of matching student names.
+
+        Returns:
+            Page whose items are a list of names
+        """
+        matches = self.search(query)
+        page, pages, page_size, start, end = _paginate(len(matches), page, page_size)
+        return Page(self.names[matches[start:end]].tolist(), page, pages, len(matches), page_size)
+
+    def rows_for_names(self, names) -> pd.DataFrame:
+        """All records for the given students, in name order."""
+        positions = np.searchsorted(self.names, np.asarray(names, dtype=self.names.dtype))
+        if len(positions) == 0:
+            return self.frame.iloc[0:0]
+        # Pages are contiguous runs of names, so this is usually one slice
+        if np.all(np.diff(positions) == 1):
+            return self.frame.iloc[self._starts[positions[0]]:self._ends[positions[-1]]]
+        rows = np.concatenate([np.arange(self._starts[p], self._ends[p]) for p in positions])
+        return self.frame.iloc[rows]
+
+    def student_rows(self, name: str) -> pd.DataFrame:
+        """All records for one student (empty if unknown)."""
+        position = np.searchsorted(self.names, name)
+        if position >= len(self.names) or self.names[position] != name:
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[self._starts[position]:self._ends[position]]
+
+    def rows_page(self, query: Optional[str] = None, page: int = 1, page_size: int = 50) -> Page:
+        """
+        One page of records belonging to matching students.
+
+        Returns:
+            Page whose items are a DataFrame slice
+        """
+        matches = self.search(query)
+        if len(matches) == len(self.names):
+            total = len(self.frame)
+            page, pages, page_size, start, end = _paginate(total, page, page_size)
+            return Page(self.frame.iloc[start:end], page, pages, total, page_size)
+
+        rows = np.concatenate([np.arange(self._starts[p], self._ends[p]) for p in matches]) if len(matches) else np.array([], dtype=int)
+        page, pages, page_size, start, end = _paginate(len(rows), page, page_size)
+        return Page(self.frame.iloc[rows[start:end]], page, pages, len(rows), page_size)
@@ -0,0 +1,131 @@
+"""
+Derived views of a roster snapshot.
+Each view is built at most once per snapshot (RosterSnapshot.memo), so the
+dashboard pages and the startup warm-up share the same DataFrames, indexes
+and summaries instead of rebuilding them on every rerun.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from config import settings
+from core.logic.analytics import (
+    calculate_class_statistics,
+    get_subject_performance,
+    get_grade_performance,
+    get_top_students,
+    get_struggling_students,
+    get_behavior_distribution,
+    get_teacher_performance,
+    get_quick_stats,
+    get_student_summary,
+)
+from core.logic.analytics_cache import cached_analytics, frame_fingerprint
+from core.logic.roster_index import RosterIndex
+
+ALL_TEACHERS = "All Teachers"
+ALL_GRADES = "All Grades"
+
+# Defaults of the Analytics page sliders, so warmed results match first renders
+DEFAULT_TOP_N = 5
+DEFAULT_THRESHOLD = 60
+
+ANALYTICS_DEFAULTS = [
+    (calculate_class_statistics, {}),
+    (get_subject_performance, {}),
+    (get_grade_performance, {}),
+    (get_top_students, {'n': DEFAULT_TOP_N}),
+    (get_struggling_students, {'threshold': DEFAULT_THRESHOLD, 'n': DEFAULT_TOP_N}),
+    (get_behavior_distribution, {}),
+    (get_teacher_performance, {}),
+]
+
+
+def roster_frame(snapshot) -> pd.DataFrame:
+    """The whole roster as a DataFrame (shared: treat as read-only)."""
+    return snapshot.memo("frame", lambda snapshot: pd.DataFrame(snapshot.records))
+
+
+def roster_fingerprint(snapshot) -> str:
+    """Content fingerprint of roster_frame(), for the analytics cache."""
+    return snapshot.memo("fingerprint", lambda snapshot: frame_fingerprint(roster_frame(snapshot)))
+
+
+def teachers(snapshot) -> List[str]:
+    """Sorted teacher names (empty if the roster has no Teacher column)."""
+    def build(snapshot):
+        df = roster_frame(snapshot)
+        return sorted(df['Teacher'].unique().tolist()) if 'Teacher' in df.columns else []
+    return snapshot.memo("teachers", build)
+
+
+def grades(snapshot, teacher: str = ALL_TEACHERS) -> List[str]:
+    """Sorted grades among one teacher's students (or everyone's)."""
+    def build(snapshot):
+        df = roster_index(snapshot, teacher).frame
+        return sorted(df['Grade'].unique()) if 'Grade' in df.columns else []
+    return snapshot.memo(("grades", teacher), build)
+
+
+def roster_index(snapshot, teacher: str = ALL_TEACHERS, grade: str = ALL_GRADES) -> RosterIndex:
+    """Pre-sorted index of the roster filtered by teacher and grade."""
+    def build(snapshot):
+        df = roster_frame(snapshot)
+        if teacher != ALL_TEACHERS and 'Teacher' in df.columns:
+            df = df[df['Teacher'] == teacher]
+        if grade != ALL_GRADES and 'Grade' in df.columns:
+            df = df[df['Grade'] == grade]
+        return RosterIndex(df)
+    return snapshot.memo(("roster_index", teacher, grade), build)
+
+
+def student_summary(snapshot, teacher: str = ALL_TEACHERS, grade: str = ALL_GRADES) -> pd.DataFrame:
+    """One summary row per student, indexed by name in roster_index() order."""
+    def build(snapshot):
+        index = roster_index(snapshot, teacher, grade)
+        summary = get_student_summary(index.frame)
+        summary.index = summary['Name'].astype(str)
+        return summary.reindex(index.names)
+    return snapshot.memo(("student_summary", teacher, grade), build)
+
+
+def quick_stats(snapshot) -> Dict[str, Any]:
+    """Home page headline numbers."""
+    return snapshot.memo("quick_stats", lambda snapshot: get_quick_stats(roster_frame(snapshot)))
+
+
+def analytics(snapshot, func, teacher: str = ALL_TEACHERS, **params):
+    """Run an analytics function over the roster through the fingerprint cache."""
+    return cached_analytics(
+        func, roster_frame(snapshot), fingerprint=roster_fingerprint(snapshot), teacher=teacher, **params
+    )
+
+
+def prime(snapshot, per_teacher: bool = True) -> int:
+    """
+    Build the views the first page renders need.
+
+    Args:
+        snapshot: Roster snapshot to prime
+        per_teacher: Also prime each teacher's filtered views and analytics
+
+    Returns:
+        int: Number of views built or confirmed cached
+    """
+    if not len(snapshot):
+        return 0
+    quick_stats(snapshot)
+    # Analytics share one LRU (ANALYTICS_CACHE_SIZE): prime only as many
+    # teachers as fit beside All Teachers, and All Teachers last so the
+    # default view is the most recently used and the last to be evicted
+    per_teacher_limit = max(settings.ANALYTICS_CACHE_SIZE // len(ANALYTICS_DEFAULTS) - 1, 0)
+    scopes = (teachers(snapshot)[:per_teacher_limit] if per_teacher else []) + [ALL_TEACHERS]
+    built = 1
+    for teacher in scopes:
+        student_summary(snapshot, teacher)
+        grades(snapshot, teacher)
+        for func, params in ANALYTICS_DEFAULTS:
+            analytics(snapshot, func, teacher, **params)
+        built += 2 + len(ANALYTICS_DEFAULTS)
+    return built
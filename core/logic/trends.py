@@ -0,0 +1,155 @@
+"""
+Term-over-term trend analytics.
+Per-student deltas, rolling averages and declining-student lists computed
+with vectorized groupby operations over the score store.
+"""
+
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from core.storage.score_store import ScoreStore, get_score_store
+
+
+def term_averages(scores: pd.DataFrame, by_subject: bool = False) -> pd.DataFrame:
+    """
+    Average score per student (and optionally subject) per term.
+
+    Args:
+        scores: Output of ScoreStore.load_scores()
+        by_subject: Keep subjects separate instead of averaging across them
+
+    Returns:
+        DataFrame with student, [subject,] term, term_order, average, sorted by term
+    """
+    keys = ['student', 'subject'] if by_subject else ['student']
+    if scores.empty:
+        return pd.DataFrame(columns=keys + ['term', 'term_order', 'average'])
+
+    averages = (
+        scores.groupby(keys + ['term_order', 'term'], sort=False)['score']
+        .mean()
+        .rename('average')
+        .reset_index()
+    )
+    return averages.sort_values(keys + ['term_order'], kind='stable').reset_index(drop=True)
+
+
+def score_deltas(scores: pd.DataFrame, by_subject: bool = False) -> pd.DataFrame:
+    """
+    Change in average score from each student's previous term.
+
+    Args:
+        scores: Output of ScoreStore.load_scores()
+        by_subject: Compute deltas per subject instead of per student
+
+    Returns:
+        term_averages() plus previous_average and delta columns
+        (NaN for a student's first term)
+    """
+    keys = ['student', 'subject'] if by_subject else ['student']
+    averages = term_averages(scores, by_subject=by_subject)
+    previous = averages.groupby(keys, sort=False)['average'].shift(1)
+    averages['previous_average'] = previous
+    averages['delta'] = averages['average'] - previous
+    return averages
+
+
+def rolling_averages(scores: pd.DataFrame, window: int = 3, by_subject: bool = False) -> pd.DataFrame:
+    """
+    Rolling mean of each student's term averages.
+
+    Args:
+        scores: Output of ScoreStore.load_scores()
+        window: Number of terms in the window
+        by_subject: Roll per subject instead of per student
+
+    Returns:
+        term_averages() plus a rolling_average column
+    """
+    keys = ['student', 'subject'] if by_subject else ['student']
+    averages = term_averages(scores, by_subject=by_subject)
+    if averages.empty:
+        averages['rolling_average'] = pd.Series(dtype='float64')
+        return averages
+
+    rolled = averages.groupby(keys, sort=False)['average'].rolling(window, min_periods=1).mean()
+    averages['rolling_average'] = rolled.reset_index(level=list(range(len(keys))), drop=True)
+    return averages
+
+
+def declining_students(scores: pd.DataFrame, min_drop: float = 5, streak: int = 1) -> pd.DataFrame:
+    """
+    Students whose average fell in their latest term.
+
+    Args:
+        scores: Output of ScoreStore.load_scores()
+        min_drop: Minimum fall in average (points) in the latest term
+        streak: Number of consecutive falling terms required, ending with the latest
+
+    Returns:
+        DataFrame with student, term, average, previous_average, delta and
+        falling_terms, steepest decline first
+    """
+    deltas = score_deltas(scores)
+    if deltas.empty:
+        return deltas.assign(falling_terms=pd.Series(dtype='int64'))
+
+    falling = (deltas['delta'] < 0).astype('int64')
+    # Length of the current run of falling terms for each student
+    run_id = (falling == 0).groupby(deltas['student'], sort=False).cumsum()
+    deltas['falling_terms'] = falling.groupby([deltas['student'], run_id], sort=False).cumsum()
+
+    latest = deltas.groupby('student', sort=False).tail(1)
+    declining = latest[(latest['delta'] <= -min_drop) & (latest['falling_terms'] >= streak)]
+    return declining.sort_values('delta', kind='stable').reset_index(drop=True)
+
+
+class TrendEngine:
+    """
+    Trend queries over the score store.
+
+    Keeps the latest-score table in memory and reloads it only when a new
+    snapshot has been recorded, so repeated queries don't touch the disk.
+    """
+
+    def __init__(self, store: Optional[ScoreStore] = None):
+        self.store = store or get_score_store()
+        self._scores = None
+        self._snapshot_id = None
+        self._lock = threading.Lock()
+
+    def scores(self) -> pd.DataFrame:
+        """Return the latest scores, reloading after new snapshots."""
+        snapshot_id = self.store.latest_snapshot_id()
+        with self._lock:
+            if self._scores is None or snapshot_id != self._snapshot_id:
+                self._scores = self.store.load_scores()
+                self._snapshot_id = snapshot_id
+            return self._scores
+
+    def deltas(self, by_subject: bool = False) -> pd.DataFrame:
+        """See score_deltas()."""
+        return score_deltas(self.scores(), by_subject=by_subject)
+
+    def rolling(self, window: int = 3, by_subject: bool = False) -> pd.DataFrame:
+        """See rolling_averages()."""
+        return rolling_averages(self.scores(), window=window, by_subject=by_subject)
+
+    def declining(self, min_drop: float = 5, streak: int = 1) -> pd.DataFrame:
+        """See declining_students()."""
+        return declining_students(self.scores(), min_drop=min_drop, streak=streak)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_trend_engine() -> TrendEngine:
+    """Return the process-wide trend engine (created on first use)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TrendEngine()
+        return _engine
@@ -0,0 +1,747 @@
+"""
+Indexed archive of generated outputs.
+Every lesson, report and parent message is appended to one SQLite database
+with its metadata (kind, student, subject, period, teacher, grade, prompt
+hash, timestamp), replacing a flat directory of timestamped .txt files. A
+full-text index (FTS5) is kept up to date in the same transaction.
+Text is stored once per distinct content (keyed by its hash) and compressed;
+a background pass compacts the store and applies the retention policy.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import settings
+from core.storage import codecs
+from utils.helpers import hash_text, setup_logger
+
+logger = setup_logger(__name__)
+
+LOCATOR_PREFIX = "archive://"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    name TEXT,
+    student TEXT,
+    subject TEXT,
+    period TEXT,
+    teacher TEXT,
+    grade TEXT,
+    prompt_hash TEXT,
+    created_at TEXT NOT NULL,
+    content TEXT NOT NULL,
+    source_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outputs_kind ON outputs (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_outputs_student ON outputs (student, created_at);
+CREATE INDEX IF NOT EXISTS idx_outputs_teacher ON outputs (teacher, created_at);
+CREATE INDEX IF NOT EXISTS idx_outputs_period ON outputs (period, kind);
+CREATE INDEX IF NOT EXISTS idx_outputs_prompt_hash ON outputs (prompt_hash);
+CREATE INDEX IF NOT EXISTS idx_outputs_created_at ON outputs (created_at);
+-- Migrated files are recorded once, so the migration can be re-run safely
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outputs_source_path ON outputs (source_path) WHERE source_path IS NOT NULL;
+-- One row per distinct text; outputs point at it by hash
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+# Contentless full-text index keyed by outputs.id: the text lives in outputs
+# only. Rows are added and removed explicitly ('delete' command) because
+# contentless_delete needs SQLite 3.43+.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE outputs_fts USING fts5(
+    content, student, subject, period, teacher,
+    content='', tokenize='porter unicode61'
+);
+"""
+FTS_COLUMNS = ['content', 'student', 'subject', 'period', 'teacher']
+# bm25 weights per FTS column: a name or subject match outranks a passing mention
+FTS_WEIGHTS = (1.0, 4.0, 2.0, 2.0, 2.0)
+
+METADATA_COLUMNS = ['name', 'student', 'subject', 'period', 'teacher', 'grade', 'prompt_hash']
+FILTER_COLUMNS = ['kind', 'student', 'subject', 'period', 'teacher', 'grade', 'prompt_hash']
+ROW_COLUMNS = ['kind'] + METADATA_COLUMNS + ['created_at', 'content', 'source_path']
+# content stays '' for rows whose text lives in blobs (rows from before
+# deduplication keep it inline until the next compaction)
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO outputs "
+    "(kind, name, student, subject, period, teacher, grade, prompt_hash, created_at, content, source_path, blob_hash) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, '', ?, ?)"
+)
+LISTING_COLUMNS = ['id', 'kind'] + METADATA_COLUMNS + ['created_at', 'source_path']
+# Select o.* plus what _content() needs to decode the text
+CONTENT_SELECT = "o.content, o.blob_hash, b.codec, b.data FROM outputs o LEFT JOIN blobs b ON b.hash = o.blob_hash"
+
+
+def _content(row: sqlite3.Row) -> str:
+    if row['blob_hash'] is None:
+        return row['content']
+    return codecs.decompress(row['codec'], row['data'])
+
+
+def locator(output_id: int) -> str:
+    """Stable reference to an archived output, e.g. "archive://42"."""
+    return f"{LOCATOR_PREFIX}{output_id}"
+
+
+def parse_locator(value: str) -> Optional[int]:
+    """Return the output ID from a locator, or None if it isn't one."""
+    if isinstance(value, str) and value.startswith(LOCATOR_PREFIX):
+        try:
+            return int(value[len(LOCATOR_PREFIX):])
+        except ValueError:
+            return None
+    return None
+
+
+class OutputArchive:
+    """
+    SQLite store of generated content.
+
+    Lookups by kind, student, teacher, period, grade or prompt hash use
+    indexes, newest first; search() ranks full-text matches. Writes go
+    through one lock; the database runs in WAL mode so readers (dashboard
+    pages) never wait on a writer.
+    """
+
+    def __init__(self, path: Optional[str] = None, compression: Optional[str] = None):
+        self.path = path or settings.ARCHIVE_DB
+        self.codec = codecs.resolve(compression or settings.ARCHIVE_COMPRESSION)
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Bring databases created by earlier versions up to the current schema."""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(outputs)")}
+        if 'grade' not in columns:
+            conn.execute("ALTER TABLE outputs ADD COLUMN grade TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_grade ON outputs (grade, kind)")
+        if 'blob_hash' not in columns:
+            conn.execute("ALTER TABLE outputs ADD COLUMN blob_hash TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outputs_blob_hash ON outputs (blob_hash)")
+
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'outputs_fts'"
+        ).fetchone()
+        if not has_fts:
+            conn.executescript(FTS_SCHEMA)
+            conn.execute(
+                f"INSERT INTO outputs_fts (rowid, {', '.join(FTS_COLUMNS)}) "
+                f"SELECT id, {', '.join(FTS_COLUMNS)} FROM outputs"
+            )
+            logger.info("Built the full-text index for the output archive")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection that commits on success and always closes."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(entry: Dict[str, Any]) -> tuple:
+        return (
+            entry.get('kind') or "general",
+            *(entry.get(column) for column in METADATA_COLUMNS),
+            entry.get('created_at') or datetime.now().isoformat(timespec="microseconds"),
+            entry['content'],
+            entry.get('source_path'),
+        )
+
+    def _store_blob(self, conn: sqlite3.Connection, blob_hash: str, content: str) -> None:
+        """Store content under its hash, compressed, unless it's already stored."""
+        if conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (blob_hash,)).fetchone() is None:
+            codec, data = codecs.compress(content, self.codec)
+            conn.execute(
+                "INSERT INTO blobs (hash, codec, size, stored_size, data) VALUES (?, ?, ?, ?, ?)",
+                (blob_hash, codec, len(content.encode("utf-8")), len(data), data),
+            )
+
+    def _insert(self, conn: sqlite3.Connection, row: tuple) -> Optional[int]:
+        """Insert one row and index it. Returns its ID, or None if it was a duplicate source_path."""
+        values = dict(zip(ROW_COLUMNS, row))
+        blob_hash = hash_text(values['content'])
+        cursor = conn.execute(INSERT_SQL, [values[column] for column in ROW_COLUMNS if column != 'content'] + [blob_hash])
+        if cursor.rowcount == 0:
+            return None
+        output_id = cursor.lastrowid
+        self._store_blob(conn, blob_hash, values['content'])
+        conn.execute(
+            f"INSERT INTO outputs_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+            [output_id] + [values[column] for column in FTS_COLUMNS],
+        )
+        return output_id
+
+    def add(self, content: str, kind: str = "general", **metadata) -> int:
+        """
+        Archive one generated output.
+
+        Args:
+            content (str): Generated text
+            kind (str): Output type, e.g. "lessons", "reports", "parent_messages"
+            **metadata: name, student, subject, period, teacher, grade,
+                prompt_hash, created_at (ISO timestamp, default now), source_path
+
+        Returns:
+            int: Output ID (None if source_path was already archived)
+        """
+        row = self._row(dict(metadata, content=content, kind=kind))
+        with self._lock, self._connect() as conn:
+            return self._insert(conn, row)
+
+    def add_many(self, entries: Iterable[Dict[str, Any]], batch_size: int = 500) -> int:
+        """
+        Archive many outputs, one transaction per batch.
+
+        Entries with a source_path that's already archived are skipped.
+
+        Args:
+            entries: Dicts with content, kind and optional metadata (as in add())
+            batch_size (int): Rows per transaction
+
+        Returns:
+            int: Number of rows inserted
+        """
+        inserted = 0
+        batch = []
+        for entry in entries:
+            batch.append(self._row(entry))
+            if len(batch) >= batch_size:
+                inserted += self._flush(batch)
+                batch = []
+        if batch:
+            inserted += self._flush(batch)
+        return inserted
+
+    def _flush(self, rows: List[tuple]) -> int:
+        with self._lock, self._connect() as conn:
+            return sum(1 for row in rows if self._insert(conn, row) is not None)
+
+    def delete(self, output_ids: Iterable[int]) -> int:
+        """
+        Remove outputs and their full-text entries.
+
+        Their blobs are left for the next compaction pass to collect.
+
+        Returns:
+            int: Number of outputs removed
+        """
+        removed = 0
+        with self._lock, self._connect() as conn:
+            for output_id in output_ids:
+                row = conn.execute(
+                    f"SELECT o.student, o.subject, o.period, o.teacher, {CONTENT_SELECT} WHERE o.id = ?",
+                    (output_id,),
+                ).fetchone()
+                if row is None:
+                    continue
+                # Contentless FTS tables need the original values to un-index a row
+                values = dict(row, content=_content(row))
+                conn.execute(
+                    f"INSERT INTO outputs_fts (outputs_fts, rowid, {', '.join(FTS_COLUMNS)}) "
+                    f"VALUES ('delete', ?, ?, ?, ?, ?, ?)",
+                    [output_id] + [values[column] for column in FTS_COLUMNS],
+                )
+                conn.execute("DELETE FROM outputs WHERE id = ?", (output_id,))
+                removed += 1
+        return removed
+
+    def get(self, output_id: int) -> Optional[Dict[str, Any]]:
+        """Return one output with its content, or None if unknown."""
+        columns = ", ".join(f"o.{column}" for column in LISTING_COLUMNS)
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {columns}, {CONTENT_SELECT} WHERE o.id = ?", (output_id,)).fetchone()
+        return self._output(row, LISTING_COLUMNS) if row else None
+
+    @staticmethod
+    def _output(row: sqlite3.Row, columns: List[str]) -> Dict[str, Any]:
+        output = {column: row[column] for column in columns}
+        output['content'] = _content(row)
+        return output
+
+    def _where(self, filters: Dict[str, Any], since: Optional[str], until: Optional[str], table: str = ""):
+        prefix = f"{table}." if table else ""
+        clauses, params = [], []
+        for column in FILTER_COLUMNS:
+            value = filters.get(column)
+            if value is not None:
+                clauses.append(f"{prefix}{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append(f"{prefix}created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append(f"{prefix}created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def find(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        with_content: bool = False,
+        **filters,
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up archived outputs, newest first.
+
+        Args:
+            since (str): Only outputs created at or after this ISO timestamp
+            until (str): Only outputs created before this ISO timestamp
+            limit (int): Maximum rows to return
+            offset (int): Rows to skip (for paging)
+            with_content (bool): Include the generated text
+            **filters: Exact matches on kind, student, subject, period, teacher,
+                grade, prompt_hash
+
+        Returns:
+            list[dict]: Matching outputs
+        """
+        where, params = self._where(filters, since, until, table="o")
+        columns = ", ".join(f"o.{column}" for column in LISTING_COLUMNS)
+        source = f", {CONTENT_SELECT}" if with_content else " FROM outputs o"
+        query = f"SELECT {columns}{source}{where} ORDER BY o.created_at DESC, o.id DESC LIMIT ? OFFSET ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, params + [limit, offset])
+            if with_content:
+                return [self._output(row, LISTING_COLUMNS) for row in rows]
+            return [dict(row) for row in rows]
+
+    def iter_outputs(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        order_by: Iterable[str] = ('created_at', 'id'),
+        batch_size: int = 200,
+        **filters,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every matching output with its content, in batches.
+
+        Only batch_size rows are held in memory at a time, so this suits
+        exports of any size.
+
+        Args:
+            since (str): Only outputs created at or after this ISO timestamp
+            until (str): Only outputs created before this ISO timestamp
+            order_by: Listing columns to sort by, ascending
+            batch_size (int): Rows fetched per round trip
+            **filters: Exact matches, as in find()
+
+        Yields:
+            dict: One output, as returned by get()
+        """
+        order = list(order_by)
+        unknown = [column for column in order if column not in LISTING_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown archive column: {', '.join(unknown)}")
+        where, params = self._where(filters, since, until, table="o")
+        columns = ", ".join(f"o.{column}" for column in LISTING_COLUMNS)
+        ordering = ", ".join(f"o.{column}" for column in order) or "o.id"
+        with self._connect() as conn:
+            cursor = conn.execute(f"SELECT {columns}, {CONTENT_SELECT}{where} ORDER BY {ordering}", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._output(row, LISTING_COLUMNS)
+
+    def count(self, since: Optional[str] = None, until: Optional[str] = None, **filters) -> int:
+        """Number of outputs matching the same filters as find()."""
+        where, params = self._where(filters, since, until)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM outputs{where}", params).fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        **filters,
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search, best match first (bm25).
+
+        Words are ANDed and stemmed ("fraction" finds "fractions"); a
+        trailing * matches a prefix ("multipl*"). Metadata filters are exact.
+
+        Args:
+            query (str): Search words
+            since (str): Only outputs created at or after this ISO timestamp
+            until (str): Only outputs created before this ISO timestamp
+            limit (int): Maximum results to return
+            offset (int): Results to skip (for paging)
+            **filters: Exact matches, as in find()
+
+        Returns:
+            list[dict]: Matching outputs with a 'snippet' around the first
+            matched word and their 'rank' (lower is better)
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        where, params = self._where(filters, since, until, table="o")
+        where = where.replace(" WHERE ", " AND ", 1)
+        columns = ", ".join(f"o.{column}" for column in LISTING_COLUMNS + ['content', 'blob_hash'])
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        # Rank and page first, so only the returned rows' text is read and decompressed
+        sql = (
+            f"SELECT r.*, b.codec, b.data FROM ("
+            f"SELECT {columns}, bm25(outputs_fts, {weights}) AS rank "
+            f"FROM outputs_fts JOIN outputs o ON o.id = outputs_fts.rowid "
+            f"WHERE outputs_fts MATCH ?{where} ORDER BY rank LIMIT ? OFFSET ?"
+            f") r LEFT JOIN blobs b ON b.hash = r.blob_hash ORDER BY r.rank"
+        )
+        terms = _query_terms(query)
+        results = []
+        with self._connect() as conn:
+            for row in conn.execute(sql, [match] + params + [limit, offset]):
+                result = {column: row[column] for column in LISTING_COLUMNS + ['rank']}
+                result['snippet'] = snippet(_content(row), terms)
+                results.append(result)
+        return results
+
+    def search_count(self, query: str, since: Optional[str] = None, until: Optional[str] = None, **filters) -> int:
+        """Number of outputs matching the same query and filters as search()."""
+        match = fts_query(query)
+        if not match:
+            return 0
+        where, params = self._where(filters, since, until, table="o")
+        where = where.replace(" WHERE ", " AND ", 1)
+        sql = (
+            "SELECT COUNT(*) FROM outputs_fts JOIN outputs o ON o.id = outputs_fts.rowid "
+            f"WHERE outputs_fts MATCH ?{where}"
+        )
+        with self._connect() as conn:
+            return conn.execute(sql, [match] + params).fetchone()[0]
+
+    def distinct(self, column: str, limit: int = 500) -> List[str]:
+        """Distinct non-empty values of a filter column, for filter pickers."""
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unknown archive column: {column}")
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT DISTINCT {column} FROM outputs WHERE {column} IS NOT NULL AND {column} != '' "
+                f"ORDER BY {column} LIMIT ?",
+                (limit,),
+            )
+            return [row[0] for row in rows]
+
+    def compact(self, batch_size: int = 500) -> Dict[str, Any]:
+        """
+        Move inline text into deduplicated, compressed blobs, drop blobs no
+        output uses any more, and reclaim free pages when there are many.
+
+        Runs in batches, releasing the write lock between them so new
+        outputs are never held up for long.
+
+        Returns:
+            dict: outputs compacted, orphan blobs removed, whether the file was vacuumed
+        """
+        compacted = 0
+        while True:
+            with self._lock, self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT id, content FROM outputs WHERE blob_hash IS NULL LIMIT ?", (batch_size,)
+                ).fetchall()
+                for row in rows:
+                    blob_hash = hash_text(row['content'])
+                    self._store_blob(conn, blob_hash, row['content'])
+                    conn.execute("UPDATE outputs SET blob_hash = ?, content = '' WHERE id = ?", (blob_hash, row['id']))
+            compacted += len(rows)
+            if len(rows) < batch_size:
+                break
+
+        with self._lock, self._connect() as conn:
+            orphans = conn.execute(
+                "DELETE FROM blobs WHERE NOT EXISTS (SELECT 1 FROM outputs o WHERE o.blob_hash = blobs.hash)"
+            ).rowcount
+
+        # VACUUM rewrites the whole file, so only do it once a quarter of it is free
+        vacuumed = False
+        with self._lock, self._connect() as conn:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            total_pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            if total_pages and free_pages * 4 >= total_pages:
+                conn.execute("VACUUM")
+                vacuumed = True
+        return {'compacted': compacted, 'orphan_blobs_removed': orphans, 'vacuumed': vacuumed}
+
+    def apply_retention(self, days: float, batch_size: int = 500) -> int:
+        """
+        Remove outputs created more than `days` days ago.
+
+        Returns:
+            int: Number of outputs removed
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec="microseconds")
+        removed = 0
+        while True:
+            with self._connect() as conn:
+                ids = [row[0] for row in conn.execute(
+                    "SELECT id FROM outputs WHERE created_at < ? LIMIT ?", (cutoff, batch_size)
+                )]
+            if not ids:
+                break
+            removed += self.delete(ids)
+        if removed:
+            logger.info(f"Retention: removed {removed} outputs older than {days:g} days")
+        return removed
+
+    def maintain(self, retention_days: Optional[float] = None) -> Dict[str, Any]:
+        """
+        One maintenance pass: retention, then compaction.
+
+        Args:
+            retention_days (float): Age limit in days (default:
+                settings.ARCHIVE_RETENTION_DAYS; 0 keeps everything)
+
+        Returns:
+            dict: What the pass did, plus storage_stats()
+        """
+        started = time.time()
+        if retention_days is None:
+            retention_days = settings.ARCHIVE_RETENTION_DAYS
+        expired = self.apply_retention(retention_days) if retention_days > 0 else 0
+        result = {'expired': expired, **self.compact()}
+        result['stats'] = self.storage_stats()
+        result['duration_seconds'] = round(time.time() - started, 2)
+        stats = result['stats']
+        logger.info(
+            f"Archive maintenance: {result['compacted']} compacted, {expired} expired, "
+            f"{result['orphan_blobs_removed']} orphan blobs removed; {stats['outputs']} outputs in "
+            f"{stats['stored_bytes']:,} bytes ({stats['saved_percent']}% saved) in {result['duration_seconds']}s"
+        )
+        return result
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """
+        Disk usage of the stored text and what deduplication and compression save.
+
+        logical_bytes is what one uncompressed copy per output would take;
+        stored_bytes is what the blobs (and any not-yet-compacted inline
+        text) actually take.
+        """
+        with self._connect() as conn:
+            outputs, inline, logical = conn.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(o.blob_hash IS NULL), 0), "
+                "COALESCE(SUM(COALESCE(b.size, LENGTH(CAST(o.content AS BLOB)))), 0) "
+                "FROM outputs o LEFT JOIN blobs b ON b.hash = o.blob_hash"
+            ).fetchone()
+            inline_bytes = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM outputs WHERE blob_hash IS NULL"
+            ).fetchone()[0]
+            blobs, unique_bytes, blob_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+            codec_counts = dict(conn.execute("SELECT codec, COUNT(*) FROM blobs GROUP BY codec").fetchall())
+        stored = blob_bytes + inline_bytes
+        file_bytes = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                         if os.path.exists(self.path + suffix))
+        return {
+            'outputs': outputs,
+            'unique_texts': blobs,
+            'inline_outputs': inline,
+            'logical_bytes': logical,
+            'deduplicated_bytes': unique_bytes + inline_bytes,
+            'stored_bytes': stored,
+            'saved_bytes': logical - stored,
+            'saved_percent': round(100 * (logical - stored) / logical, 1) if logical else 0.0,
+            'codecs': codec_counts,
+            'file_bytes': file_bytes,
+        }
+
+    def _maintenance_loop(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"Archive maintenance failed: {e}")
+
+    def start_maintenance(self, interval: float) -> 'OutputArchive':
+        """Run maintain() every `interval` seconds on a background thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._maintenance_loop, args=(interval,), name="archive-maintenance", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop_maintenance(self) -> None:
+        """Stop the background maintenance thread."""
+        self._stopped.set()
+
+
+_WORD = re.compile(r"\w+\*?")
+
+
+def _query_terms(query: str) -> List[str]:
+    return _WORD.findall(query or "")
+
+
+def fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query.
+
+    Every word is quoted, so punctuation and FTS operators typed by a
+    teacher (quotes, "AND", "-", ":") can't cause a syntax error.
+    """
+    terms = []
+    for term in _query_terms(query):
+        if term.endswith("*"):
+            terms.append(f'"{term[:-1]}"*')
+        else:
+            terms.append(f'"{term}"')
+    return " ".join(terms)
+
+
+def snippet(content: str, terms: List[str], width: int = 200) -> str:
+    """
+    Short excerpt of content around the first occurrence of any term.
+
+    The FTS index is contentless, so FTS5's snippet() has no text to work
+    with; this scans the stored content instead (only for returned rows).
+    """
+    text = " ".join(content.split())
+    lowered = text.casefold()
+    positions = []
+    for term in terms:
+        # Match the start of the word; good enough for stemmed variants
+        stem = term.rstrip("*").casefold()
+        if len(stem) > 4:
+            stem = stem[:-2]
+        found = lowered.find(stem)
+        if found >= 0:
+            positions.append(found)
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    excerpt = text[start:start + width]
+    if start > 0:
+        excerpt = "…" + excerpt
+    if start + width < len(text):
+        excerpt += "…"
+    return excerpt
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> OutputArchive:
+    """Return the process-wide output archive (created on first use, with its maintenance thread)."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = OutputArchive()
+            if settings.ARCHIVE_MAINTENANCE_INTERVAL > 0:
+                _archive.start_maintenance(settings.ARCHIVE_MAINTENANCE_INTERVAL)
+        return _archive
+
+
+# <name>_<YYYYmmdd>_<HHMMSS>[_<n>].txt, as written by save_to_file() (_<n> on a name collision)
+_OUTPUT_FILE = re.compile(r"^(?P<name>.+)_(?P<date>\d{8})_(?P<time>\d{6})(?:_\d+)?\.txt$")
+
+
+def _iter_output_files(output_dir: str) -> Iterator[Dict[str, Any]]:
+    for folder, _, files in os.walk(output_dir):
+        kind = os.path.relpath(folder, output_dir)
+        kind = "general" if kind == "." else kind.replace(os.sep, "/")
+        for filename in sorted(files):
+            if not filename.endswith(".txt"):
+                continue
+            path = os.path.join(folder, filename)
+            match = _OUTPUT_FILE.match(filename)
+            if match:
+                name = match.group('name')
+                created_at = datetime.strptime(match.group('date') + match.group('time'), "%Y%m%d%H%M%S").isoformat()
+            else:
+                name = filename[:-len(".txt")]
+                created_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+            yield {
+                'kind': kind,
+                'name': name,
+                'created_at': created_at,
+                'content': content,
+                'source_path': os.path.abspath(path),
+            }
+
+
+def migrate_output_files(
+    output_dir: Optional[str] = None,
+    archive: Optional[OutputArchive] = None,
+    batch_size: int = 500,
+    remove: bool = False,
+) -> Dict[str, int]:
+    """
+    Import existing .txt outputs into the archive.
+
+    The subfolder becomes the kind and the filename timestamp becomes
+    created_at. Student, subject and period can't be recovered reliably
+    from the lowercased filenames, so only the name is kept. Files already
+    imported are skipped, so the migration can be re-run.
+
+    Args:
+        output_dir (str): Folder to scan (default: settings.OUTPUT_DIR)
+        archive (OutputArchive): Target archive (default: the shared one)
+        batch_size (int): Files per insert transaction
+        remove (bool): Delete each file once it's archived
+
+    Returns:
+        dict: files scanned and rows inserted
+    """
+    output_dir = output_dir or settings.OUTPUT_DIR
+    archive = archive or get_archive()
+    scanned = 0
+    inserted = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        inserted += archive.add_many(batch, batch_size=batch_size)
+        if remove:
+            for entry in batch:
+                os.remove(entry['source_path'])
+        batch.clear()
+
+    for entry in _iter_output_files(output_dir):
+        scanned += 1
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    logger.info(f"Migrated outputs from {output_dir}: {scanned} files scanned, {inserted} archived")
+    return {'scanned': scanned, 'inserted': inserted}
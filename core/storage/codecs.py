@@ -0,0 +1,77 @@
+"""
+Compression codecs for archived content.
+zstd is used when the zstandard package is installed, zlib otherwise; every
+blob records its codec so archives stay readable if the setting changes.
+"""
+import zlib
+from typing import Tuple
+
+RAW = "raw"
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def resolve(name: str) -> str:
+    """
+    Map a configured codec name to one that can be used here.
+
+    "auto" picks zstd if zstandard is installed, else zlib; "none" stores
+    text uncompressed.
+
+    Raises:
+        ImportError: If "zstd" is requested but zstandard isn't installed
+        ValueError: If the name is unknown
+    """
+    name = (name or "auto").lower()
+    if name == "auto":
+        return ZSTD if _zstandard() else ZLIB
+    if name == "none":
+        return RAW
+    if name == ZSTD and not _zstandard():
+        raise ImportError("zstd compression requires zstandard. Install it with: pip install zstandard")
+    if name not in (RAW, ZLIB, ZSTD):
+        raise ValueError(f"Unknown archive compression: {name}")
+    return name
+
+
+def compress(text: str, codec: str) -> Tuple[str, bytes]:
+    """
+    Encode and compress text.
+
+    Returns:
+        tuple: (codec actually used, data). Falls back to raw when
+        compression wouldn't save space (very short texts).
+    """
+    data = text.encode("utf-8")
+    if codec == ZSTD:
+        packed = _zstandard().compress(data, ZSTD_LEVEL)
+    elif codec == ZLIB:
+        packed = zlib.compress(data, ZLIB_LEVEL)
+    else:
+        return RAW, data
+    if len(packed) >= len(data):
+        return RAW, data
+    return codec, packed
+
+
+def decompress(codec: str, data: bytes) -> str:
+    """Inverse of compress()."""
+    if codec == ZSTD:
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise ImportError("This archive has zstd-compressed outputs. Install zstandard to read them: pip install zstandard")
+        data = zstandard.decompress(data)
+    elif codec == ZLIB:
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
@@ -0,0 +1,116 @@
+"""
+Bulk export of archived outputs.
+Streams matching outputs from the archive into a zip file one at a time,
+either as one file per output or as one concatenated document per class,
+so exporting a whole term's reports never holds them all in memory.
+"""
+import re
+import time
+import zipfile
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from core.storage.archive import OutputArchive, get_archive
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+FILES = "files"
+CLASSES = "classes"
+LAYOUTS = (FILES, CLASSES)
+
+# Outputs of one class are adjacent, so a class document can be written in one go
+EXPORT_ORDER = ('grade', 'teacher', 'kind', 'student', 'created_at', 'id')
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def _safe(value: Any, default: str) -> str:
+    """Filesystem-safe name component."""
+    text = _UNSAFE.sub("_", str(value or "").strip()).strip("_.")
+    return text or default
+
+
+def class_name(output: Dict[str, Any]) -> str:
+    """Class an output belongs to: grade and teacher, e.g. "Grade_3-Mrs._Smith"."""
+    parts = [_safe(output.get('grade'), ""), _safe(output.get('teacher'), "")]
+    return "-".join(part for part in parts if part) or "Unassigned"
+
+
+def _file_name(output: Dict[str, Any]) -> str:
+    label = output.get('student') or output.get('name') or output['kind']
+    return f"{class_name(output)}/{_safe(label, 'output')}_{_safe(output['kind'], 'output')}_{output['id']}.txt"
+
+
+def _document_entry(output: Dict[str, Any]) -> str:
+    heading = " | ".join(str(value) for value in [
+        output.get('student') or output.get('name'), output.get('subject'), output.get('period'),
+        output['created_at'][:10],
+    ] if value)
+    return f"{'=' * 72}\n{heading}\n{'=' * 72}\n\n{output['content'].strip()}\n\n"
+
+
+def export_outputs(
+    target: Union[str, BinaryIO],
+    layout: str = FILES,
+    archive: Optional[OutputArchive] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    **filters,
+) -> Dict[str, Any]:
+    """
+    Write matching outputs into a zip file.
+
+    Args:
+        target: Path or writable binary file object for the zip
+        layout (str): "files" (one .txt per output, in a folder per class)
+            or "classes" (one concatenated .txt per class)
+        archive (OutputArchive): Source archive (default: the shared one)
+        since (str): Only outputs created at or after this ISO timestamp
+        until (str): Only outputs created before this ISO timestamp
+        **filters: Exact matches on kind, student, subject, period, teacher, grade
+
+    Returns:
+        dict: outputs exported, zip entries written, uncompressed bytes
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown export layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    archive = archive or get_archive()
+    started = time.time()
+    exported = 0
+    entries = 0
+    written = 0
+
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        document = None
+        current_class = None
+        documents = set()
+        try:
+            for output in archive.iter_outputs(since, until, order_by=EXPORT_ORDER, **filters):
+                if layout == FILES:
+                    data = output['content'].encode("utf-8")
+                    with zf.open(_file_name(output), "w") as entry:
+                        entry.write(data)
+                    entries += 1
+                else:
+                    name = class_name(output)
+                    if name != current_class:
+                        if document is not None:
+                            document.close()
+                        # Distinct grades/teachers can reduce to the same safe name
+                        entry_name = name
+                        while entry_name in documents:
+                            entry_name += "_"
+                        documents.add(entry_name)
+                        document = zf.open(f"{entry_name}.txt", "w")
+                        current_class = name
+                        entries += 1
+                    data = _document_entry(output).encode("utf-8")
+                    document.write(data)
+                exported += 1
+                written += len(data)
+        finally:
+            if document is not None:
+                document.close()
+
+    logger.info(f"Exported {exported} outputs into {entries} files ({layout}) in {time.time() - started:.1f}s")
+    return {'exported': exported, 'files': entries, 'bytes': written, 'layout': layout}
@@ -0,0 +1,306 @@
+"""
+Time-indexed score store.
+Snapshots every roster sync into a local SQLite database indexed by
+(student, subject, term), keeping an append-only change log plus a table
+of latest values so trend queries never rescan old snapshots.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from config import settings
+from utils.helpers import hash_text, setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    ordinal INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    term TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    source TEXT,
+    records INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    fingerprint TEXT
+);
+-- Append-only log: one row per (student, subject, term) whose value changed
+CREATE TABLE IF NOT EXISTS score_history (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    student TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    term TEXT NOT NULL,
+    score REAL,
+    grade TEXT,
+    teacher TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_score_history_key ON score_history (student, subject, term);
+-- Latest value per key, what trend queries read
+CREATE TABLE IF NOT EXISTS scores (
+    student TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    term TEXT NOT NULL,
+    score REAL,
+    grade TEXT,
+    teacher TEXT,
+    snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (student, subject, term)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scores_term ON scores (term);
+"""
+
+KEY_COLUMNS = ['student', 'subject', 'term']
+VALUE_COLUMNS = ['score', 'grade', 'teacher']
+
+
+def _records_to_frame(records, term: str) -> pd.DataFrame:
+    """Normalize Students-sheet records into store columns."""
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    if df.empty or 'Name' not in df.columns or 'Subject' not in df.columns:
+        return pd.DataFrame(columns=KEY_COLUMNS + VALUE_COLUMNS)
+
+    frame = pd.DataFrame({
+        'student': df['Name'].astype(str).str.strip(),
+        'subject': df['Subject'].astype(str).str.strip(),
+        'term': df['Term'].astype(str).str.strip() if 'Term' in df.columns else term,
+        'score': pd.to_numeric(df['Score'], errors='coerce') if 'Score' in df.columns else float('nan'),
+        'grade': df['Grade'].astype(str) if 'Grade' in df.columns else None,
+        'teacher': df['Teacher'].astype(str) if 'Teacher' in df.columns else None,
+    })
+    frame = frame[(frame['student'] != '') & (frame['subject'] != '')]
+    # A sheet can list the same student/subject twice; the last row wins
+    return frame.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+
+
+def _fingerprint(frame: pd.DataFrame) -> str:
+    """Hash of a normalized roster's content, independent of row order."""
+    return hash_text(frame.sort_values(KEY_COLUMNS).to_csv(index=False))
+
+
+class ScoreStore:
+    """
+    SQLite-backed score history.
+
+    Each snapshot only writes the (student, subject, term) rows whose value
+    changed since the previous snapshot. A sync whose content matches the
+    latest snapshot's fingerprint writes nothing, so latest_snapshot_id()
+    (and everything cached on it) only moves when the roster changes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.SCORE_HISTORY_DB
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Stores created before fingerprints were recorded
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(snapshots)")}
+            if 'fingerprint' not in columns:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN fingerprint TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection that commits on success and always closes."""
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _term_ordinals(self, conn: sqlite3.Connection, terms: Iterable[str]) -> None:
+        """Register unseen terms after the latest known one, in the order given."""
+        known = dict(conn.execute("SELECT term, ordinal FROM terms").fetchall())
+        next_ordinal = max(known.values(), default=0) + 1
+        for term in terms:
+            if term not in known:
+                conn.execute("INSERT INTO terms (term, ordinal) VALUES (?, ?)", (term, next_ordinal))
+                known[term] = next_ordinal
+                next_ordinal += 1
+
+    def set_term_order(self, terms: List[str]) -> None:
+        """
+        Set the chronological order of terms explicitly.
+
+        Args:
+            terms (list[str]): Term labels, oldest first
+        """
+        with self._lock, self._connect() as conn:
+            for ordinal, term in enumerate(terms, start=1):
+                conn.execute(
+                    "INSERT INTO terms (term, ordinal) VALUES (?, ?) "
+                    "ON CONFLICT(term) DO UPDATE SET ordinal = excluded.ordinal",
+                    (term, ordinal),
+                )
+
+    def snapshot(self, records, term: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Record a roster sync.
+
+        Args:
+            records: list[dict] from read_student_data(), or a DataFrame
+            term (str): Term for records without a Term column (default: settings.CURRENT_TERM)
+            source (str): Where the records came from (e.g. a sheet ID)
+
+        Returns:
+            dict: snapshot_id, records and changed row counts (the latest
+            snapshot, with changed 0, if the roster is unchanged)
+        """
+        term = term or settings.CURRENT_TERM
+        frame = _records_to_frame(records, term)
+        terms = list(dict.fromkeys(frame['term'].tolist())) or [term]
+        fingerprint = _fingerprint(frame)
+
+        with self._lock, self._connect() as conn:
+            latest = conn.execute("SELECT id, fingerprint FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+            if latest is not None and latest[1] == fingerprint:
+                logger.debug(f"Roster unchanged since score snapshot {latest[0]}; nothing recorded")
+                return {'snapshot_id': latest[0], 'records': len(frame), 'changed': 0}
+
+            self._term_ordinals(conn, terms)
+
+            placeholders = ",".join("?" for _ in terms)
+            current = pd.read_sql_query(
+                f"SELECT student, subject, term, score, grade, teacher FROM scores WHERE term IN ({placeholders})",
+                conn,
+                params=terms,
+            )
+            merged = frame.merge(current, on=KEY_COLUMNS, how='left', suffixes=('', '_old'), indicator=True)
+            changed = merged['_merge'] == 'left_only'
+            for column in VALUE_COLUMNS:
+                new, old = merged[column], merged[f'{column}_old']
+                changed |= ~((new == old) | (new.isna() & old.isna()))
+            changes = merged.loc[changed, KEY_COLUMNS + VALUE_COLUMNS]
+
+            cursor = conn.execute(
+                "INSERT INTO snapshots (term, taken_at, source, records, changed, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (",".join(terms), datetime.now().isoformat(timespec="seconds"), source, len(frame), len(changes),
+                 fingerprint),
+            )
+            snapshot_id = cursor.lastrowid
+
+            rows = [
+                (snapshot_id, r.student, r.subject, r.term,
+                 None if pd.isna(r.score) else float(r.score), r.grade, r.teacher)
+                for r in changes.itertuples(index=False)
+            ]
+            conn.executemany(
+                "INSERT INTO score_history (snapshot_id, student, subject, term, score, grade, teacher) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                "INSERT INTO scores (snapshot_id, student, subject, term, score, grade, teacher) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(student, subject, term) DO UPDATE SET "
+                "score = excluded.score, grade = excluded.grade, "
+                "teacher = excluded.teacher, snapshot_id = excluded.snapshot_id",
+                rows,
+            )
+
+        logger.info(f"Score snapshot {snapshot_id}: {len(frame)} records, {len(changes)} changed")
+        return {'snapshot_id': snapshot_id, 'records': len(frame), 'changed': len(changes)}
+
+    def latest_snapshot_id(self) -> int:
+        """Return the ID of the most recent snapshot (0 if none)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM snapshots").fetchone()
+        return row[0]
+
+    def load_scores(self, terms: Optional[List[str]] = None, students: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load the latest score for each (student, subject, term).
+
+        Args:
+            terms (list[str]): Only these terms (optional)
+            students (list[str]): Only these students (optional)
+
+        Returns:
+            pd.DataFrame: student, subject, term, term_order, score, grade, teacher
+        """
+        query = (
+            "SELECT s.student, s.subject, s.term, t.ordinal AS term_order, s.score, s.grade, s.teacher "
+            "FROM scores s JOIN terms t ON t.term = s.term"
+        )
+        clauses, params = [], []
+        if terms:
+            clauses.append(f"s.term IN ({','.join('?' for _ in terms)})")
+            params.extend(terms)
+        if students:
+            clauses.append(f"s.student IN ({','.join('?' for _ in students)})")
+            params.extend(students)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def history(self, student: str, subject: Optional[str] = None) -> pd.DataFrame:
+        """
+        Return every recorded change for a student, oldest first.
+
+        Args:
+            student (str): Student name
+            subject (str): Only this subject (optional)
+
+        Returns:
+            pd.DataFrame: snapshot_id, taken_at, subject, term, score, grade, teacher
+        """
+        query = (
+            "SELECT h.snapshot_id, p.taken_at, h.subject, h.term, h.score, h.grade, h.teacher "
+            "FROM score_history h JOIN snapshots p ON p.id = h.snapshot_id WHERE h.student = ?"
+        )
+        params = [student]
+        if subject:
+            query += " AND h.subject = ?"
+            params.append(subject)
+        query += " ORDER BY h.snapshot_id"
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_score_store() -> ScoreStore:
+    """Return the process-wide score store (created on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ScoreStore()
+        return _store
+
+
+def record_sync(records, term: Optional[str] = None, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Snapshot a roster sync if score history is enabled.
+
+    Never raises: history is best-effort and must not break data loading.
+
+    Args:
+        records: list[dict] from read_student_data(), or a DataFrame
+        term (str): Term for records without a Term column
+        source (str): Where the records came from
+
+    Returns:
+        dict: Snapshot summary, or None if disabled or failed
+    """
+    if not settings.SCORE_HISTORY_ENABLED or records is None or len(records) == 0:
+        return None
+    try:
+        return get_score_store().snapshot(records, term=term, source=source)
+    except Exception as e:
+        logger.error(f"Failed to record score snapshot: {e}")
+        return None
@@ -6,6 +6,7 @@ Version: 2.0 - With Analytics Dashboard and Multi-Teacher Support
 import streamlit as st
 import sys
 import os
+import time
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -18,48 +19,74 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Import core modules
-from core.logic.lesson_generator import generate_lesson
-from core.logic.report_generator import generate_report
-from core.logic.parent_writer import generate_parent_message
-from core.logic.analytics import (
-    calculate_class_statistics,
-    get_subject_performance,
-    get_grade_performance,
-    get_top_students,
-    get_struggling_students,
-    get_behavior_distribution,
-    get_teacher_performance
-)
-from integrations.google_sheets import read_student_data, get_student_by_name, write_report_to_sheet
+# Import core modules. Only lightweight ones are imported here; generators,
+# analytics (pandas) and the Sheets client (gspread, google-auth) are imported
+# by the pages that use them, so a cold start and the Home page don't pay for
+# them. benchmarks/import_budget.py keeps this list honest.
+from config.settings import start_watching
+from integrations.roster_service import get_roster_service
+from utils.cache import get_refresh_cooldown
+from utils.jobs import get_job_queue, cancel_requested, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+from utils.metrics import start_metrics_server
+from utils.profiling import profile_rerun
+from utils.warmup import start_warmup
+
+# Sampled profile of this rerun while profiling is on (PROFILING_ENABLED or the
+# Admin page); it is written when the script ends, even via st.stop()/st.rerun()
+rerun_profile = profile_rerun("dashboard")
+
+# Warm caches and clients in the background (once per process)
+warmup = start_warmup()
+# Prometheus endpoint on a local port (once per process)
+metrics_url = start_metrics_server()
+# Apply .env / secrets.toml edits without a restart (once per process)
+start_watching()
 
 # =====================================================
 # PERFORMANCE OPTIMIZATION: Data Caching
 # =====================================================
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+# Roster data is cached by the RosterService. Manual refreshes are rate
+# limited per (spreadsheet, tab) across all sessions, so a burst of
+# "Refresh" clicks reloads the sheet once.
+refresh_cooldown = get_refresh_cooldown()
+ROSTER_TAB = "Students"
+
+
+def roster_key():
+    """Cache key for the configured spreadsheet's Students tab."""
+    from config import settings
+    return (settings.GOOGLE_SHEET_ID, ROSTER_TAB)
+
+
+def roster_snapshot():
+    """
+    Current immutable roster snapshot from the shared data service.
+    A background thread keeps it fresh, so this never waits on Sheets
+    (except for the very first load in the process).
+    """
+    return get_roster_service(sheet_name=ROSTER_TAB).snapshot()
+
+
 def load_students_cached():
     """
-    Load student data with caching to avoid repeated API calls.
-    Cache refreshes every 5 minutes.
-    Returns empty list if not configured or on error.
+    Load student data from the shared roster service.
+    Returns a tuple of read-only records, or an empty list if not configured or on error.
     """
     try:
         # Check if Google Sheets is configured (only need SHEET_ID)
         from config import settings
         if not settings.GOOGLE_SHEET_ID:
             return []
-        data = read_student_data()
-        return data if data else []
+        return roster_snapshot().records
     except Exception as e:
         # Silently return empty list on error - don't crash the app
         st.error(f"Failed to load students: {str(e)}")
         return []
 
-@st.cache_data(ttl=300)
 def get_student_cached(student_name):
     """
-    Get individual student data with caching.
+    Get individual student data from the roster snapshot.
     Returns None if not found or not configured.
     """
     try:
@@ -67,13 +94,218 @@ def get_student_cached(student_name):
         from config import settings
         if not settings.GOOGLE_SHEET_ID:
             return None
-        student = get_student_by_name(student_name)
-        return student
+        for record in roster_snapshot().records:
+            if str(record.get("Name", "")).lower() == student_name.lower():
+                return dict(record)
+        return None
     except Exception as e:
         # Silently return None on error
         st.error(f"Failed to fetch student: {str(e)}")
         return None
 
+def refresh_roster():
+    """
+    Reload this spreadsheet's roster now.
+    Returns False (and does nothing) if it was refreshed within the cooldown.
+    Raises RuntimeError if the reload failed; the cached roster is kept and
+    the refresh can be retried straight away.
+    """
+    if not refresh_cooldown.request_refresh(roster_key()):
+        return False
+    service = get_roster_service(sheet_name=ROSTER_TAB)
+    service.refresh(wait=True)
+    if service.last_error:
+        refresh_cooldown.release(roster_key())
+        raise RuntimeError(service.last_error)
+    return True
+
+# =====================================================
+# PAGINATED STUDENT VIEWS
+# =====================================================
+# Large rosters are served from a pre-sorted index built once per data
+# snapshot and filter; each render only slices one page of rows.
+
+
+def roster_index(teacher="All Teachers", grade="All Grades"):
+    """Pre-sorted index of the filtered roster, built once per snapshot."""
+    from core.logic import roster_views
+    return roster_views.roster_index(roster_snapshot(), teacher, grade)
+
+
+def student_summary(teacher="All Teachers", grade="All Grades"):
+    """One summary row per student, indexed by name, built once per snapshot and filter."""
+    from core.logic import roster_views
+    return roster_views.student_summary(roster_snapshot(), teacher, grade)
+
+
+def quick_stats():
+    """Home page headline numbers, computed once per snapshot."""
+    from core.logic import roster_views
+    return roster_views.quick_stats(roster_snapshot())
+
+
+def page_number(key, pages):
+    """Page selector whose value stays within range when the result set shrinks."""
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    return st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=key)
+
+
+def student_picker(label, index, key):
+    """Searchable student selectbox capped at MAX_SELECT_OPTIONS names."""
+    from config import settings
+    query = st.text_input("🔎 Search students", key=f"{key}_search", placeholder="Type part of a name")
+    matches = index.name_page(query, page=1, page_size=settings.MAX_SELECT_OPTIONS)
+    if matches.total > len(matches.items):
+        st.caption(f"Showing the first {len(matches.items)} of {matches.total} matches. Refine the search to narrow it down.")
+    return st.selectbox(label, matches.items, key=key)
+
+# =====================================================
+# BACKGROUND GENERATION JOBS
+# =====================================================
+# Generation runs on the process-wide job queue instead of inside the
+# script thread, so widget interactions don't cancel a model call and
+# teachers can queue several items. Sessions keep only their job IDs.
+
+JOB_POLL_SECONDS = 3
+JOB_STATUS_ICONS = {
+    QUEUED: "⏳",
+    RUNNING: "✨",
+    SUCCEEDED: "✅",
+    FAILED: "❌",
+    CANCELLED: "🚫",
+}
+
+
+def queue_job(func, *args, kind, label, **kwargs):
+    """Submit a generation job and remember its ID for this session."""
+    job_id = get_job_queue().submit(func, *args, kind=kind, label=label, **kwargs)
+    st.session_state.jobs.append(job_id)
+    return job_id
+
+
+def generate_report_job(student_name, period, subject, performance_notes, behavior_notes, save_to_sheets,
+                        grade=None, teacher=None):
+    """Generate a report and optionally write it to Sheets. Runs on a worker thread (no st.* calls)."""
+    from core.logic.report_generator import generate_report
+    from integrations.google_sheets import write_report_to_sheet
+    result = generate_report(student_name, period, subject, performance_notes, behavior_notes,
+                             grade=grade, teacher=teacher)
+    # Cancelled while the model ran: don't write a report the teacher discarded
+    if result['success'] and save_to_sheets and not cancel_requested():
+        result['sheets_status'] = write_report_to_sheet(result['report'], student_name)
+    return result
+
+
+def show_jobs(kind, render_result):
+    """
+    Show this session's jobs of one kind, newest first.
+    While any are queued or running, the panel polls itself every few seconds.
+    """
+    def session_jobs():
+        return [job for job in get_job_queue().jobs(st.session_state.jobs) if job['kind'] == kind]
+
+    active = any(job['status'] in (QUEUED, RUNNING) for job in session_jobs())
+
+    @st.fragment(run_every=JOB_POLL_SECONDS if active else None)
+    def panel():
+        jobs = session_jobs()
+        if not jobs:
+            return
+        st.markdown("---")
+        st.markdown("### 🗂️ Your Generation Jobs")
+        for position, job in enumerate(reversed(jobs)):
+            icon = JOB_STATUS_ICONS.get(job['status'], "•")
+            in_progress = job['status'] in (QUEUED, RUNNING)
+            status = "cancelling" if in_progress and job['cancel_requested'] else job['status']
+            with st.expander(f"{icon} {job['label']} ({status})", expanded=in_progress or position == 0):
+                if status == "cancelling":
+                    st.caption("Cancelling: the current model call will finish and its result will be discarded")
+                elif in_progress:
+                    if job['status'] == QUEUED:
+                        st.caption(f"Waiting for a worker ({get_job_queue().pending()} queued)")
+                    else:
+                        st.caption(f"Generating for {time.time() - job['started_at']:.0f}s...")
+                    if st.button("🚫 Cancel", key=f"cancel_{job['id']}"):
+                        get_job_queue().cancel(job['id'])
+                        st.rerun()
+                elif job['status'] == FAILED:
+                    st.error(f"❌ An error occurred: {job['error']}")
+                elif job['status'] == CANCELLED:
+                    st.info("Cancelled")
+                elif job['result'] and job['result'].get('success'):
+                    render_result(job['result'], job['id'])
+                else:
+                    st.error(f"❌ Error: {(job['result'] or {}).get('error', 'Unknown error')}")
+        # Everything finished: one full rerun turns polling off
+        if active and not any(job['status'] in (QUEUED, RUNNING) for job in jobs):
+            st.rerun()
+
+    panel()
+
+
+def render_lesson_result(result, job_id):
+    st.markdown("### 📄 Your Lesson Note:")
+    st.markdown(result['lesson_note'])
+    
+    # Download button
+    metadata = result['metadata']
+    st.download_button(
+        label="⬇️ Download as Text File",
+        data=result['lesson_note'],
+        file_name=f"lesson_{metadata['subject']}_{metadata['topic']}.txt".replace(" ", "_"),
+        mime="text/plain",
+        key=f"download_{job_id}"
+    )
+    
+    st.info(f"💾 Saved to: `{metadata['output_file']}`")
+
+
+def render_report_result(result, job_id):
+    st.markdown("### 📄 Progress Report:")
+    st.markdown(result['report'])
+    
+    if 'sheets_status' in result:
+        from integrations.google_sheets import REPORT_QUEUED, REPORT_WRITTEN
+        if result['sheets_status'] == REPORT_WRITTEN:
+            st.success("✅ Report saved to Google Sheets!")
+        elif result['sheets_status'] == REPORT_QUEUED:
+            st.warning("⚠️ Could not save to Google Sheets right now; the report is queued and will be retried automatically")
+        else:
+            st.error("❌ Report was not saved to Google Sheets (check GOOGLE_SHEET_ID and the Sheets outbox on the Admin page)")
+    
+    # Download button
+    metadata = result['metadata']
+    st.download_button(
+        label="⬇️ Download Report",
+        data=result['report'],
+        file_name=f"report_{metadata['student_name']}_{metadata['period']}.txt".replace(" ", "_"),
+        mime="text/plain",
+        key=f"download_{job_id}"
+    )
+    
+    st.info(f"💾 Saved to: `{metadata['output_file']}`")
+
+
+def render_parent_result(result, job_id):
+    st.markdown("### 💌 Your Message:")
+    st.markdown(result['message'])
+    
+    # Copy to clipboard helper
+    st.code(result['message'], language=None)
+    
+    # Download button
+    metadata = result['metadata']
+    st.download_button(
+        label="⬇️ Download Message",
+        data=result['message'],
+        file_name=f"parent_message_{metadata['purpose']}_{metadata['child_name']}.txt".replace(" ", "_"),
+        mime="text/plain",
+        key=f"download_{job_id}"
+    )
+    
+    st.info(f"💾 Saved to: `{metadata['output_file']}`")
+
 # Custom CSS
 st.markdown("""
     <style>
@@ -103,6 +335,8 @@ st.markdown("""
 # Initialize session state
 if 'generated_content' not in st.session_state:
     st.session_state.generated_content = None
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
 
 # Header
 st.markdown('<h1 class="main-header">🎓 AI Teaching Assistant</h1>', unsafe_allow_html=True)
@@ -114,13 +348,7 @@ st.sidebar.title("📋 Navigation")
 # Check if Google Sheets is configured to show/hide View Students
 from config import settings
 # On Streamlit Cloud, credentials come from st.secrets, not GOOGLE_SHEETS_CREDENTIALS
-try:
-    if hasattr(st, 'secrets') and 'gcp_service_account' in st.secrets:
-        sheets_configured = bool(settings.GOOGLE_SHEET_ID)
-    else:
-        sheets_configured = bool(settings.GOOGLE_SHEETS_CREDENTIALS and settings.GOOGLE_SHEET_ID)
-except:
-    sheets_configured = bool(settings.GOOGLE_SHEETS_CREDENTIALS and settings.GOOGLE_SHEET_ID)
+sheets_configured = settings.get_settings().sheets_configured
 
 # Teacher selector - Always show if sheets are configured
 st.sidebar.markdown("### 👨‍🏫 Select Teacher")
@@ -130,12 +358,12 @@ if 'selected_teacher' not in st.session_state:
 if sheets_configured:
     try:
         # Load student data to get unique teachers
-        import pandas as pd
         students_data = load_students_cached()
         if students_data and len(students_data) > 0:
-            df_students = pd.DataFrame(students_data)
-            if 'Teacher' in df_students.columns:
-                teachers = sorted(df_students['Teacher'].unique().tolist())
+            from core.logic import roster_views
+            snapshot = roster_snapshot()
+            if 'Teacher' in roster_views.roster_frame(snapshot).columns:
+                teachers = roster_views.teachers(snapshot)
                 if teachers:  # Only show selector if we have teachers
                     selected_teacher = st.sidebar.selectbox(
                         "View as:",
@@ -160,6 +388,9 @@ if sheets_configured:
     page_options = ["🏠 Home", "📊 Analytics", "📝 Lesson Generator", "📊 Report Generator", "💌 Parent Message", "👥 View Students"]
 else:
     page_options = ["🏠 Home", "📝 Lesson Generator", "📊 Report Generator", "💌 Parent Message"]
+if settings.ARCHIVE_ENABLED:
+    page_options.append("🔎 Search Outputs")
+page_options.append("⚙️ Admin")
 
 page = st.sidebar.radio(
     "Choose a tool:",
@@ -167,7 +398,17 @@ page = st.sidebar.radio(
 )
 
 st.sidebar.markdown("---")
-st.sidebar.info("💡 **Tip**: All generated content is automatically saved to the `data/output/` folder!")
+st.sidebar.info("💡 **Tip**: All generated content is automatically saved to the output archive!")
+
+# Warm-up readiness
+if warmup:
+    warmup_status = warmup.status()
+    if not warmup_status['ready']:
+        st.sidebar.caption(f"⏳ Warming up ({warmup_status['finished_steps']}/{warmup_status['total_steps']} steps)...")
+    elif warmup_status['failed']:
+        st.sidebar.caption(f"⚠️ Warm-up incomplete: {', '.join(warmup_status['failed'])} failed (see logs)")
+    else:
+        st.sidebar.caption("✅ Ready")
 
 
 # HOME PAGE
@@ -201,29 +442,17 @@ if page == "🏠 Home":
     try:
         students = load_students_cached()  # Use cached data
         if students:
+            stats = quick_stats()
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                # Count unique students by name
-                unique_names = set([s.get('Name', '') for s in students if s.get('Name')])
-                st.metric("Total Students", len(unique_names))
+                st.metric("Total Students", stats['total_students'])
             
             with col2:
-                # Handle non-numeric scores safely
-                scores = []
-                for s in students:
-                    try:
-                        score = s.get('Score', 0)
-                        if score:
-                            scores.append(float(score))
-                    except (ValueError, TypeError):
-                        pass
-                avg_score = sum(scores) / len(scores) if scores else 0
-                st.metric("Average Score", f"{avg_score:.1f}")
+                st.metric("Average Score", f"{stats['average_score']:.1f}")
             
             with col3:
-                subjects = set([s.get('Subject', '') for s in students if s.get('Subject')])
-                st.metric("Subjects", len(subjects))
+                st.metric("Subjects", stats['total_subjects'])
         else:
             st.info("📊 No students loaded yet. Add students to your Google Sheet to see stats here.")
             
@@ -239,32 +468,56 @@ elif page == "📊 Analytics":
     # Add refresh button
     col1, col2, col3 = st.columns([2, 1, 1])
     with col2:
-        if st.button("🔄 Refresh Data", help="Clear cache and reload analytics", key="analytics_refresh"):
-            st.cache_data.clear()
-            st.success("Data refreshed!")
-            st.rerun()
+        if st.button("🔄 Refresh Data", help="Reload this sheet's data and analytics", key="analytics_refresh"):
+            try:
+                refreshed = refresh_roster()
+            except RuntimeError as e:
+                st.error(f"❌ Could not reload from Google Sheets, showing the last loaded data: {e}")
+            else:
+                if refreshed:
+                    st.success("Data refreshed!")
+                    st.rerun()
+                else:
+                    st.info(f"Data was just refreshed. Try again in {refresh_cooldown.cooldown_remaining(roster_key()):.0f}s.")
     
     try:
         import pandas as pd
+        from core.logic.analytics import (
+            calculate_class_statistics,
+            get_subject_performance,
+            get_grade_performance,
+            get_top_students,
+            get_struggling_students,
+            get_behavior_distribution,
+            get_teacher_performance
+        )
+        from core.logic import roster_views
         students_data = load_students_cached()
         
         if not students_data:
             st.info("📊 No data available. Add students to your Google Sheet to view analytics.")
         else:
-            df = pd.DataFrame(students_data)
+            # The frame, its fingerprint and the results are cached per snapshot
+            # + parameters, so reruns triggered by unrelated widgets don't
+            # recompute anything
+            snapshot = roster_snapshot()
+            df = roster_views.roster_frame(snapshot)
             
             # Apply teacher filter if selected
             selected_teacher = st.session_state.get('selected_teacher', 'All Teachers')
             if selected_teacher != "All Teachers" and 'Teacher' in df.columns:
-                df = df[df['Teacher'] == selected_teacher]
+                df = roster_views.roster_index(snapshot, selected_teacher).frame
                 st.info(f"👨‍🏫 Showing analytics for: **{selected_teacher}**")
             
+            def analytics(func, **params):
+                return roster_views.analytics(snapshot, func, selected_teacher, **params)
+            
             if df.empty:
                 st.warning("No data available for the selected teacher.")
             else:
                 # Overall Statistics
                 st.subheader("📈 Overall Performance")
-                stats = calculate_class_statistics(df)
+                stats = analytics(calculate_class_statistics)
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
@@ -283,7 +536,7 @@ elif page == "📊 Analytics":
                 
                 with col_left:
                     st.subheader("📚 Subject Performance")
-                    subject_perf = get_subject_performance(df)
+                    subject_perf = analytics(get_subject_performance)
                     if not subject_perf.empty:
                         st.dataframe(subject_perf, hide_index=True, use_container_width=True)
                         
@@ -294,7 +547,7 @@ elif page == "📊 Analytics":
                 
                 with col_right:
                     st.subheader("🎓 Grade Performance")
-                    grade_perf = get_grade_performance(df)
+                    grade_perf = analytics(get_grade_performance)
                     if not grade_perf.empty:
                         st.dataframe(grade_perf, hide_index=True, use_container_width=True)
                         
@@ -310,8 +563,8 @@ elif page == "📊 Analytics":
                 
                 with col_top:
                     st.subheader("🌟 Top Performers")
-                    top_n = st.slider("Show top", 3, 10, 5, key="top_slider")
-                    top_students = get_top_students(df, n=top_n)
+                    top_n = st.slider("Show top", 3, 10, roster_views.DEFAULT_TOP_N, key="top_slider")
+                    top_students = analytics(get_top_students, n=top_n)
                     if not top_students.empty:
                         st.dataframe(top_students, hide_index=True, use_container_width=True)
                     else:
@@ -319,8 +572,8 @@ elif page == "📊 Analytics":
                 
                 with col_struggling:
                     st.subheader("🎯 Students Needing Support")
-                    threshold = st.slider("Score threshold", 0, 100, 60, key="threshold_slider")
-                    struggling = get_struggling_students(df, threshold=threshold, n=top_n)
+                    threshold = st.slider("Score threshold", 0, 100, roster_views.DEFAULT_THRESHOLD, key="threshold_slider")
+                    struggling = analytics(get_struggling_students, threshold=threshold, n=top_n)
                     if not struggling.empty:
                         st.dataframe(struggling, hide_index=True, use_container_width=True)
                     else:
@@ -330,7 +583,7 @@ elif page == "📊 Analytics":
                 
                 # Behavior Distribution
                 st.subheader("😊 Behavior Overview")
-                behavior_dist = get_behavior_distribution(df)
+                behavior_dist = analytics(get_behavior_distribution)
                 if behavior_dist:
                     col1, col2 = st.columns([2, 1])
                     with col1:
@@ -347,7 +600,7 @@ elif page == "📊 Analytics":
                 if selected_teacher == "All Teachers" and 'Teacher' in df.columns:
                     st.markdown("---")
                     st.subheader("👨‍🏫 Teacher Performance Comparison")
-                    teacher_perf = get_teacher_performance(df)
+                    teacher_perf = analytics(get_teacher_performance)
                     if not teacher_perf.empty:
                         st.dataframe(teacher_perf, hide_index=True, use_container_width=True)
                         
@@ -355,6 +608,25 @@ elif page == "📊 Analytics":
                         st.bar_chart(teacher_perf.set_index('Teacher')['Average Score'])
                     else:
                         st.info("No teacher data available")
+                
+                # Term-over-term trends from the score history store
+                from config import settings
+                if settings.SCORE_HISTORY_ENABLED:
+                    st.markdown("---")
+                    st.subheader("📉 Term-over-Term Trends")
+                    from core.logic.trends import get_trend_engine
+                    min_drop = st.slider("Minimum drop (points)", 1, 30, 5, key="decline_slider")
+                    declining = get_trend_engine().declining(min_drop=min_drop)
+                    if selected_teacher != "All Teachers" and not declining.empty:
+                        declining = declining[declining['student'].isin(df['Name'].unique())]
+                    if not declining.empty:
+                        st.dataframe(
+                            declining[['student', 'term', 'average', 'previous_average', 'delta', 'falling_terms']].round(1),
+                            hide_index=True,
+                            use_container_width=True
+                        )
+                    else:
+                        st.success("No students declined since their previous term!")
     
     except Exception as e:
         st.error(f"❌ Error loading analytics: {str(e)}")
@@ -389,29 +661,14 @@ elif page == "📝 Lesson Generator":
         if not subject or not topic or not age_group or not objectives:
             st.error("❌ Please fill in all required fields (marked with *)")
         else:
-            with st.spinner("✨ Generating your lesson note..."):
-                try:
-                    result = generate_lesson(subject, topic, age_group, objectives, duration)
-                    
-                    if result['success']:
-                        st.success("✅ Lesson note generated successfully!")
-                        st.markdown("### 📄 Your Lesson Note:")
-                        st.markdown(result['lesson_note'])
-                        
-                        # Download button
-                        st.download_button(
-                            label="⬇️ Download as Text File",
-                            data=result['lesson_note'],
-                            file_name=f"lesson_{subject}_{topic}.txt".replace(" ", "_"),
-                            mime="text/plain"
-                        )
-                        
-                        st.info(f"💾 Saved to: `{result['metadata']['output_file']}`")
-                    else:
-                        st.error(f"❌ Error: {result.get('error', 'Unknown error')}")
-                        
-                except Exception as e:
-                    st.error(f"❌ An error occurred: {str(e)}")
+            from core.logic.lesson_generator import generate_lesson
+            queue_job(
+                generate_lesson, subject, topic, age_group, objectives, duration,
+                kind="lesson", label=f"{subject}: {topic}"
+            )
+            st.success("✅ Lesson note queued! You can keep working while it generates.")
+    
+    show_jobs("lesson", render_lesson_result)
 
 
 # REPORT GENERATOR PAGE
@@ -421,7 +678,7 @@ elif page == "📊 Report Generator":
     
     # Check if Google Sheets is configured
     from config import settings
-    sheets_available = bool(settings.GOOGLE_SHEETS_CREDENTIALS and settings.GOOGLE_SHEET_ID)
+    sheets_available = settings.get_settings().sheets_configured
     
     # Option to load from Google Sheets (only if configured)
     if sheets_available:
@@ -430,35 +687,30 @@ elif page == "📊 Report Generator":
         use_sheets = False
         st.info("ℹ️ Using manual input mode (Google Sheets not configured)")
     
+    student_grade = student_teacher = None
+    # Stay unset when no student is picked, so the button below stays disabled
+    student_name = period = subject = performance_notes = behavior_notes = None
+    save_to_sheets = False
     if use_sheets:
         try:
-            students = load_students_cached()  # Use cached data
-            
-            # Get unique student names
-            import pandas as pd
-            df_all = pd.DataFrame(students)
-            
             # Apply teacher filter if selected
             selected_teacher = st.session_state.get('selected_teacher', 'All Teachers')
-            if selected_teacher != "All Teachers" and 'Teacher' in df_all.columns:
-                df_all = df_all[df_all['Teacher'] == selected_teacher]
-            
-            unique_students = sorted(df_all['Name'].unique()) if 'Name' in df_all.columns else []
+            index = roster_index(selected_teacher)
             
-            selected_student = st.selectbox("Select Student *", unique_students)
+            selected_student = student_picker("Select Student *", index, key="report_student")
             
             if selected_student:
                 # Get all records for this student
-                student_records = df_all[df_all['Name'] == selected_student] if 'Name' in df_all.columns else pd.DataFrame()
+                student_records = index.student_rows(selected_student)
                 
-                # Aggregate data for the report
-                all_subjects = student_records['Subject'].tolist() if 'Subject' in student_records.columns else []
-                all_notes = student_records['Notes'].tolist() if 'Notes' in student_records.columns else []
-                all_behaviors = student_records['Behavior'].tolist() if 'Behavior' in student_records.columns else []
+                # Combine notes and behaviors across all subjects
+                from core.logic.report_generator import collect_student_notes
+                combined_notes, combined_behavior = collect_student_notes(student_records.to_dict('records'))
                 
-                # Combine notes and behaviors
-                combined_notes = "\n".join([f"- {subj}: {note}" for subj, note in zip(all_subjects, all_notes)])
-                combined_behavior = "\n".join([f"- {subj}: {beh}" for subj, beh in zip(all_subjects, all_behaviors)])
+                # Recorded with the report so the archive can be searched by grade and teacher
+                first_record = student_records.iloc[0]
+                student_grade = str(first_record.get('Grade') or '') or None
+                student_teacher = str(first_record.get('Teacher') or '') or None
                 
                 col1, col2 = st.columns(2)
                 
@@ -481,6 +733,10 @@ elif page == "📊 Report Generator":
                         placeholder="Social-emotional and behavioral observations"
                     )
                     save_to_sheets = st.checkbox("💾 Save report back to Google Sheets", value=True)
+            elif st.session_state.get("report_student_search"):
+                st.info("No students match that search. Check the spelling or clear the search.")
+            else:
+                st.info("No students found for this teacher in Google Sheets.")
         
         except Exception as e:
             st.error(f"❌ Unable to load students from Google Sheets: {str(e)}")
@@ -509,41 +765,18 @@ elif page == "📊 Report Generator":
     
     st.markdown("---")
     
-    if st.button("🚀 Generate Report", type="primary", width="stretch"):
+    if st.button("🚀 Generate Report", type="primary", width="stretch", disabled=not student_name):
         if not student_name or not period or not subject or not performance_notes or not behavior_notes:
             st.error("❌ Please fill in all required fields (marked with *)")
         else:
-            with st.spinner("✨ Generating your report..."):
-                try:
-                    result = generate_report(student_name, period, subject, performance_notes, behavior_notes)
-                    
-                    if result['success']:
-                        st.success("✅ Report generated successfully!")
-                        st.markdown("### 📄 Progress Report:")
-                        st.markdown(result['report'])
-                        
-                        # Save to sheets if requested
-                        if save_to_sheets:
-                            try:
-                                write_report_to_sheet(result['report'], student_name)
-                                st.success("✅ Report saved to Google Sheets!")
-                            except Exception as e:
-                                st.warning(f"⚠️ Could not save to sheets: {str(e)}")
-                        
-                        # Download button
-                        st.download_button(
-                            label="⬇️ Download Report",
-                            data=result['report'],
-                            file_name=f"report_{student_name}_{period}.txt".replace(" ", "_"),
-                            mime="text/plain"
-                        )
-                        
-                        st.info(f"💾 Saved to: `{result['metadata']['output_file']}`")
-                    else:
-                        st.error(f"❌ Error: {result.get('error', 'Unknown error')}")
-                        
-                except Exception as e:
-                    st.error(f"❌ An error occurred: {str(e)}")
+            queue_job(
+                generate_report_job, student_name, period, subject, performance_notes, behavior_notes, save_to_sheets,
+                grade=student_grade, teacher=student_teacher,
+                kind="report", label=f"{student_name}: {period}"
+            )
+            st.success("✅ Report queued! You can keep working while it generates.")
+    
+    show_jobs("report", render_report_result)
 
 
 # PARENT MESSAGE PAGE
@@ -579,32 +812,14 @@ elif page == "💌 Parent Message":
         if not purpose or not child_name or not context:
             st.error("❌ Please fill in all required fields (marked with *)")
         else:
-            with st.spinner("✨ Crafting your message..."):
-                try:
-                    result = generate_parent_message(purpose, child_name, context, teacher_name)
-                    
-                    if result['success']:
-                        st.success("✅ Message generated successfully!")
-                        st.markdown("### 💌 Your Message:")
-                        st.markdown(result['message'])
-                        
-                        # Copy to clipboard helper
-                        st.code(result['message'], language=None)
-                        
-                        # Download button
-                        st.download_button(
-                            label="⬇️ Download Message",
-                            data=result['message'],
-                            file_name=f"parent_message_{purpose}_{child_name}.txt".replace(" ", "_"),
-                            mime="text/plain"
-                        )
-                        
-                        st.info(f"💾 Saved to: `{result['metadata']['output_file']}`")
-                    else:
-                        st.error(f"❌ Error: {result.get('error', 'Unknown error')}")
-                        
-                except Exception as e:
-                    st.error(f"❌ An error occurred: {str(e)}")
+            from core.logic.parent_writer import generate_parent_message
+            queue_job(
+                generate_parent_message, purpose, child_name, context, teacher_name,
+                kind="parent_message", label=f"{purpose.title()} message for {child_name}"
+            )
+            st.success("✅ Message queued! You can keep working while it generates.")
+    
+    show_jobs("parent_message", render_parent_result)
 
 
 # VIEW STUDENTS PAGE
@@ -615,31 +830,36 @@ elif page == "👥 View Students":
     # Add refresh button at the top
     col1, col2, col3 = st.columns([2, 1, 1])
     with col2:
-        if st.button("🔄 Refresh Data", help="Clear cache and reload from Google Sheets"):
-            st.cache_data.clear()
-            st.success("Cache cleared! Reloading...")
-            st.rerun()
+        if st.button("🔄 Refresh Data", help="Reload this sheet's data from Google Sheets"):
+            try:
+                refreshed = refresh_roster()
+            except RuntimeError as e:
+                st.error(f"❌ Could not reload from Google Sheets, showing the last loaded data: {e}")
+            else:
+                if refreshed:
+                    st.success("Cache cleared! Reloading...")
+                    st.rerun()
+                else:
+                    st.info(f"Data was just refreshed. Try again in {refresh_cooldown.cooldown_remaining(roster_key()):.0f}s.")
     
     try:
         students = load_students_cached()  # Use cached data
         
         if students:
-            # Get unique student names
+            from config import settings
             import pandas as pd
-            df_all = pd.DataFrame(students)
             
             # Apply teacher filter if selected
             selected_teacher = st.session_state.get('selected_teacher', 'All Teachers')
-            if selected_teacher != "All Teachers" and 'Teacher' in df_all.columns:
-                df_all = df_all[df_all['Teacher'] == selected_teacher]
+            teacher_index = roster_index(selected_teacher)
+            if selected_teacher != "All Teachers":
                 st.info(f"👨‍🏫 Showing students for: **{selected_teacher}**")
             
-            unique_students = df_all['Name'].unique() if 'Name' in df_all.columns else []
-            
-            st.success(f"✅ Found {len(unique_students)} students with {len(df_all)} total subject records")
+            st.success(f"✅ Found {teacher_index.total_students} students with {teacher_index.total_records} total subject records")
             
             # Grade filter
-            grades = sorted(df_all['Grade'].unique()) if 'Grade' in df_all.columns else []
+            from core.logic import roster_views
+            grades = roster_views.grades(roster_snapshot(), selected_teacher)
             
             col_filter1, col_filter2 = st.columns(2)
             with col_filter1:
@@ -658,40 +878,43 @@ elif page == "👥 View Students":
                 )
             
             # Apply grade filter
+            index = roster_index(selected_teacher, grade_filter)
             if grade_filter != "All Grades":
-                df_all = df_all[df_all['Grade'] == grade_filter]
-                unique_students = df_all['Name'].unique() if 'Name' in df_all.columns else []
-                st.info(f"📋 Showing {len(unique_students)} students from {grade_filter}")
+                st.info(f"📋 Showing {index.total_students} students from {grade_filter}")
+            
+            col_search, col_size = st.columns([3, 1])
+            with col_search:
+                search = st.text_input("🔎 Search by name", key="students_search", placeholder="Type part of a name")
+            with col_size:
+                page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="students_page_size")
+            page_size = min(page_size, settings.MAX_RENDER_ROWS)
             
             if view_mode == "Student Summary":
-                # Aggregate data by student
-                if 'Name' in df_all.columns and 'Score' in df_all.columns:
-                    # Convert Score to numeric, replacing non-numeric with NaN
-                    df_all['Score'] = pd.to_numeric(df_all['Score'], errors='coerce')
-                    
-                    summary = df_all.groupby('Name').agg({
-                        'Score': lambda x: x.mean() if x.notna().any() else 0,
-                        'Subject': lambda x: ', '.join(x.unique()[:3]) + ('...' if len(x.unique()) > 3 else ''),
-                        'Behavior': lambda x: x.mode()[0] if len(x.mode()) > 0 else 'N/A'
-                    }).reset_index()
-                    summary.columns = ['Name', 'Average Score', 'Subjects', 'Overall Behavior']
-                    summary['Average Score'] = summary['Average Score'].round(1)
+                # Summary is aggregated once per snapshot; renders only look up one page
+                if 'Name' in index.frame.columns and 'Score' in index.frame.columns:
+                    name_page = index.name_page(search, st.session_state.get("summary_page", 1), page_size)
+                    summary = student_summary(selected_teacher, grade_filter).loc[name_page.items]
                     st.dataframe(summary, width="stretch", hide_index=True)
+                    st.caption(f"Students {name_page.first}-{name_page.last} of {name_page.total}")
+                    page_number("summary_page", name_page.pages)
                 else:
                     st.warning("Missing required columns (Name, Score) in your sheet")
             else:
-                # Show all records
-                st.dataframe(df_all, width="stretch", hide_index=True)
+                # Show one page of records
+                rows_page = index.rows_page(search, st.session_state.get("records_page", 1), page_size)
+                st.dataframe(rows_page.items, width="stretch", hide_index=True)
+                st.caption(f"Records {rows_page.first}-{rows_page.last} of {rows_page.total}")
+                page_number("records_page", rows_page.pages)
             
             st.markdown("---")
             
             # Individual student view with ALL subjects
             st.subheader("🔍 View Individual Student")
-            selected_name = st.selectbox("Select a student", sorted(unique_students))
+            selected_name = student_picker("Select a student", index, key="students_individual")
             
             if selected_name:
                 # Get all records for this student
-                student_records = df_all[df_all['Name'] == selected_name] if 'Name' in df_all.columns else pd.DataFrame()
+                student_records = index.student_rows(selected_name)
                 
                 if not student_records.empty:
                     # Show student overview
@@ -714,8 +937,11 @@ elif page == "👥 View Students":
                     st.markdown("---")
                     st.markdown("### 📚 Subject Breakdown")
                     
-                    # Display each subject
-                    for idx, record in student_records.iterrows():
+                    # Display each subject (capped so one huge record set can't stall the page)
+                    shown_records = student_records.head(settings.MAX_RENDER_ROWS)
+                    if len(student_records) > len(shown_records):
+                        st.caption(f"Showing the first {len(shown_records)} of {len(student_records)} records")
+                    for record in shown_records.to_dict('records'):
                         with st.expander(f"**{record.get('Subject', 'N/A')}** - Score: {record.get('Score', 'N/A')}", expanded=False):
                             col1, col2 = st.columns(2)
                             
@@ -754,7 +980,7 @@ elif page == "👥 View Students":
                             st.rerun()
         else:
             from config import settings
-            if not settings.GOOGLE_SHEETS_CREDENTIALS or not settings.GOOGLE_SHEET_ID:
+            if not settings.get_settings().sheets_configured:
                 st.info("ℹ️ **Google Sheets not configured** - You can still use all features with manual input!")
                 st.markdown("""
                 **Available Features:**
@@ -773,6 +999,239 @@ elif page == "👥 View Students":
         st.info("💡 Make sure your Google Sheets integration is properly configured")
 
 
+# SEARCH OUTPUTS PAGE
+elif page == "🔎 Search Outputs":
+    st.header("🔎 Search Outputs")
+    st.markdown("Find past lessons, reports and parent messages")
+    
+    from core.storage.archive import get_archive
+    archive = get_archive()
+    
+    query = st.text_input(
+        "Search",
+        key="search_query",
+        placeholder='e.g., fractions, multipl*, "reading comprehension"',
+        help="All words must match; endings are ignored (fraction = fractions). End a word with * to match a prefix."
+    )
+    
+    kinds = {"All": None, "📊 Reports": "reports", "💌 Parent Messages": "parent_messages", "📝 Lessons": "lessons"}
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        kind_label = st.selectbox("Type", list(kinds), key="search_kind")
+    with col2:
+        grade = st.selectbox("Grade", ["All"] + archive.distinct('grade'), key="search_grade")
+    with col3:
+        teacher = st.selectbox("Teacher", ["All"] + archive.distinct('teacher'), key="search_teacher")
+    with col4:
+        period = st.selectbox("Period", ["All"] + archive.distinct('period'), key="search_period")
+    student = st.text_input("Student (exact name, optional)", key="search_student")
+    
+    filters = {
+        'kind': kinds[kind_label],
+        'grade': None if grade == "All" else grade,
+        'teacher': None if teacher == "All" else teacher,
+        'period': None if period == "All" else period,
+        'student': student.strip() or None,
+    }
+    
+    if query.strip():
+        page_size = 20
+        total = archive.search_count(query, **filters)
+        pages = max((total + page_size - 1) // page_size, 1)
+        current = min(st.session_state.get("search_page", 1), pages)
+        results = archive.search(query, limit=page_size, offset=(current - 1) * page_size, **filters)
+        
+        if not results:
+            st.info("No matching outputs")
+        else:
+            st.caption(f"Results {(current - 1) * page_size + 1}-{(current - 1) * page_size + len(results)} of {total}")
+            for result in results:
+                title = " · ".join(str(value) for value in [
+                    result['kind'], result['student'], result['subject'], result['period'], result['created_at'][:16]
+                ] if value)
+                with st.expander(title):
+                    st.markdown(result['snippet'])
+                    if st.checkbox("Show full text", key=f"search_show_{result['id']}"):
+                        output = archive.get(result['id'])
+                        st.text_area("Content", value=output['content'], height=300, key=f"search_text_{result['id']}")
+                        st.download_button(
+                            "📥 Download",
+                            data=output['content'],
+                            file_name=f"{result['name'] or result['kind']}_{result['id']}.txt",
+                            mime="text/plain",
+                            key=f"search_download_{result['id']}"
+                        )
+            page_number("search_page", pages)
+    else:
+        st.caption(f"{archive.count():,} outputs archived")
+    
+    with st.expander("📦 Export"):
+        st.caption("Download every output matching the filters above (search words are not applied) as one zip file.")
+        layout = st.radio(
+            "Layout",
+            ["files", "classes"],
+            format_func=lambda value: {"files": "One file per output", "classes": "One document per class"}[value],
+            horizontal=True,
+            key="export_layout"
+        )
+        if st.button("📦 Prepare Export", key="export_prepare"):
+            import tempfile
+            from core.storage.export import export_outputs
+            previous = st.session_state.pop("export_file", None)
+            if previous and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            # Streamed to a temporary file, so only the finished zip is ever loaded
+            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as f:
+                with st.spinner("Exporting..."):
+                    result = export_outputs(f, layout=layout, archive=archive, **filters)
+            st.session_state.export_file = {'path': f.name, **result}
+        export_file = st.session_state.get("export_file")
+        if export_file and os.path.exists(export_file['path']):
+            if export_file['exported']:
+                with open(export_file['path'], "rb") as f:
+                    st.download_button(
+                        f"📥 Download {export_file['exported']:,} outputs",
+                        data=f,
+                        file_name=f"{filters['kind'] or 'outputs'}_export.zip",
+                        mime="application/zip",
+                        key="export_download"
+                    )
+            else:
+                st.info("No outputs match these filters")
+    
+    with st.expander("💾 Storage"):
+        stats = archive.storage_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Outputs", f"{stats['outputs']:,}", help=f"{stats['unique_texts']:,} distinct texts")
+        col2.metric("Text stored", f"{stats['stored_bytes'] / 1e6:.1f} MB",
+                    help=f"{stats['logical_bytes'] / 1e6:.1f} MB before deduplication and compression")
+        col3.metric("Saved", f"{stats['saved_percent']}%")
+        if stats['inline_outputs']:
+            st.caption(f"{stats['inline_outputs']:,} older outputs will be compressed by the next maintenance pass")
+
+
+# ADMIN PAGE
+elif page == "⚙️ Admin":
+    st.header("⚙️ Admin")
+    st.markdown("Where time goes: rate limiting, model calls, retries, storage and Sheets")
+    
+    from utils import metrics
+    import pandas as pd
+    
+    if metrics_url:
+        st.caption(f"Prometheus endpoint: {metrics_url}")
+    else:
+        st.caption("Prometheus endpoint disabled or unavailable (see METRICS_PORT)")
+    
+    if st.button("🔄 Refresh metrics"):
+        st.rerun()
+    
+    registry = {metric.name: metric for metric in metrics.REGISTRY.metrics()}
+    
+    def counter_total(name, **match):
+        metric = registry.get(name)
+        if metric is None:
+            return 0
+        return sum(value for key, value in metric.values().items()
+                   if all(dict(zip(metric.labelnames, key)).get(label) == wanted for label, wanted in match.items()))
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Generations", f"{counter_total('generations_total'):,.0f}",
+                help=f"{counter_total('generations_total', outcome='failure'):,.0f} failed")
+    col2.metric("Model retries", f"{counter_total('model_retries_total'):,.0f}")
+    col3.metric("Tokens in / out", f"{counter_total('model_tokens_total', direction='in'):,.0f} / "
+                                   f"{counter_total('model_tokens_total', direction='out'):,.0f}")
+    hits = counter_total('cache_requests_total', result='hit')
+    lookups = hits + counter_total('cache_requests_total', result='miss')
+    col4.metric("Cache hit rate", f"{100 * hits / lookups:.0f}%" if lookups else "n/a")
+    
+    st.markdown("### ⏱️ Latency by Stage")
+    rows = []
+    for metric in registry.values():
+        if metric.kind != "histogram":
+            continue
+        for summary in metric.summary():
+            labels = ", ".join(f"{name}={summary[name]}" for name in metric.labelnames)
+            rows.append({
+                'Stage': metric.name + (f" ({labels})" if labels else ""),
+                'Count': summary['count'],
+                'Mean (s)': round(summary['mean'], 3),
+                'p50 (s)': round(summary['p50'], 3),
+                'p95 (s)': round(summary['p95'], 3),
+                'Total (s)': round(summary['sum'], 1),
+            })
+    if rows:
+        st.dataframe(pd.DataFrame(rows), width="stretch", hide_index=True)
+    else:
+        st.info("No timings recorded yet in this process")
+    
+    st.markdown("### 🔢 Counters")
+    rows = []
+    for metric in registry.values():
+        if metric.kind == "histogram":
+            continue
+        for key, value in metric.values().items():
+            labels = ", ".join(f"{name}={label}" for name, label in zip(metric.labelnames, key))
+            rows.append({'Metric': metric.name + (f" ({labels})" if labels else ""), 'Value': value})
+    if rows:
+        st.dataframe(pd.DataFrame(rows), width="stretch", hide_index=True)
+    
+    if sheets_configured:
+        st.markdown("---")
+        st.markdown("### 📤 Sheets Outbox")
+        from integrations.sheet_outbox import FAILED, PENDING, SENDING, get_outbox
+        outbox = get_outbox()
+        counts = outbox.counts()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Queued", counts[PENDING] + counts[SENDING])
+        col2.metric("Given up", counts[FAILED])
+        col3.metric("Oldest queued", counts['oldest_pending'] or "—")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("📤 Retry queued writes now", disabled=not counts[PENDING]):
+                stats = outbox.flush(force=True)
+                st.info(f"Written: {stats['written']}, still queued: {stats['pending']}")
+        with col2:
+            if st.button("♻️ Requeue given-up writes", disabled=not counts[FAILED]):
+                st.info(f"Requeued {outbox.retry_failed()} writes")
+        for entry in outbox.entries(PENDING, limit=5) + outbox.entries(FAILED, limit=5):
+            st.caption(f"{entry['row_values'][0]} → {entry['sheet_name']} ({entry['attempts']} attempts): "
+                       f"{entry['last_error'] or 'not tried yet'}")
+    
+    st.markdown("---")
+    st.markdown("### 🔬 Profiling")
+    from utils import profiling
+    from config import settings
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        profiling_on = st.toggle("Profile dashboard reruns", value=profiling.is_enabled(),
+                                 help="Applies to every session in this process until it restarts")
+    with col2:
+        rate = st.slider("Fraction of reruns profiled", 0.0, 1.0, float(profiling.sample_rate()), 0.01)
+    if profiling_on != profiling.is_enabled() or rate != profiling.sample_rate():
+        profiling.configure(enabled=profiling_on, sample_rate=rate)
+    st.caption(f"Profiles are written to `{settings.PROFILING_DIR}`: a .txt report and a .folded "
+               "collapsed-stack file for flamegraph.pl or speedscope.")
+    
+    for profile_file in profiling.recent_profiles():
+        col1, col2 = st.columns([3, 1])
+        col1.text(f"{profile_file['name']} ({profile_file['size'] / 1024:.0f} KB)")
+        with open(profile_file['path'], "rb") as f:
+            col2.download_button("📥", data=f.read(), file_name=profile_file['name'],
+                                 key=f"profile_{profile_file['name']}")
+    
+    st.markdown("---")
+    st.markdown("### 🔧 Configuration")
+    st.caption(f"Reloaded automatically when `.env` or `secrets.toml` changes "
+               f"(checked every {settings.CONFIG_RELOAD_INTERVAL:g}s), or on SIGHUP.")
+    if st.button("🔄 Reload configuration now"):
+        if settings.reload():
+            st.success("Configuration reloaded")
+        else:
+            st.error("Configuration is invalid; the current settings were kept (see the log)")
+
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -783,3 +1242,6 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+if rerun_profile:
+    rerun_profile.stop()
@@ -4,14 +4,38 @@ Handles reading from and writing to Google Sheets for student data.
 OPTIMIZED: Uses singleton pattern for client reuse.
 """
 import os
+import time
 import gspread
+from contextlib import contextmanager
 from google.oauth2.service_account import Credentials
 from config import settings
+from utils import metrics
 from utils.helpers import setup_logger
 from functools import lru_cache
 
 logger = setup_logger(__name__)
 
+SHEETS_CALLS = metrics.counter("sheets_api_calls_total", "Google Sheets API calls", ["operation", "outcome"])
+SHEETS_LATENCY = metrics.histogram("sheets_api_seconds", "Google Sheets API call latency", ["operation"])
+
+
+@contextmanager
+def _api_call(operation):
+    """Count and time one Sheets API call."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        SHEETS_LATENCY.observe(time.perf_counter() - started, operation=operation)
+        SHEETS_CALLS.inc(operation=operation, outcome=outcome)
+
+# write_report_to_sheet() outcomes
+REPORT_WRITTEN = "written"  # in the sheet now
+REPORT_QUEUED = "queued"    # in the outbox; retried until it is written
+REPORT_FAILED = "failed"    # not queued (no sheet ID, outbox error) or given up on
+
 # Google Sheets API scopes
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -40,7 +64,8 @@ def _load_local_credentials():
 def get_sheets_client():
     """
     Authenticate and return a Google Sheets client.
-    Uses singleton pattern to reuse the same client across calls.
+    Uses singleton pattern to reuse the same client across calls (until a
+    configuration reload changes the credentials).
     Supports both local development (JSON file) and Streamlit Cloud (secrets.toml).
     
     Returns:
@@ -49,31 +74,18 @@ def get_sheets_client():
     Raises:
         Exception: If authentication fails
     """
-    # Check if running on Streamlit Cloud
-    try:
-        import streamlit as st
-        # Check if secrets are actually available (not just that Streamlit is imported)
-        try:
-            if hasattr(st, 'secrets') and 'gcp_service_account' in st.secrets:
-                # Use Streamlit secrets
-                credentials = Credentials.from_service_account_info(
-                    st.secrets["gcp_service_account"],
-                    scopes=SCOPES
-                )
-                logger.info("Using Streamlit Cloud secrets for authentication")
-            else:
-                # Streamlit imported but no secrets, use local file
-                credentials = _load_local_credentials()
-        except:
-            # Error accessing secrets, use local file
-            credentials = _load_local_credentials()
-    except ImportError:
-        # Streamlit not available, use local file
+    service_account = settings.GCP_SERVICE_ACCOUNT
+    if service_account:
+        # Streamlit Cloud: service account from secrets.gcp_service_account
+        credentials = Credentials.from_service_account_info(service_account, scopes=SCOPES)
+        logger.info("Using Streamlit Cloud secrets for authentication")
+    else:
         credentials = _load_local_credentials()
     
     # Authorize and cache client
     try:
-        client = gspread.authorize(credentials)
+        with _api_call("authorize"):
+            client = gspread.authorize(credentials)
         logger.info("Google Sheets client authenticated successfully")
     except Exception as e:
         logger.error(f"Failed to authorize gspread client: {str(e)}")
@@ -81,6 +93,15 @@ def get_sheets_client():
     return client
 
 
+def _credentials_changed(old, new):
+    if (old.GCP_SERVICE_ACCOUNT, old.GOOGLE_SHEETS_CREDENTIALS) != (new.GCP_SERVICE_ACCOUNT, new.GOOGLE_SHEETS_CREDENTIALS):
+        get_sheets_client.cache_clear()
+        logger.info("Sheets credentials changed; the client will re-authenticate on next use")
+
+
+settings.on_reload(_credentials_changed)
+
+
 def get_sheet(sheet_id=None, sheet_name=None):
     """
     Get a specific worksheet by ID and optional sheet name.
@@ -103,7 +124,8 @@ def get_sheet(sheet_id=None, sheet_name=None):
             raise ValueError("No sheet_id provided and GOOGLE_SHEET_ID not set in .env")
         
         try:
-            spreadsheet = client.open_by_key(sheet_id)
+            with _api_call("open_by_key"):
+                spreadsheet = client.open_by_key(sheet_id)
             logger.info(f"Opened spreadsheet with ID: {sheet_id}")
         except Exception as e:
             logger.error(f"Failed to open spreadsheet - Permission denied or invalid sheet ID: {str(e)}")
@@ -111,14 +133,16 @@ def get_sheet(sheet_id=None, sheet_name=None):
         
         if sheet_name:
             try:
-                worksheet = spreadsheet.worksheet(sheet_name)
+                with _api_call("worksheet"):
+                    worksheet = spreadsheet.worksheet(sheet_name)
                 logger.info(f"Opened worksheet: {worksheet.title}")
             except Exception as e:
                 logger.error(f"Worksheet '{sheet_name}' not found: {str(e)}")
                 logger.info(f"Available worksheets: {[ws.title for ws in spreadsheet.worksheets()]}")
                 raise
         else:
-            worksheet = spreadsheet.sheet1  # First sheet
+            with _api_call("sheet1"):
+                worksheet = spreadsheet.sheet1  # First sheet
             logger.info(f"Opened first worksheet: {worksheet.title}")
         
         return worksheet
@@ -128,7 +152,7 @@ def get_sheet(sheet_id=None, sheet_name=None):
         raise
 
 
-def read_student_data(sheet_id=None, sheet_name="Students"):
+def read_student_data(sheet_id=None, sheet_name="Students", raise_errors=False):
     """
     Read all student data from a Google Sheet.
     Expects columns: Name, Subject, Score, Notes, Behavior
@@ -136,53 +160,113 @@ def read_student_data(sheet_id=None, sheet_name="Students"):
     Args:
         sheet_id (str): Google Sheet ID
         sheet_name (str): Name of the sheet tab (default: "Students")
+        raise_errors (bool): Re-raise failures instead of returning an empty list
     
     Returns:
         list[dict]: List of student records as dictionaries, or empty list on error
     """
     try:
         worksheet = get_sheet(sheet_id, sheet_name)
-        records = worksheet.get_all_records()
+        with _api_call("get_all_records"):
+            records = worksheet.get_all_records()
         logger.info(f"Retrieved {len(records)} student records")
         return records
     
     except Exception as e:
         logger.error(f"Failed to read student data: {str(e) if str(e) else type(e).__name__}")
+        if raise_errors:
+            raise
         return []
 
 
-def write_report_to_sheet(report_text, student_name, sheet_id=None, sheet_name="Reports"):
+def append_rows(rows, sheet_id=None, sheet_name="Reports", key_column=4):
+    """
+    Append rows below the last used row, skipping rows already in the sheet.
+    
+    Each row's value in key_column (1-based, default D) is its idempotency
+    key; rows whose key is already present in that column are not written
+    again, so retrying after an ambiguous failure can't duplicate them.
+    
+    Args:
+        rows (list[list]): Rows to append, keys in key_column
+        sheet_id (str): Google Sheet ID
+        sheet_name (str): Name of the sheet tab
+        key_column (int): Column holding the idempotency keys
+    
+    Returns:
+        tuple: (first row written or None, set of keys that were already present)
+    
+    Raises:
+        Exception: If the sheet can't be read or written
+    """
+    worksheet = get_sheet(sheet_id, sheet_name)
+    with _api_call("col_values"):
+        present = set(worksheet.col_values(key_column))
+    existing = {row[key_column - 1] for row in rows if row[key_column - 1] in present}
+    rows = [row for row in rows if row[key_column - 1] not in existing]
+    if not rows:
+        return None, existing
+    
+    # Find the next empty row
+    with _api_call("col_values"):
+        next_row = len(worksheet.col_values(1)) + 1
+    last_column = chr(ord('A') + max(len(row) for row in rows) - 1)
+    with _api_call("update"):
+        worksheet.update(f'A{next_row}:{last_column}{next_row + len(rows) - 1}', rows)
+    return next_row, existing
+
+
+def write_report_to_sheet(report_text, student_name, sheet_id=None, sheet_name="Reports", defer=False):
     """
     Write a generated report back to Google Sheets.
     
+    The row goes through the local write-ahead outbox first: if the write
+    fails (quota, network, permissions) it stays queued and is retried in
+    order with backoff, with an idempotency key in column D so a retry never
+    adds a duplicate row.
+    
     Args:
         report_text (str): The generated report content
         student_name (str): Name of the student
         sheet_id (str): Google Sheet ID
         sheet_name (str): Name of the sheet tab (default: "Reports")
+        defer (bool): Only queue the row; it is written by the next flush
     
     Returns:
-        bool: True if successful, False on error
+        str: REPORT_WRITTEN, REPORT_QUEUED (in the outbox, written by a later
+        flush) or REPORT_FAILED (nothing queued, or the outbox gave up on it)
     """
-    try:
-        worksheet = get_sheet(sheet_id, sheet_name)
-        
-        # Find the next empty row
-        next_row = len(worksheet.col_values(1)) + 1
-        
-        # Get current timestamp
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Write data: [Student Name, Report, Timestamp]
-        worksheet.update(f'A{next_row}:C{next_row}', [[student_name, report_text, timestamp]])
-        
-        logger.info(f"Report written to sheet for {student_name} at row {next_row}")
-        return True
+    from integrations.sheet_outbox import FAILED, WRITTEN, get_outbox, write_key
+    
+    # Get current timestamp
+    from datetime import datetime
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
+    try:
+        sheet_id = sheet_id or settings.GOOGLE_SHEET_ID
+        if not sheet_id:
+            raise ValueError("No sheet_id provided and GOOGLE_SHEET_ID not set in .env")
+        outbox = get_outbox()
+        # Data: [Student Name, Report, Timestamp]; saving the same report twice is one write
+        key = outbox.enqueue(sheet_id, sheet_name, [student_name, report_text, timestamp],
+                             key=write_key(sheet_id, sheet_name, student_name, report_text))
+        if defer:
+            return REPORT_QUEUED
+        # Only this tab, and not while it is backing off: the replay thread retries it
+        outbox.flush(target=(sheet_id, sheet_name))
+        status = outbox.status([key]).get(key)
     except Exception as e:
         logger.error(f"Failed to write report to sheet: {e}")
-        return False  # Return False instead of raising
+        return REPORT_FAILED  # Return a status instead of raising
+    
+    if status == WRITTEN:
+        logger.info(f"Report written to sheet for {student_name}")
+        return REPORT_WRITTEN
+    if status == FAILED:
+        logger.error(f"Report for {student_name} could not be written to the sheet; see the Sheets outbox")
+        return REPORT_FAILED
+    logger.warning(f"Report for {student_name} queued; it will be written to the sheet when Sheets is reachable")
+    return REPORT_QUEUED
 
 
 def get_student_by_name(student_name, sheet_id=None, sheet_name="Students"):
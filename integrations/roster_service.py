@@ -0,0 +1,261 @@
+"""
+Shared roster data service.
+One process-wide owner of the student roster per (spreadsheet, tab). A
+background thread refreshes it before it expires (stale-while-revalidate),
+and callers get immutable snapshots, so page renders never wait on Sheets.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from config import settings
+from utils.cache import CACHE_REQUESTS
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass(frozen=True)
+class RosterSnapshot:
+    """
+    Immutable view of the roster at one point in time.
+
+    records is a tuple of read-only mappings; use to_list() for mutable
+    copies. version increases by one with every successful load.
+    """
+    records: Tuple[Mapping, ...]
+    version: int
+    fetched_at: float
+    source: Hashable = None
+    _cache: Dict = field(default_factory=dict, repr=False, compare=False)
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_list(self) -> List[dict]:
+        """Return the records as a list of plain (mutable) dicts."""
+        return [dict(record) for record in self.records]
+
+    def age(self) -> float:
+        """Seconds since this snapshot was fetched."""
+        return time.time() - self.fetched_at
+
+    def memo(self, name: Hashable, build: Callable):
+        """
+        Compute a value derived from this snapshot once and reuse it.
+
+        Snapshots never change, so anything built from one (DataFrames,
+        indexes, summaries) stays valid for the snapshot's lifetime.
+        """
+        if name not in self._cache:
+            CACHE_REQUESTS.inc(region="roster_views", result="miss")
+            self._cache[name] = build(self)
+        else:
+            CACHE_REQUESTS.inc(region="roster_views", result="hit")
+        return self._cache[name]
+
+
+EMPTY_SNAPSHOT = RosterSnapshot(records=(), version=0, fetched_at=0.0)
+
+
+def _freeze(records) -> Tuple[Mapping, ...]:
+    return tuple(MappingProxyType(dict(record)) for record in records or [])
+
+
+class RosterService:
+    """
+    Owns one roster and keeps it fresh in the background.
+
+    The first snapshot() call loads synchronously; after that, a daemon
+    thread reloads the roster when it reaches refresh_ahead * ttl, and a
+    failed reload keeps serving the previous snapshot and retries.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], list],
+        ttl: Optional[float] = None,
+        refresh_ahead: float = 0.8,
+        retry_delay: float = 30,
+        source: Hashable = None,
+    ):
+        self.loader = loader
+        # None follows DATA_CACHE_TTL, including changes from a configuration reload
+        self._ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_delay = retry_delay
+        self.source = source
+        self._snapshot = EMPTY_SNAPSHOT
+        self._load_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._failed_at = 0.0
+        self.last_error = None
+
+    @property
+    def ttl(self) -> float:
+        """Seconds a snapshot stays fresh."""
+        return settings.DATA_CACHE_TTL if self._ttl is None else self._ttl
+
+    def _load(self, only_if_version: Optional[int] = None) -> bool:
+        """
+        Fetch a new snapshot. Returns False (keeping the old one) on failure.
+
+        With only_if_version, skip the fetch if another thread already
+        replaced that snapshot while we waited for the lock.
+        """
+        with self._load_lock:
+            if only_if_version is not None and self._snapshot.version != only_if_version:
+                return True
+            started = time.time()
+            try:
+                records = self.loader()
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                self._failed_at = time.time()
+                logger.error(f"Roster refresh failed for {self.source}, serving stale data: {self.last_error}")
+                return False
+            self.last_error = None
+            # Swapping a single reference is atomic; readers see old or new, never half
+            self._snapshot = RosterSnapshot(
+                records=_freeze(records),
+                version=self._snapshot.version + 1,
+                fetched_at=time.time(),
+                source=self.source,
+            )
+            logger.info(
+                f"Roster {self.source} refreshed: {len(self._snapshot)} records "
+                f"(v{self._snapshot.version}, {time.time() - started:.2f}s)"
+            )
+            return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            snapshot = self._snapshot
+            due = snapshot.fetched_at + self.ttl * self.refresh_ahead if snapshot.version else 0
+            if self._requested.is_set() or time.time() >= due:
+                self._requested.clear()
+                if not self._load():
+                    # Back off, but wake early if someone asks for a refresh
+                    self._wake.wait(self.retry_delay)
+                    self._wake.clear()
+                continue
+            self._wake.wait(due - time.time())
+            self._wake.clear()
+
+    def start(self) -> 'RosterService':
+        """Start the background refresher (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=f"roster-refresh-{self.source}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background refresher."""
+        self._stopped.set()
+        self._wake.set()
+
+    def snapshot(self) -> RosterSnapshot:
+        """
+        Return the current roster snapshot without waiting on Sheets.
+
+        Only the very first call in the process (no data yet) blocks for the
+        initial load; later calls return immediately, even if the data is
+        stale, and a refresh is scheduled in the background. If the initial
+        load just failed, an empty snapshot is returned while the refresher
+        retries.
+        """
+        snapshot = self._snapshot
+        if snapshot.version == 0:
+            if time.time() - self._failed_at >= self.retry_delay:
+                self._load(only_if_version=0)
+            self.start()
+            return self._snapshot
+        if snapshot.age() > self.ttl:
+            self.refresh()
+        self.start()
+        return snapshot
+
+    def refresh(self, wait: bool = False) -> RosterSnapshot:
+        """
+        Ask for a reload.
+
+        Args:
+            wait (bool): Reload in the calling thread and return the new snapshot
+
+        Returns:
+            RosterSnapshot: The current snapshot (new one if wait=True and it succeeded)
+        """
+        if not wait:
+            self._requested.set()
+        else:
+            self._load()
+        # Let the refresher recompute its schedule
+        self._wake.set()
+        return self._snapshot
+
+    def status(self) -> dict:
+        """Describe the current snapshot for display."""
+        snapshot = self._snapshot
+        return {
+            'source': self.source,
+            'version': snapshot.version,
+            'records': len(snapshot),
+            'age_seconds': round(snapshot.age(), 1) if snapshot.version else None,
+            'last_error': self.last_error,
+            'refreshing_in_background': bool(self._thread and self._thread.is_alive()),
+        }
+
+
+_services: Dict[Hashable, RosterService] = {}
+_services_lock = threading.Lock()
+
+
+def _sheet_loader(sheet_id: str, sheet_name: str) -> Callable[[], list]:
+    def load():
+        # Imported here so the service can be created without gspread loaded
+        from integrations.google_sheets import read_student_data
+        records = read_student_data(sheet_id, sheet_name, raise_errors=True)
+        # Each sync is snapshotted for term-over-term trends (if enabled)
+        from core.storage.score_store import record_sync
+        record_sync(records, source=sheet_id)
+        return records
+    return load
+
+
+def get_roster_service(sheet_id: Optional[str] = None, sheet_name: str = "Students") -> RosterService:
+    """
+    Return the process-wide roster service for a spreadsheet tab.
+
+    Args:
+        sheet_id (str): Google Sheet ID (default: settings.GOOGLE_SHEET_ID)
+        sheet_name (str): Tab holding the roster
+
+    Returns:
+        RosterService: Shared service (created on first use)
+    """
+    sheet_id = sheet_id or settings.GOOGLE_SHEET_ID
+    key = (sheet_id, sheet_name)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = RosterService(_sheet_loader(sheet_id, sheet_name), source=key)
+            _services[key] = service
+        return service
+
+
+def _apply_settings(old, new):
+    if old.DATA_CACHE_TTL != new.DATA_CACHE_TTL:
+        # Refreshers sleeping on the old schedule recompute it with the new TTL
+        with _services_lock:
+            services = list(_services.values())
+        for service in services:
+            service._wake.set()
+
+
+settings.on_reload(_apply_settings)
@@ -0,0 +1,365 @@
+"""
+Write-ahead outbox for Google Sheets writes.
+Rows bound for a sheet are stored in a local SQLite queue before they are
+sent, then written in order, batched, with exponential backoff while the
+Sheets API is failing (quota, network, permissions), so an outage never
+loses a report and bulk runs never wait on Sheets. Every row carries an
+idempotency key in column D; keys already in the sheet are marked written
+instead of being appended again. A batch is claimed in SQLite (status
+'sending' with a lease) before it is sent, so the dashboard's replay and a
+CLI flush never send the same rows at once.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import settings
+from utils import metrics
+from utils.helpers import hash_text, setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    write_key TEXT NOT NULL UNIQUE,
+    sheet_id TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    row_values TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    written_at TEXT,
+    sheet_row INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sheet_writes_status ON sheet_writes (status, sheet_id, sheet_name, id);
+"""
+
+PENDING = "pending"
+SENDING = "sending"  # claimed by a flush; next_attempt_at holds the lease expiry
+WRITTEN = "written"
+FAILED = "failed"
+
+# Column D: the idempotency key follows [Student Name, Report, Timestamp]
+KEY_COLUMN = 4
+# Rows per Sheets update call
+BATCH_SIZE = 200
+# Seconds before the first retry; doubles per failed attempt up to BACKOFF_MAX
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# A claimed batch not marked written or failed by then (the flushing process
+# died) is sent again; the column D keys stop it being appended twice
+LEASE_SECONDS = 600
+# Written rows are kept this long so re-saves of the same report stay no-ops
+WRITTEN_RETENTION_DAYS = 30
+
+SHEET_WRITES = metrics.counter(
+    "sheet_outbox_writes_total", "Outbox rows by outcome (written, duplicate, retry, failed)", ["outcome"])
+OUTBOX_PENDING = metrics.gauge("sheet_outbox_pending", "Sheet writes waiting in the outbox")
+
+# (sheet_id, sheet_name, rows) -> (first row written or None, keys already in the sheet)
+Appender = Callable[[str, str, List[list]], Tuple[Optional[int], Set[str]]]
+
+
+def write_key(*parts: Any) -> str:
+    """Stable idempotency key for a write, e.g. from sheet, tab, student and report text."""
+    return "w-" + hash_text(json.dumps([str(part) for part in parts]))
+
+
+def _append_to_sheet(sheet_id: str, sheet_name: str, rows: List[list]) -> Tuple[Optional[int], Set[str]]:
+    # Imported here so the outbox can be inspected without gspread installed
+    from integrations.google_sheets import append_rows
+    return append_rows(rows, sheet_id, sheet_name, key_column=KEY_COLUMN)
+
+
+def backoff(attempts: int) -> float:
+    """Seconds to wait after `attempts` consecutive failures, with +/-20% jitter."""
+    delay = min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class SheetOutbox:
+    """
+    Durable, ordered queue of rows to append to Google Sheets.
+
+    enqueue() records a row; flush() sends pending rows oldest first, one
+    batch per sheet tab, claiming each batch first so only one process
+    sends to a tab at a time. A failed batch blocks its tab (so rows stay in
+    order) until its backoff expires; after max_attempts failures its rows
+    are marked failed and can be requeued with retry_failed().
+    """
+
+    def __init__(self, path: Optional[str] = None, append: Optional[Appender] = None,
+                 max_attempts: Optional[int] = None):
+        self.path = path or settings.SHEETS_OUTBOX_DB
+        self.append = append or _append_to_sheet
+        self.max_attempts = settings.SHEETS_OUTBOX_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection that commits on success and always closes."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count_pending(self, conn: sqlite3.Connection) -> int:
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM sheet_writes WHERE status IN (?, ?)", (PENDING, SENDING)).fetchone()[0]
+        OUTBOX_PENDING.set(pending)
+        return pending
+
+    def enqueue(self, sheet_id: str, sheet_name: str, values: List[Any], key: Optional[str] = None) -> str:
+        """
+        Queue one row for a sheet tab.
+
+        Args:
+            sheet_id (str): Google Sheet ID
+            sheet_name (str): Tab to append to
+            values (list): Cell values (the key is added in column D)
+            key (str): Idempotency key (default: derived from the values)
+
+        Returns:
+            str: The row's key. Queueing a key again is a no-op, unless its
+            earlier write failed for good, in which case it is retried.
+        """
+        key = key or write_key(sheet_id, sheet_name, *values)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sheet_writes (write_key, sheet_id, sheet_name, row_values, created_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (write_key) DO UPDATE SET "
+                "status = 'pending', attempts = 0, next_attempt_at = 0 WHERE status = 'failed'",
+                (key, sheet_id, sheet_name, json.dumps(values), datetime.now().isoformat(timespec="seconds")),
+            )
+            self._count_pending(conn)
+        return key
+
+    def _due_targets(self, force: bool, target: Optional[Tuple[str, str]] = None) -> List[sqlite3.Row]:
+        # Each tab's oldest unsent row decides when the tab may be retried; a tab
+        # another flush is sending to waits for its lease even when forced
+        with self._connect() as conn:
+            heads = conn.execute(
+                "SELECT sheet_id, sheet_name, status, next_attempt_at FROM sheet_writes WHERE id IN ("
+                "SELECT MIN(id) FROM sheet_writes WHERE status IN (?, ?) GROUP BY sheet_id, sheet_name) ORDER BY id",
+                (PENDING, SENDING),
+            ).fetchall()
+        now = time.time()
+        return [head for head in heads if self._due(head, force, now)
+                and (target is None or (head['sheet_id'], head['sheet_name']) == tuple(target))]
+
+    @staticmethod
+    def _due(head: sqlite3.Row, force: bool, now: float) -> bool:
+        return head['next_attempt_at'] <= now or (force and head['status'] == PENDING)
+
+    def _claim(self, sheet_id: str, sheet_name: str, force: bool) -> List[sqlite3.Row]:
+        """Mark the tab's next batch as sending, unless another flush holds it or it isn't due."""
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock before reading, so two processes can't claim the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, write_key, row_values, attempts, status, next_attempt_at FROM sheet_writes "
+                "WHERE status IN (?, ?) AND sheet_id = ? AND sheet_name = ? ORDER BY id LIMIT ?",
+                (PENDING, SENDING, sheet_id, sheet_name, BATCH_SIZE),
+            ).fetchall()
+            if not rows or not self._due(rows[0], force, now):
+                return []
+            # Only rows up to one still leased by another flush (none, normally)
+            batch = []
+            for entry in rows:
+                if entry['status'] == SENDING and entry['next_attempt_at'] > now:
+                    break
+                batch.append(entry)
+            ids = [entry['id'] for entry in batch]
+            conn.execute(
+                f"UPDATE sheet_writes SET status = ?, next_attempt_at = ? WHERE id IN ({','.join('?' * len(ids))})",
+                (SENDING, now + LEASE_SECONDS, *ids),
+            )
+        return batch
+
+    def flush(self, force: bool = False, target: Optional[Tuple[str, str]] = None) -> Dict[str, int]:
+        """
+        Send pending rows, oldest first.
+
+        Args:
+            force (bool): Ignore backoff and try every tab now
+            target (tuple): Only this (sheet_id, sheet_name) tab. Doesn't wait
+                for a flush of other tabs; the claim in SQLite keeps two
+                flushes off the same rows.
+
+        Returns:
+            dict: rows written, duplicates (already in the sheet), retrying
+            (failed this time, still queued), failed (given up) and pending
+        """
+        stats = {'written': 0, 'duplicates': 0, 'retrying': 0, 'failed': 0}
+        with self._flush_lock if target is None else nullcontext():
+            for head in self._due_targets(force, target):
+                self._flush_target(head['sheet_id'], head['sheet_name'], force, stats)
+            with self._connect() as conn:
+                stats['pending'] = self._count_pending(conn)
+        if stats['written'] or stats['retrying'] or stats['failed']:
+            logger.info(f"Sheets outbox flush: {stats}")
+        return stats
+
+    def _flush_target(self, sheet_id: str, sheet_name: str, force: bool, stats: Dict[str, int]) -> None:
+        while True:
+            batch = self._claim(sheet_id, sheet_name, force)
+            if not batch:
+                return
+            rows = [json.loads(entry['row_values']) + [entry['write_key']] for entry in batch]
+            try:
+                first_row, existing = self.append(sheet_id, sheet_name, rows)
+            except Exception as e:
+                self._record_failure(batch, str(e) or type(e).__name__, stats)
+                # Later rows wait, so the tab keeps the order they were queued in
+                return
+
+            now = datetime.now().isoformat(timespec="seconds")
+            updates = []
+            position = first_row
+            for entry in batch:
+                if entry['write_key'] in existing:
+                    updates.append((now, None, entry['id']))
+                else:
+                    updates.append((now, position, entry['id']))
+                    position += 1
+            with self._connect() as conn:
+                conn.executemany(
+                    "UPDATE sheet_writes SET status = 'written', written_at = ?, sheet_row = ?, last_error = NULL "
+                    "WHERE id = ?", updates)
+            duplicates = len(existing)
+            stats['written'] += len(batch) - duplicates
+            stats['duplicates'] += duplicates
+            SHEET_WRITES.inc(len(batch) - duplicates, outcome="written")
+            if duplicates:
+                SHEET_WRITES.inc(duplicates, outcome="duplicate")
+                logger.info(f"{duplicates} outbox rows were already in {sheet_name}; not written again")
+
+    def _record_failure(self, batch: List[sqlite3.Row], error: str, stats: Dict[str, int]) -> None:
+        attempts = batch[0]['attempts'] + 1
+        give_up = bool(self.max_attempts) and attempts >= self.max_attempts
+        ids = [entry['id'] for entry in batch]
+        marks = ",".join("?" * len(ids))
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE sheet_writes SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?, "
+                f"status = CASE WHEN ? THEN 'failed' ELSE 'pending' END WHERE id IN ({marks})",
+                (error, time.time() + backoff(attempts), give_up, *ids),
+            )
+        if give_up:
+            stats['failed'] += len(batch)
+            SHEET_WRITES.inc(len(batch), outcome="failed")
+            logger.error(f"Giving up on {len(batch)} sheet writes after {attempts} attempts: {error}")
+        else:
+            stats['retrying'] += len(batch)
+            SHEET_WRITES.inc(len(batch), outcome="retry")
+            logger.warning(f"Sheet write failed (attempt {attempts}), {len(batch)} rows kept for retry: {error}")
+
+    def status(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Status (pending, sending, written, failed) of each known key."""
+        keys = list(keys)
+        result = {}
+        with self._connect() as conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT write_key, status FROM sheet_writes WHERE write_key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                result.update({row['write_key']: row['status'] for row in rows})
+        return result
+
+    def counts(self) -> Dict[str, Any]:
+        """Rows per status, and when the oldest unsent row was queued."""
+        with self._connect() as conn:
+            counts = {status: 0 for status in (PENDING, SENDING, WRITTEN, FAILED)}
+            counts.update(dict(conn.execute("SELECT status, COUNT(*) FROM sheet_writes GROUP BY status").fetchall()))
+            counts['oldest_pending'] = conn.execute(
+                "SELECT MIN(created_at) FROM sheet_writes WHERE status IN (?, ?)", (PENDING, SENDING)).fetchone()[0]
+        return counts
+
+    def entries(self, status: str = FAILED, limit: int = 20) -> List[Dict[str, Any]]:
+        """Oldest rows with a status, for the admin page (values decoded)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, write_key, sheet_id, sheet_name, row_values, attempts, next_attempt_at, last_error, "
+                "created_at FROM sheet_writes WHERE status = ? ORDER BY id LIMIT ?",
+                (status, limit),
+            ).fetchall()
+        return [{**dict(row), 'row_values': json.loads(row['row_values'])} for row in rows]
+
+    def retry_failed(self) -> int:
+        """Requeue rows that were given up on; returns how many."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE sheet_writes SET status = 'pending', attempts = 0, next_attempt_at = 0 WHERE status = 'failed'")
+            self._count_pending(conn)
+            return cursor.rowcount
+
+    def prune(self, days: float = WRITTEN_RETENTION_DAYS) -> int:
+        """Forget written rows older than `days`; returns how many."""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec="seconds")
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM sheet_writes WHERE status = 'written' AND written_at < ?", (cutoff,)).rowcount
+
+    def _replay_loop(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+                self.prune()
+            except Exception as e:
+                logger.error(f"Sheets outbox replay failed: {e}")
+
+    def start_replay(self, interval: float) -> 'SheetOutbox':
+        """Run flush() every `interval` seconds on a background thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._replay_loop, args=(interval,), name="sheet-outbox-replay", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop_replay(self) -> None:
+        """Stop the background replay thread."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_outbox: Optional[SheetOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> SheetOutbox:
+    """Return the process-wide outbox (created on first use, with its replay thread)."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = SheetOutbox()
+            if settings.SHEETS_OUTBOX_REPLAY_INTERVAL > 0:
+                _outbox.start_replay(settings.SHEETS_OUTBOX_REPLAY_INTERVAL)
+        return _outbox
@@ -0,0 +1,8 @@
+"""
+Entry point for `python -m teacher_ai`.
+"""
+import sys
+
+from teacher_ai.cli import main
+
+sys.exit(main())
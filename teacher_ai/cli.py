@@ -0,0 +1,441 @@
+"""
+Headless command-line interface for bulk generation.
+Runs lesson, report and parent-message generation without a browser, so
+nightly jobs can be scheduled from cron or Task Scheduler.
+
+Usage:
+    python -m teacher_ai report --teacher "Mrs. Smith" --period "Term 1 (2025)" --save-to-sheets
+    python -m teacher_ai parent --source roster.csv --grade "Grade 3" --purpose appreciation
+    python -m teacher_ai lesson --input lessons.csv --workers 2 --min-interval 4
+    python -m teacher_ai export --output term1_reports.zip --period "Term 1 (2025)" --grade "Grade 3"
+    python -m teacher_ai flush-sheets
+
+Prints a JSON summary to stdout. Exit status is 0 if every item succeeded,
+1 if any failed and 2 for bad arguments or an unreadable roster.
+"""
+import argparse
+import csv
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from config import settings
+from utils.helpers import setup_logger
+from utils.jobs import JobQueue, SUCCEEDED, CANCELLED, cancel_requested
+
+logger = setup_logger(__name__)
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+
+PURPOSES = ["appreciation", "feedback", "reminder", "concern"]
+
+class Task(NamedTuple):
+    """One generation to run: label for the summary plus the call to make."""
+    label: str
+    func: Callable
+    kwargs: dict
+
+
+def load_roster(source: str, sheet_id: Optional[str] = None, tab: str = "Students") -> List[dict]:
+    """
+    Load roster records from Google Sheets or a local file.
+
+    Args:
+        source (str): "sheets", or a .csv/.parquet/.db path
+        sheet_id (str): Google Sheet ID (default: settings.GOOGLE_SHEET_ID)
+        tab (str): Sheet tab (or SQLite table) holding the roster
+
+    Returns:
+        list[dict]: Student records
+    """
+    if source == "sheets":
+        from integrations.google_sheets import read_student_data
+        return read_student_data(sheet_id, tab, raise_errors=True)
+
+    from core.logic.chunked_analytics import iter_record_chunks
+    records = []
+    for chunk in iter_record_chunks(source, table=tab):
+        records.extend(chunk.to_dict('records'))
+    return records
+
+
+def filter_records(records: List[dict], teacher: Optional[str] = None, grade: Optional[str] = None,
+                   students: Optional[List[str]] = None) -> List[dict]:
+    """
+    Keep the records matching every filter given.
+
+    Values are compared as trimmed strings: Sheets returns numeric cells as
+    ints while CSV rows are strings, and --grade 3 must match both.
+    """
+    def same(value, wanted) -> bool:
+        return str(value if value is not None else '').strip() == wanted.strip()
+
+    wanted = {name.strip() for name in students} if students else None
+    return [
+        record for record in records
+        if (teacher is None or same(record.get('Teacher'), teacher))
+        and (grade is None or same(record.get('Grade'), grade))
+        and (wanted is None or str(record.get('Name') or '').strip() in wanted)
+    ]
+
+
+def group_by_student(records: List[dict]) -> "OrderedDict[str, List[dict]]":
+    """Group records by student name, students in alphabetical order."""
+    grouped: Dict[str, List[dict]] = {}
+    for record in records:
+        name = str(record.get('Name') or '').strip()
+        if name:
+            grouped.setdefault(name, []).append(record)
+    return OrderedDict(sorted(grouped.items()))
+
+
+def _report_and_save(save_to_sheets: bool, sheet_id: Optional[str], **kwargs) -> dict:
+    from core.logic.report_generator import generate_report
+    result = generate_report(**kwargs)
+    if result['success'] and save_to_sheets and not cancel_requested():
+        from integrations.google_sheets import REPORT_QUEUED, write_report_to_sheet
+        from integrations.sheet_outbox import write_key
+        # Only queued here; main() writes the whole batch once generation is done
+        result['sheets_status'] = write_report_to_sheet(result['report'], kwargs['student_name'], sheet_id,
+                                                        defer=True)
+        if result['sheets_status'] == REPORT_QUEUED:
+            result['sheet_write'] = write_key(sheet_id or settings.GOOGLE_SHEET_ID, "Reports",
+                                              kwargs['student_name'], result['report'])
+    return result
+
+
+def flush_sheet_writes(items: List[dict]) -> Dict[str, object]:
+    """
+    Write the reports queued during a run to Sheets and update each item's sheets_status.
+
+    Rows that still can't be written stay in the outbox and are retried by
+    the next flush (`python -m teacher_ai flush-sheets` or the dashboard).
+    """
+    from integrations.google_sheets import REPORT_FAILED, REPORT_QUEUED, REPORT_WRITTEN
+    from integrations.sheet_outbox import FAILED, WRITTEN, get_outbox
+    outbox = get_outbox()
+    stats = outbox.flush(force=True)
+    statuses = outbox.status(item['sheet_write'] for item in items if 'sheet_write' in item)
+    for item in items:
+        if 'sheet_write' in item:
+            status = statuses.get(item.pop('sheet_write'))
+            item['sheets_status'] = {WRITTEN: REPORT_WRITTEN, FAILED: REPORT_FAILED}.get(status, REPORT_QUEUED)
+    if stats['pending']:
+        logger.warning(f"{stats['pending']} sheet writes are still queued; "
+                       "run `python -m teacher_ai flush-sheets` to retry them")
+    return stats
+
+
+def report_tasks(args, students: "OrderedDict[str, List[dict]]") -> List[Task]:
+    """One progress report per student, from their notes across all subjects."""
+    from core.logic.report_generator import collect_student_notes
+    tasks = []
+    for name, records in students.items():
+        performance_notes, behavior_notes = collect_student_notes(records)
+        tasks.append(Task(f"Report for {name}", _report_and_save, {
+            'save_to_sheets': args.save_to_sheets,
+            'sheet_id': args.sheet_id,
+            'student_name': name,
+            'period': args.period,
+            'subject': args.subject,
+            'performance_notes': performance_notes or "No performance notes available",
+            'behavior_notes': behavior_notes or "No behavior notes available",
+            'grade': records[0].get('Grade') or None,
+            'teacher': records[0].get('Teacher') or None,
+        }))
+    return tasks
+
+
+def parent_tasks(args, students: "OrderedDict[str, List[dict]]") -> List[Task]:
+    """One parent message per student, with their roster notes as context."""
+    from core.logic.parent_writer import generate_parent_message
+    from core.logic.report_generator import collect_student_notes
+    tasks = []
+    for name, records in students.items():
+        performance_notes, behavior_notes = collect_student_notes(records)
+        context = "\n\n".join(part for part in [
+            args.context,
+            f"Subject notes:\n{performance_notes}" if performance_notes else "",
+            f"Behavior:\n{behavior_notes}" if behavior_notes else "",
+        ] if part)
+        teacher_name = args.teacher_name or records[0].get('Teacher', '')
+        tasks.append(Task(f"{args.purpose.title()} message for {name}", generate_parent_message, {
+            'purpose': args.purpose,
+            'child_name': name,
+            'context': context,
+            'teacher_name': teacher_name,
+            'grade': records[0].get('Grade') or None,
+        }))
+    return tasks
+
+
+def lesson_tasks(args) -> List[Task]:
+    """One lesson note per row of the --input CSV."""
+    from core.logic.lesson_generator import generate_lesson
+    tasks = []
+    with open(args.input, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            missing = [column for column in ('subject', 'topic', 'age_group', 'objectives') if not row.get(column)]
+            if missing:
+                raise ValueError(f"Lesson row is missing {', '.join(missing)}: {row}")
+            tasks.append(Task(f"{row['subject']}: {row['topic']}", generate_lesson, {
+                'subject': row['subject'],
+                'topic': row['topic'],
+                'age_group': row['age_group'],
+                'objectives': row['objectives'],
+                'duration': int(row.get('duration') or 60),
+            }))
+    return tasks
+
+
+def run_tasks(tasks: List[Task], workers: int, wrap: Optional[Callable] = None) -> List[dict]:
+    """
+    Run tasks on a private job queue and wait for all of them.
+
+    Ctrl+C cancels whatever hasn't started and waits for running jobs to
+    finish their current model call (a second Ctrl+C stops waiting).
+
+    Args:
+        wrap (callable): Applied to each task function before it's queued (e.g. a profiler)
+
+    Returns:
+        list[dict]: One summary item per task, in task order
+    """
+    jobs = JobQueue(workers=workers, max_finished=len(tasks) + 1)
+    job_ids = [jobs.submit(wrap(task.func) if wrap else task.func, kind="cli", label=task.label, **task.kwargs)
+               for task in tasks]
+    try:
+        finished = jobs.wait(job_ids)
+    except KeyboardInterrupt:
+        logger.warning("Interrupted: cancelling queued jobs and waiting for running ones")
+        for job_id in job_ids:
+            jobs.cancel(job_id)
+        try:
+            finished = jobs.wait(job_ids)
+        except KeyboardInterrupt:
+            finished = jobs.jobs(job_ids)
+
+    items = []
+    for job in finished:
+        result = job['result'] or {}
+        if job['status'] == SUCCEEDED and result.get('success'):
+            status = "succeeded"
+        elif job['status'] == CANCELLED:
+            status = "cancelled"
+        else:
+            status = "failed"
+        item = {
+            'label': job['label'],
+            'status': status,
+            'output_file': (result.get('metadata') or {}).get('output_file'),
+            'error': job['error'] or result.get('error'),
+            'seconds': round(job['finished_at'] - job['started_at'], 2) if job['started_at'] and job['finished_at'] else None,
+        }
+        if 'sheets_status' in result:
+            item['sheets_status'] = result['sheets_status']
+        if 'sheet_write' in result:
+            item['sheet_write'] = result['sheet_write']
+        items.append(item)
+    return items
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m teacher_ai",
+        description="Bulk-generate lesson notes, student reports and parent messages without the dashboard",
+    )
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--workers", type=int, default=settings.JOB_WORKERS,
+                        help=f"Parallel generation workers (default: {settings.JOB_WORKERS})")
+    common.add_argument("--min-interval", type=float,
+                        help=f"Minimum seconds between model calls (default: {settings.GOOGLE_MIN_CALL_INTERVAL:g})")
+    common.add_argument("--limit", type=int, help="Generate at most this many items")
+    common.add_argument("--output-dir", help=f"Where .txt outputs are written when the archive is off or "
+                                             f"ARCHIVE_WRITE_FILES is on (default: {settings.OUTPUT_DIR})")
+    common.add_argument("--summary-file", help="Also write the JSON summary to this file")
+    common.add_argument("--dry-run", action="store_true", help="List what would be generated without calling the model")
+    common.add_argument("--profile", choices=["sample", "cprofile"],
+                        help=f"Profile the run; writes a report and a .folded flamegraph file to {settings.PROFILING_DIR}")
+
+    roster = argparse.ArgumentParser(add_help=False)
+    roster.add_argument("--source", default="sheets",
+                        help="'sheets' (default) or a roster file (.csv, .parquet, .db)")
+    roster.add_argument("--sheet-id", help="Google Sheet ID (default: GOOGLE_SHEET_ID)")
+    roster.add_argument("--tab", default="Students", help="Sheet tab or SQLite table with the roster")
+    roster.add_argument("--teacher", help="Only this teacher's students")
+    roster.add_argument("--grade", help="Only students in this grade")
+    roster.add_argument("--student", action="append", dest="students", metavar="NAME",
+                        help="Only this student (repeatable)")
+
+    jobs = parser.add_subparsers(dest="job", required=True,
+                                 metavar="{report,parent,lesson,export,migrate-outputs,compact-archive,flush-sheets}")
+
+    report = jobs.add_parser("report", parents=[common, roster], help="Progress report per student")
+    report.add_argument("--period", required=True, help='Reporting period, e.g. "Term 1 (2025)"')
+    report.add_argument("--subject", default="Overall Progress", help="Report subject (default: Overall Progress)")
+    report.add_argument("--save-to-sheets", action="store_true", help="Write each report to the Reports tab")
+
+    parent = jobs.add_parser("parent", parents=[common, roster], help="Parent message per student")
+    parent.add_argument("--purpose", choices=PURPOSES, required=True, help="Message purpose")
+    parent.add_argument("--context", default="", help="Extra context added to every message")
+    parent.add_argument("--teacher-name", help="Sign-off name (default: the roster's Teacher column)")
+
+    lesson = jobs.add_parser("lesson", parents=[common], help="Lesson notes from a CSV of lesson specs")
+    lesson.add_argument("--input", required=True,
+                        help="CSV with subject, topic, age_group, objectives and optional duration columns")
+
+    export = jobs.add_parser("export", help="Export archived outputs into one zip file")
+    export.add_argument("--output", required=True, help="Zip file to write")
+    export.add_argument("--layout", choices=["files", "classes"], default="files",
+                        help="One .txt per output (files) or one document per grade and teacher (classes)")
+    export.add_argument("--kind", default="reports",
+                        help="Output type: reports, parent_messages, lessons or all (default: reports)")
+    export.add_argument("--period", help='Only this reporting period, e.g. "Term 1 (2025)"')
+    export.add_argument("--grade", help="Only this grade")
+    export.add_argument("--teacher", help="Only this teacher")
+    export.add_argument("--student", help="Only this student")
+    export.add_argument("--since", help="Only outputs created on or after this date (YYYY-MM-DD)")
+    export.add_argument("--until", help="Only outputs created before this date (YYYY-MM-DD)")
+
+    migrate = jobs.add_parser("migrate-outputs", help="Import existing .txt outputs into the output archive")
+    migrate.add_argument("--output-dir", help=f"Folder of .txt outputs to import (default: {settings.OUTPUT_DIR})")
+    migrate.add_argument("--batch-size", type=int, default=500, help="Files per insert transaction (default: 500)")
+    migrate.add_argument("--remove", action="store_true", help="Delete each file once it's archived")
+
+    compact = jobs.add_parser("compact-archive",
+                              help="Deduplicate and compress archived text and apply the retention policy")
+    compact.add_argument("--retention-days", type=float,
+                         help=f"Remove outputs older than this (default: {settings.ARCHIVE_RETENTION_DAYS:g}; 0 keeps all)")
+
+    flush = jobs.add_parser("flush-sheets", help="Write reports still queued in the Sheets outbox")
+    flush.add_argument("--retry-failed", action="store_true",
+                       help="Also requeue writes that were given up on after SHEETS_OUTBOX_MAX_ATTEMPTS")
+
+    return parser
+
+
+def flush_job(args) -> int:
+    """Replay the Sheets outbox now and print a JSON summary."""
+    from integrations.sheet_outbox import SheetOutbox
+    started = time.time()
+    try:
+        outbox = SheetOutbox()
+        requeued = outbox.retry_failed() if args.retry_failed else 0
+        result = {**outbox.flush(force=True), 'requeued': requeued}
+    except Exception as e:
+        logger.error(f"Flushing sheet writes failed: {e}")
+        print(json.dumps({'job': args.job, 'status': "error", 'error': str(e) or type(e).__name__}, indent=2))
+        return EXIT_FAILURES
+    print(json.dumps({
+        'job': args.job,
+        'status': "ok" if result['pending'] == 0 and result['failed'] == 0 else "failed",
+        **result,
+        'duration_seconds': round(time.time() - started, 2),
+    }, indent=2))
+    return EXIT_OK if result['pending'] == 0 and result['failed'] == 0 else EXIT_FAILURES
+
+
+def archive_job(args) -> int:
+    """Run an archive job (export, migrate-outputs, compact-archive) and print a JSON summary."""
+    from core.storage.archive import OutputArchive, migrate_output_files
+    started = time.time()
+    try:
+        if args.job == "export":
+            from core.storage.export import export_outputs
+            result = export_outputs(
+                args.output, layout=args.layout, since=args.since, until=args.until, kind=None if args.kind == "all" else args.kind,
+                period=args.period, grade=args.grade, teacher=args.teacher, student=args.student,
+            )
+            result['output'] = args.output
+        elif args.job == "migrate-outputs":
+            result = migrate_output_files(args.output_dir, batch_size=args.batch_size, remove=args.remove)
+        else:
+            result = OutputArchive().maintain(args.retention_days)
+    except Exception as e:
+        logger.error(f"Archive job {args.job} failed: {e}")
+        print(json.dumps({'job': args.job, 'status': "error", 'error': str(e) or type(e).__name__}, indent=2))
+        return EXIT_FAILURES
+    print(json.dumps({
+        'job': args.job,
+        'status': "ok",
+        **result,
+        'duration_seconds': round(time.time() - started, 2),
+    }, indent=2))
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the CLI and return its exit status."""
+    args = build_parser().parse_args(argv)
+    if args.job in ("export", "migrate-outputs", "compact-archive"):
+        return archive_job(args)
+    if args.job == "flush-sheets":
+        return flush_job(args)
+    started = time.time()
+
+    if args.min_interval is not None:
+        settings.override(GOOGLE_MIN_CALL_INTERVAL=max(0.0, args.min_interval))
+    if args.output_dir:
+        settings.override(OUTPUT_DIR=args.output_dir)
+    # `kill -HUP <pid>` re-reads .env mid-run (flags above still take precedence)
+    settings.install_reload_signal()
+
+    summary = {'job': args.job, 'started_at': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started))}
+    try:
+        if args.job == "lesson":
+            tasks = lesson_tasks(args)
+        else:
+            records = filter_records(load_roster(args.source, args.sheet_id, args.tab),
+                                     args.teacher, args.grade, args.students)
+            students = group_by_student(records)
+            summary['students'] = len(students)
+            if not students:
+                raise ValueError("No students match the given --teacher/--grade/--student filters")
+            tasks = report_tasks(args, students) if args.job == "report" else parent_tasks(args, students)
+    except Exception as e:
+        logger.error(f"Could not prepare {args.job} jobs: {e}")
+        summary.update({'status': "error", 'error': str(e) or type(e).__name__})
+        print(json.dumps(summary, indent=2))
+        return EXIT_USAGE
+
+    if args.limit is not None:
+        tasks = tasks[:max(0, args.limit)]
+
+    if args.dry_run:
+        items = [{'label': task.label, 'status': "planned"} for task in tasks]
+    else:
+        logger.info(f"Running {len(tasks)} {args.job} jobs on {args.workers} workers")
+        profile = None
+        if args.profile:
+            from utils.profiling import Profile
+            # Sample every thread (generation runs on workers) for the whole run
+            profile = Profile(f"cli_{args.job}", mode=args.profile, max_seconds=float("inf"), all_threads=True).start()
+        try:
+            items = run_tasks(tasks, args.workers, wrap=profile.wrap if profile else None) if tasks else []
+        finally:
+            if profile:
+                summary['profile'] = profile.stop()
+        if args.job == "report" and args.save_to_sheets:
+            summary['sheets'] = flush_sheet_writes(items)
+
+    counts = {status: sum(1 for item in items if item['status'] == status)
+              for status in ("succeeded", "failed", "cancelled")}
+    summary.update({
+        'status': "ok" if counts['failed'] == 0 and counts['cancelled'] == 0 else "failed",
+        'total': len(items),
+        **counts,
+        'duration_seconds': round(time.time() - started, 2),
+        'items': items,
+    })
+
+    output = json.dumps(summary, indent=2)
+    print(output)
+    if args.summary_file:
+        with open(args.summary_file, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    return EXIT_OK if summary['status'] == "ok" else EXIT_FAILURES
@@ -0,0 +1,75 @@
+"""
+Shared cache helpers.
+The lookup counter every cache in the app reports to, and a per-source
+refresh cooldown so a burst of "Refresh" clicks results in at most one
+upstream reload.
+"""
+import threading
+import time
+from typing import Dict, Hashable
+
+from config import settings
+from utils import metrics
+
+CACHE_REQUESTS = metrics.counter("cache_requests_total", "Cache lookups", ["region", "result"])
+
+
+class RefreshCooldown:
+    """
+    Rate limit for manual refreshes, per source.
+
+    Sources are keyed like (spreadsheet_id, tab); a refresh is allowed at
+    most once per `cooldown` seconds for each key.
+    """
+
+    def __init__(self, cooldown: float = 30):
+        self.cooldown = cooldown
+        self._last_refresh: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def request_refresh(self, key: Hashable) -> bool:
+        """
+        Claim a refresh of a source unless it was refreshed within the cooldown.
+
+        Args:
+            key: Source key, e.g. (spreadsheet_id, tab)
+
+        Returns:
+            bool: True if the caller should refresh now, False if still cooling down
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_refresh.get(key)
+            if last is not None and now - last < self.cooldown:
+                return False
+            self._last_refresh[key] = now
+        return True
+
+    def release(self, key: Hashable) -> None:
+        """Give back a claimed refresh (e.g. the reload failed), so it can be retried at once."""
+        with self._lock:
+            self._last_refresh.pop(key, None)
+
+    def cooldown_remaining(self, key: Hashable) -> float:
+        """Seconds until the source can be refreshed again (0 if now)."""
+        with self._lock:
+            last = self._last_refresh.get(key)
+        if last is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - last))
+
+
+# Shared by every session in the process (modules are imported once)
+_cooldown = RefreshCooldown(cooldown=settings.REFRESH_COOLDOWN_SECONDS)
+
+
+def _apply_settings(old, new):
+    _cooldown.cooldown = new.REFRESH_COOLDOWN_SECONDS
+
+
+settings.on_reload(_apply_settings)
+
+
+def get_refresh_cooldown() -> RefreshCooldown:
+    """Return the process-wide refresh cooldown."""
+    return _cooldown
@@ -3,17 +3,47 @@ Shared utility functions for the AI Teaching Assistant.
 Includes Google Gemini API wrapper, file operations, logging, and text processing.
 """
 import os
+import hashlib
 import logging
 from datetime import datetime
-from google import genai
 import time
 import random
+import threading
 from config import settings
+from utils import metrics
+from utils.logs import configure_logging
+
+# Serializes the free-tier cooldown check across threads
+_rate_limit_lock = threading.Lock()
+
+MODEL_RATE_LIMIT_WAIT = metrics.histogram(
+    "model_rate_limit_wait_seconds", "Time a model call waited for the rate limiter (lock and cooldown)")
+MODEL_LATENCY = metrics.histogram(
+    "model_request_seconds", "Model API request latency per attempt", ["outcome"])
+MODEL_RETRIES = metrics.counter("model_retries_total", "Model requests retried after a rate-limit response")
+MODEL_TOKENS = metrics.counter(
+    "model_tokens_total", "Tokens sent to (in) and generated by (out) the model", ["direction"])
+PROMPT_LOADS = metrics.counter("prompt_template_loads_total", "Prompt template lookups", ["result"])
+PROMPT_READ = metrics.histogram("prompt_template_read_seconds", "Time to read a prompt template from disk")
+OUTPUT_SAVE = metrics.histogram("output_save_seconds", "Time to store a generated output", ["backend"])
+GENERATION_SECONDS = metrics.histogram(
+    "generation_seconds", "End-to-end time of one generation (prompt, model, save)", ["kind"])
+GENERATIONS = metrics.counter("generations_total", "Generations finished", ["kind", "outcome"])
+
+# Prompt templates by name: (file mtime, text)
+_prompt_cache = {}
+_prompt_lock = threading.Lock()
+_genai_clients = {}
+_genai_lock = threading.Lock()
 
 
 def setup_logger(name):
     """
-    Set up a logger with file and console handlers.
+    Get a logger that writes through the process-wide logging queue.
+    
+    Records are queued and written to the (rotating) log file and the
+    console by a background thread; see utils/logs.py. Safe and cheap to
+    call repeatedly.
     
     Args:
         name (str): Logger name (usually __name__ of the calling module)
@@ -21,37 +51,65 @@ def setup_logger(name):
     Returns:
         logging.Logger: Configured logger instance
     """
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.dirname(settings.LOG_FILE)
-    if log_dir and not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
+    handler = configure_logging()
     logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, settings.LOG_LEVEL))
     
     # Avoid adding duplicate handlers
-    if not logger.handlers:
-        # File handler
-        file_handler = logging.FileHandler(settings.LOG_FILE, encoding="utf-8")
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    if handler not in logger.handlers:
+        logger.setLevel(getattr(logging, settings.LOG_LEVEL))
+        logger.addHandler(handler)
     
     return logger
 
 
+logger = setup_logger(__name__)
+
+
+def get_genai_client(api_key=None):
+    """
+    Return a shared Google Gemini client, creating it on first use.
+    
+    Args:
+        api_key (str): API key (default: settings.GOOGLE_API_KEY)
+    
+    Returns:
+        genai.Client: Client reused across calls and threads
+    """
+    api_key = api_key or settings.GOOGLE_API_KEY
+    with _genai_lock:
+        client = _genai_clients.get(api_key)
+        if client is None:
+            # Imported on first use: the SDK is slow to import and most pages never call the model
+            from google import genai
+            client = _genai_clients[api_key] = genai.Client(api_key=api_key)
+        return client
+
+
+def load_prompt(name):
+    """
+    Load a prompt template from core/prompts, cached until the file changes.
+    
+    Args:
+        name (str): Template name, e.g. "lesson" for core/prompts/lesson_prompt.txt
+    
+    Returns:
+        str: Template text
+    """
+    prompt_path = os.path.join("core", "prompts", f"{name}_prompt.txt")
+    mtime = os.path.getmtime(prompt_path)
+    with _prompt_lock:
+        cached = _prompt_cache.get(name)
+        if cached and cached[0] == mtime:
+            PROMPT_LOADS.inc(result="hit")
+            return cached[1]
+    PROMPT_LOADS.inc(result="miss")
+    with PROMPT_READ.time(), open(prompt_path, "r", encoding="utf-8") as f:
+        template = f.read()
+    with _prompt_lock:
+        _prompt_cache[name] = (mtime, template)
+    return template
+
+
 def call_openai(prompt, system_message=None, temperature=None, max_tokens=None):
     """
     Call Google Gemini API with error handling and retry logic.
@@ -69,8 +127,6 @@ def call_openai(prompt, system_message=None, temperature=None, max_tokens=None):
     Raises:
         Exception: If API call fails after retries
     """
-    logger = setup_logger(__name__)
-    
     # Use settings defaults if not specified
     temperature = temperature if temperature is not None else settings.GOOGLE_TEMPERATURE
     max_tokens = max_tokens if max_tokens is not None else settings.GOOGLE_MAX_TOKENS
@@ -78,20 +134,25 @@ def call_openai(prompt, system_message=None, temperature=None, max_tokens=None):
     if not settings.GOOGLE_API_KEY:
         raise Exception("Missing GOOGLE_API_KEY. Set it in environment variables before calling the model.")
 
-    # Rate limiting: enforce 15-second cooldown between API calls for free tier
-    if not hasattr(call_openai, "_last_call_time"):
-        call_openai._last_call_time = 0
-    
-    time_since_last_call = time.time() - call_openai._last_call_time
-    if time_since_last_call < 15:
-        wait_time = 15 - time_since_last_call
-        logger.info(f"Rate limiting: waiting {wait_time:.1f}s before next API call")
-        time.sleep(wait_time)
-    
-    call_openai._last_call_time = time.time()
+    # Rate limiting: enforce a cooldown between API calls (15s suits the free tier).
+    # The lock makes concurrent callers (background job workers) queue up.
+    wait_started = time.perf_counter()
+    with _rate_limit_lock:
+        if not hasattr(call_openai, "_last_call_time"):
+            call_openai._last_call_time = 0
+        
+        min_interval = settings.GOOGLE_MIN_CALL_INTERVAL
+        time_since_last_call = time.time() - call_openai._last_call_time
+        if time_since_last_call < min_interval:
+            wait_time = min_interval - time_since_last_call
+            logger.info(f"Rate limiting: waiting {wait_time:.1f}s before next API call")
+            time.sleep(wait_time)
+        
+        call_openai._last_call_time = time.time()
+    MODEL_RATE_LIMIT_WAIT.observe(time.perf_counter() - wait_started)
     logger.debug(f"Calling Google Gemini API with model: {settings.GOOGLE_MODEL}")
 
-    client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+    client = get_genai_client()
 
     full_prompt = prompt
     if system_message:
@@ -99,6 +160,7 @@ def call_openai(prompt, system_message=None, temperature=None, max_tokens=None):
 
     retries = 3
     for attempt in range(retries):
+        started = time.perf_counter()
         try:
             response = client.models.generate_content(
                 model=settings.GOOGLE_MODEL,
@@ -110,16 +172,21 @@ def call_openai(prompt, system_message=None, temperature=None, max_tokens=None):
             )
 
             generated_text = (response.text or "").strip()
+            MODEL_LATENCY.observe(time.perf_counter() - started, outcome="ok")
+            _count_tokens(response, full_prompt, generated_text)
             logger.debug(f"Google Gemini API response received ({len(generated_text)} chars)")
             return generated_text
 
         except Exception as e:
             message = str(e)
             upper = message.upper()
+            rate_limited = "QUOTA" in upper or "RATE" in upper or "429" in upper
+            MODEL_LATENCY.observe(time.perf_counter() - started, outcome="rate_limited" if rate_limited else "error")
             if "API_KEY" in upper or "401" in upper:
                 raise Exception("Invalid API key. Please check your GOOGLE_API_KEY in .env")
-            if "QUOTA" in upper or "RATE" in upper or "429" in upper:
+            if rate_limited:
                 if attempt < retries - 1:
+                    MODEL_RETRIES.inc()
                     # Free tier: wait longer between retries (30s, 60s)
                     delay = 30 * (attempt + 1)
                     logger.warning(f"Rate limit hit. Waiting {delay}s before retry {attempt+2}/{retries}")
@@ -130,40 +197,78 @@ def call_openai(prompt, system_message=None, temperature=None, max_tokens=None):
             raise Exception(f"Google Gemini API failed: {message}")
 
 
-def save_to_file(content, filename, folder=""):
+def _count_tokens(response, prompt, generated_text):
+    """Record token usage from the response, or estimate it (~4 chars per token) if absent."""
+    usage = getattr(response, "usage_metadata", None)
+    tokens_in = getattr(usage, "prompt_token_count", None)
+    tokens_out = getattr(usage, "candidates_token_count", None)
+    MODEL_TOKENS.inc(tokens_in if tokens_in is not None else len(prompt) // 4, direction="in")
+    MODEL_TOKENS.inc(tokens_out if tokens_out is not None else len(generated_text) // 4, direction="out")
+
+
+def hash_text(text):
     """
-    Save generated content to a timestamped file.
+    Short stable hash of a text (e.g. a prompt), for indexing and dedup.
     
     Args:
-        content (str): Content to save
-        filename (str): Base filename (without extension)
-        folder (str): Subfolder within OUTPUT_DIR (e.g., "lessons", "reports")
+        text (str): Text to hash
     
     Returns:
-        str: Full path to saved file
+        str: 32-character hex digest
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def save_to_file(content, filename, folder="", metadata=None):
     """
-    logger = setup_logger(__name__)
+    Save generated content to the output archive (and/or a timestamped file).
     
-    # Create output directory structure
-    output_dir = os.path.join(settings.OUTPUT_DIR, folder)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    Args:
+        content (str): Content to save
+        filename (str): Base filename (without extension)
+        folder (str): Output kind / subfolder within OUTPUT_DIR (e.g., "lessons", "reports")
+        metadata (dict): Optional archive metadata: student, subject, period,
+            teacher, prompt_hash
     
-    # Add timestamp to filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    full_filename = f"{filename}_{timestamp}.txt"
-    filepath = os.path.join(output_dir, full_filename)
+    Returns:
+        str: Archive locator (e.g. "archive://42"), or the file path when the
+        archive is disabled
+    """
+    saved = None
+    if settings.ARCHIVE_ENABLED:
+        from core.storage.archive import get_archive, locator
+        with OUTPUT_SAVE.time(backend="archive"):
+            output_id = get_archive().add(content, kind=folder or "general", name=filename, **(metadata or {}))
+        saved = locator(output_id)
+        logger.info(f"Content archived as {saved}")
     
-    try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(content)
+    if not settings.ARCHIVE_ENABLED or settings.ARCHIVE_WRITE_FILES:
+        # Create output directory structure
+        output_dir = os.path.join(settings.OUTPUT_DIR, folder)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Add timestamp to filename; never overwrite a file from the same second
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(output_dir, f"{filename}_{timestamp}.txt")
+        suffix = 1
+        save_started = time.perf_counter()
+        while True:
+            try:
+                with open(filepath, "x", encoding="utf-8") as f:
+                    f.write(content)
+                break
+            except FileExistsError:
+                suffix += 1
+                filepath = os.path.join(output_dir, f"{filename}_{timestamp}_{suffix}.txt")
+            except Exception as e:
+                logger.error(f"Failed to save file: {e}")
+                raise
         
+        OUTPUT_SAVE.observe(time.perf_counter() - save_started, backend="file")
         logger.info(f"Content saved to: {filepath}")
-        return filepath
+        saved = saved or filepath
     
-    except Exception as e:
-        logger.error(f"Failed to save file: {e}")
-        raise
+    return saved
 
 
 def clean_text(text):
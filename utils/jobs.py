@@ -0,0 +1,279 @@
+"""
+Background job queue for long-running generation work.
+Jobs run on worker threads owned by the process, so they survive Streamlit
+reruns; callers keep only the job ID and poll for status and results.
+"""
+import itertools
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import settings
+from utils import metrics
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+JOB_QUEUE_WAIT = metrics.histogram("job_queue_wait_seconds", "Time a job waited for a free worker", ["kind"])
+JOB_RUN = metrics.histogram("job_run_seconds", "Time a job ran on its worker", ["kind", "status"])
+JOBS_WAITING = metrics.gauge("jobs_waiting", "Jobs queued and not yet started")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# The job each worker thread is running, for cancel_requested()
+_current = threading.local()
+
+
+def cancel_requested() -> bool:
+    """True if the job running on this thread has been asked to cancel (False outside jobs)."""
+    job = getattr(_current, 'job', None)
+    return bool(job and job.cancel_requested)
+
+
+class Job:
+    """A unit of work plus its status, result and timings."""
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, kind: str = "", label: str = ""):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.kind = kind
+        self.label = label
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the job (no callable, safe to render)."""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'label': self.label,
+            'status': self.status,
+            'cancel_requested': self.cancel_requested,
+            'result': self.result,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    FIFO job queue served by a fixed pool of daemon worker threads.
+
+    Queued jobs can be cancelled outright. A running job can't be
+    interrupted mid model call, so cancelling it only sets cancel_requested:
+    it stays running until func returns (func can check cancel_requested()
+    to skip side effects), then it is marked cancelled and its result is
+    discarded. Finished jobs are kept up to max_finished, oldest dropped first.
+    """
+
+    def __init__(self, workers: int = 2, max_finished: int = 500):
+        self.workers = max(1, workers)
+        self.max_finished = max_finished
+        self._queue = queue.Queue()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        # Workers told to exit (by resize) that haven't picked up their stop marker yet
+        self._retiring = 0
+        self._counter = itertools.count(1)
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) - self._retiring < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"job-worker-{next(self._counter)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    # Stop marker from resize()
+                    with self._lock:
+                        self._retiring -= 1
+                        self._threads.remove(threading.current_thread())
+                    return
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def resize(self, workers: int) -> None:
+        """
+        Change the number of worker threads.
+
+        Extra workers start right away. Surplus workers exit once the jobs
+        queued before the resize have been picked up; running jobs finish.
+        """
+        workers = max(1, workers)
+        with self._lock:
+            surplus = len(self._threads) - self._retiring - workers
+            self.workers = workers
+            if surplus > 0:
+                self._retiring += surplus
+        for _ in range(max(surplus, 0)):
+            self._queue.put(None)
+        self._ensure_workers()
+        logger.info(f"Job queue resized to {workers} workers")
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.status == CANCELLED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        JOBS_WAITING.dec()
+        JOB_QUEUE_WAIT.observe(job.started_at - job.submitted_at, kind=job.kind)
+
+        logger.info(f"Job {job.id} ({job.kind}) started: {job.label}")
+        _current.job = job
+        try:
+            result, error, status = job.func(*job.args, **job.kwargs), None, SUCCEEDED
+        except Exception as e:
+            result, error, status = None, str(e), FAILED
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+        finally:
+            _current.job = None
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.cancel_requested:
+                job.status = CANCELLED
+            else:
+                job.status, job.result, job.error = status, result, error
+            self._prune()
+            self._finished.notify_all()
+        JOB_RUN.observe(job.finished_at - job.started_at, kind=job.kind, status=job.status)
+        logger.info(f"Job {job.id} ({job.kind}) {job.status} in {job.finished_at - job.started_at:.1f}s")
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def submit(self, func: Callable, *args, kind: str = "", label: str = "", **kwargs) -> str:
+        """
+        Queue func(*args, **kwargs) to run on a worker thread.
+
+        Args:
+            func (callable): Work to run (must not call Streamlit APIs)
+            kind (str): Job category, e.g. "lesson" or "report"
+            label (str): Human-readable description for status displays
+
+        Returns:
+            str: Job ID
+        """
+        job = Job(func, args, kwargs, kind=kind, label=label)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._ensure_workers()
+        JOBS_WAITING.inc()
+        self._queue.put(job)
+        logger.info(f"Job {job.id} ({kind}) queued: {label}")
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's public view, or None if unknown or pruned."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def jobs(self, job_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Return the public views of the given jobs, skipping unknown IDs."""
+        with self._lock:
+            return [self._jobs[job_id].to_dict() for job_id in job_ids if job_id in self._jobs]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job.
+
+        A queued job is cancelled at once. A running job is flagged and
+        stays running until its function returns; wait() waits for it.
+
+        Returns:
+            bool: True if the job was queued or running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                JOBS_WAITING.dec()
+                self._finished.notify_all()
+                logger.info(f"Job {job_id} cancelled")
+            else:
+                job.cancel_requested = True
+                logger.info(f"Job {job_id} will be cancelled when its current step finishes")
+        return True
+
+    def wait(self, job_ids: Iterable[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Block until the given jobs have finished (or timeout seconds pass).
+
+        Returns:
+            list[dict]: The jobs' public views, in the order given
+        """
+        job_ids = list(job_ids)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def done():
+            return all(
+                self._jobs[job_id].status in FINISHED_STATES for job_id in job_ids if job_id in self._jobs
+            )
+
+        with self._finished:
+            while not done():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._finished.wait(remaining)
+            return [self._jobs[job_id].to_dict() for job_id in job_ids if job_id in self._jobs]
+
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue (created on first use)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(workers=settings.JOB_WORKERS)
+        return _queue
+
+
+def _apply_settings(old, new):
+    if old.JOB_WORKERS != new.JOB_WORKERS and _queue is not None:
+        _queue.resize(new.JOB_WORKERS)
+
+
+settings.on_reload(_apply_settings)
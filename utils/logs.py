@@ -0,0 +1,153 @@
+"""
+Process-wide logging setup.
+Loggers put records on an in-memory queue and a single background thread
+writes them to a rotating log file and the console, so logging I/O never
+blocks a request or generation thread.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_plain = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+            'process': record.process,
+        }
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _ProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that starts a fresh listener in forked child processes."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now (args may change before the
+        # writer thread runs), but keep them separate so formatters can lay
+        # them out, e.g. as a JSON "exception" field
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if _state['pid'] != os.getpid():
+            with _lock:
+                if _state['pid'] != os.getpid():
+                    _start_listener()
+        self.queue.put_nowait(record)
+
+
+def _file_handler() -> logging.Handler:
+    """File handler for settings.LOG_ROTATION: "size", "time" or "none"."""
+    rotation = settings.LOG_ROTATION.lower()
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            settings.LOG_FILE, when=settings.LOG_ROTATION_WHEN,
+            backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+    if rotation == "size":
+        return logging.handlers.RotatingFileHandler(
+            settings.LOG_FILE, maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+    return logging.FileHandler(settings.LOG_FILE, encoding="utf-8")
+
+
+def _start_listener() -> None:
+    log_dir = os.path.dirname(settings.LOG_FILE)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    if settings.LOG_FORMAT.lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    file_handler = _file_handler()
+    file_handler.setLevel(logging.DEBUG)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+
+    _state['handler'].queue = log_queue
+    _state['listener'] = listener
+    _state['pid'] = os.getpid()
+
+
+_state = {'handler': None, 'listener': None, 'pid': None}
+_lock = threading.Lock()
+
+
+def configure_logging() -> logging.Handler:
+    """
+    Set up the queue and its writer thread (once per process).
+
+    Returns:
+        logging.Handler: The queue handler to attach to loggers
+    """
+    handler = _state['handler']
+    if handler is not None:
+        return handler
+    with _lock:
+        if _state['handler'] is None:
+            _state['handler'] = _ProcessQueueHandler(queue.Queue(-1))
+            _start_listener()
+            atexit.register(shutdown_logging)
+        return _state['handler']
+
+
+def _apply_settings(old, new):
+    # setup_logger() sets LOG_LEVEL when it attaches the handler; re-apply it
+    # to every logger it configured
+    if old.LOG_LEVEL == new.LOG_LEVEL or _state['handler'] is None:
+        return
+    level = getattr(logging, new.LOG_LEVEL)
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger) and _state['handler'] in logger.handlers:
+            logger.setLevel(level)
+
+
+settings.on_reload(_apply_settings)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    listener = _state['listener']
+    if listener is not None and _state['pid'] == os.getpid():
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        _state['listener'] = None
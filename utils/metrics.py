@@ -0,0 +1,302 @@
+"""
+In-process metrics.
+Counters, gauges and histograms recorded by the model client, generators,
+job queue, caches and Sheets integration, exposed in Prometheus text format
+on a local port and summarized on the dashboard's admin page.
+"""
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import settings
+
+# Seconds; spans cache reads (ms) to rate-limited model calls (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(sample name, formatted labels, value) lines for the exposition format."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or tokens."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        return [(self.name, _format_labels(self.labelnames, key), value)
+                for key, value in sorted(self.values().items())]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. jobs waiting in the queue."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        return [(self.name, _format_labels(self.labelnames, key), value)
+                for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observations (usually seconds) in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe how long the with-block takes."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _copy(self) -> Dict[Tuple[str, ...], list]:
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._series.items()}
+
+    def samples(self):
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in sorted(self._copy().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append((f"{self.name}_bucket", _format_labels(names, key + (_format_value(bound),)), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            lines.append((f"{self.name}_sum", labels, total))
+            lines.append((f"{self.name}_count", labels, count))
+        return lines
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        # Linear interpolation within the bucket, as Prometheus' histogram_quantile does
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                return lower + (bound - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound
+        return self.buckets[-1] if self.buckets else 0.0
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per label set: count, sum, mean and estimated p50/p95."""
+        rows = []
+        for key, (counts, total, count) in sorted(self._copy().items()):
+            rows.append({
+                **dict(zip(self.labelnames, key)),
+                'count': count,
+                'sum': total,
+                'mean': total / count if count else 0.0,
+                'p50': self._quantile(counts, count, 0.5),
+                'p95': self._quantile(counts, count, 0.95),
+            })
+        return rows
+
+
+class Registry:
+    """Named metrics; asking for an existing name returns the same metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self) -> str:
+        """Every metric in Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self.metrics()) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+
+
+def timed(metric: Histogram, **labels) -> Callable:
+    """Decorator: observe each call's duration in a histogram."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown the console
+        pass
+
+
+_server = {'httpd': None, 'error': None}
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[str]:
+    """
+    Serve /metrics on a background thread (once per process).
+
+    Args:
+        port (int): Port to listen on (default: settings.METRICS_PORT; 0 disables)
+        host (str): Interface to bind (default: settings.METRICS_HOST)
+
+    Returns:
+        str: The metrics URL, or None if disabled or the port was unavailable
+    """
+    port = settings.METRICS_PORT if port is None else port
+    host = host or settings.METRICS_HOST
+    if not port:
+        return None
+    with _server_lock:
+        if _server['httpd'] is None and _server['error'] is None:
+            from utils.helpers import setup_logger
+            logger = setup_logger(__name__)
+            try:
+                httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                # Usually another process (a second dashboard) already serves metrics
+                _server['error'] = str(e)
+                logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, name="metrics-server", daemon=True).start()
+            _server['httpd'] = httpd
+            logger.info(f"Serving metrics at http://{host}:{port}/metrics")
+        httpd = _server['httpd']
+        if httpd is None:
+            return None
+        bound_host, bound_port = httpd.server_address[:2]
+        return f"http://{bound_host}:{bound_port}/metrics"
@@ -0,0 +1,296 @@
+"""
+On-demand profiling.
+A sampling profiler (a background thread reading other threads' stacks a
+few hundred times a second) cheap enough to leave on for a fraction of
+dashboard reruns, and a deterministic cProfile mode for bulk jobs. Each
+profile is written as a timestamped report plus a collapsed-stack .folded
+file that flamegraph.pl, speedscope or inferno can render.
+"""
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+MODES = (SAMPLE, CPROFILE)
+
+MAX_STACK_DEPTH = 128
+TOP_FUNCTIONS = 30
+
+# From 3.12 cProfile runs on sys.monitoring: one profiler at a time, seeing
+# every thread. Earlier versions profile only the thread that enabled it.
+CPROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+_sequence = itertools.count(1)
+
+# Admin-page overrides of the PROFILING_* settings (None = use the setting)
+_overrides = {'enabled': None, 'sample_rate': None}
+
+
+def configure(enabled: Optional[bool] = None, sample_rate: Optional[float] = None) -> None:
+    """Override PROFILING_ENABLED / PROFILING_SAMPLE_RATE for this process (None restores the setting)."""
+    _overrides['enabled'] = enabled
+    _overrides['sample_rate'] = sample_rate
+
+
+def is_enabled() -> bool:
+    enabled = _overrides['enabled']
+    return settings.PROFILING_ENABLED if enabled is None else enabled
+
+
+def sample_rate() -> float:
+    rate = _overrides['sample_rate']
+    return settings.PROFILING_SAMPLE_RATE if rate is None else rate
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    try:
+        filename = os.path.relpath(filename)
+    except ValueError:
+        pass
+    if filename.startswith(".."):
+        filename = os.path.basename(filename)
+    # ';' separates frames and a trailing space separates the count in .folded files
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _stack(frame, root=None) -> Optional[List[str]]:
+    """
+    Root-first labels of frame's stack; None if root was given and isn't on it.
+    Only the innermost MAX_STACK_DEPTH frames are labelled; deeper stacks start
+    with a "[deeper frames]" marker.
+    """
+    frames = []
+    found = root is None
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            found = True
+            break
+        frame = frame.f_back
+    if not found:
+        return None
+    labels = [_frame_label(frame) for frame in frames[:MAX_STACK_DEPTH]]
+    if len(frames) > MAX_STACK_DEPTH:
+        labels.append("[deeper frames]")
+    labels.reverse()
+    return labels
+
+
+class Profile:
+    """
+    One profiling session.
+
+    In sample mode a daemon thread records the stacks of one thread (or of
+    every thread) each `interval` seconds. With a root frame, sampling
+    stops by itself once that frame has returned, so a Streamlit rerun cut
+    short by st.stop() or st.rerun() is still written out. cprofile mode
+    additionally runs cProfile on the starting thread and on any function
+    passed through wrap() (e.g. job-queue tasks); on Python 3.12+ a single
+    cProfile sees every thread, so wrap() has nothing to add.
+    """
+
+    def __init__(self, name: str, mode: str = SAMPLE, interval: Optional[float] = None,
+                 max_seconds: Optional[float] = None, output_dir: Optional[str] = None,
+                 all_threads: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode} (expected one of {', '.join(MODES)})")
+        self.name = name
+        self.mode = mode
+        self.interval = interval if interval is not None else settings.PROFILING_INTERVAL_MS / 1000
+        self.max_seconds = max_seconds if max_seconds is not None else settings.PROFILING_MAX_SECONDS
+        self.output_dir = output_dir or settings.PROFILING_DIR
+        self.all_threads = all_threads
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.truncated = False
+        self.paths: Dict[str, str] = {}
+        self._thread_id = None
+        self._root = None
+        self._started = None
+        self._stopped = threading.Event()
+        self._finish_lock = threading.Lock()
+        self._finished = False
+        self._sampler = None
+        self._cprofile = None
+        self._cprofiles: List[cProfile.Profile] = []
+        self._cprofiles_lock = threading.Lock()
+
+    def start(self, root=None) -> 'Profile':
+        """
+        Start profiling the calling thread.
+
+        Args:
+            root: Frame whose return ends the session (default: none; call stop())
+        """
+        self._thread_id = threading.get_ident()
+        self._root = root
+        self._started = time.time()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.name}", daemon=True)
+        self._sampler.start()
+        if self.mode == CPROFILE:
+            self._cprofile = cProfile.Profile()
+            try:
+                self._cprofile.enable()
+            except ValueError as e:
+                # Another profiler or debugger already holds sys.monitoring (3.12+)
+                self._cprofile = None
+                from utils.helpers import setup_logger
+                setup_logger(__name__).warning(f"cProfile not started for {self.name}, sampling only: {e}")
+        return self
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            if self.all_threads:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident != own_id:
+                        self.stacks[";".join([names.get(ident, str(ident))] + _stack(frame))] += 1
+            else:
+                frame = frames.get(self._thread_id)
+                stack = _stack(frame, self._root) if frame is not None else None
+                if stack is None:
+                    # The profiled rerun has finished (normally or not)
+                    break
+                self.stacks[";".join(stack)] += 1
+            del frames
+            self.samples += 1
+            if time.monotonic() >= deadline:
+                self.truncated = True
+                break
+        if not self._stopped.is_set():
+            self._finish()
+
+    def wrap(self, func: Callable) -> Callable:
+        """Run func under its own cProfile (cprofile mode, before 3.12) and merge it into this profile."""
+        if self.mode != CPROFILE or CPROFILE_ALL_THREADS:
+            return func
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._cprofiles_lock:
+                    self._cprofiles.append(profile)
+        return profiled
+
+    def stop(self) -> Dict[str, str]:
+        """
+        Stop profiling and write the output files.
+
+        Returns:
+            dict: Paths of the files written (empty if nothing was recorded)
+        """
+        if self._cprofile is not None and threading.get_ident() == self._thread_id:
+            self._cprofile.disable()
+        self._stopped.set()
+        if self._sampler is not None and self._sampler is not threading.current_thread():
+            self._sampler.join()
+        return self._finish()
+
+    def _finish(self) -> Dict[str, str]:
+        with self._finish_lock:
+            if self._finished:
+                return self.paths
+            self._finished = True
+            self._root = None
+            try:
+                self._write()
+            except Exception as e:
+                from utils.helpers import setup_logger
+                setup_logger(__name__).error(f"Could not write profile {self.name}: {e}")
+            return self.paths
+
+    def _write(self) -> None:
+        profiles = [profile for profile in [self._cprofile] + self._cprofiles if profile is not None]
+        if not self.stacks and not profiles:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(self._started).strftime("%Y%m%d_%H%M%S")
+        # pid and a sequence number keep concurrent sessions from colliding
+        base = os.path.join(self.output_dir, f"{self.name}_{stamp}_{os.getpid()}_{next(_sequence)}")
+        elapsed = time.time() - self._started
+
+        if self.stacks:
+            self.paths['folded'] = base + ".folded"
+            with open(self.paths['folded'], "w", encoding="utf-8") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        if profiles:
+            stats = pstats.Stats(*profiles)
+            self.paths['prof'] = base + ".prof"
+            stats.dump_stats(self.paths['prof'])
+
+        self.paths['report'] = base + ".txt"
+        with open(self.paths['report'], "w", encoding="utf-8") as f:
+            f.write(f"Profile: {self.name} ({self.mode})\n")
+            f.write(f"Started: {datetime.fromtimestamp(self._started).isoformat(timespec='seconds')}\n")
+            f.write(f"Wall time: {elapsed:.2f}s; {self.samples} samples every {self.interval * 1000:g} ms"
+                    f"{' (stopped at PROFILING_MAX_SECONDS)' if self.truncated else ''}\n\n")
+            if self.stacks:
+                f.write(self._sample_report())
+            if profiles:
+                out = io.StringIO()
+                pstats.Stats(*profiles, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+                f.write("\nDeterministic profile (cProfile), by cumulative time:\n")
+                f.write(out.getvalue())
+
+    def _sample_report(self) -> str:
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        lines = [f"Top functions by samples (of {total}):", "", f"{'self %':>7} {'total %':>8}  function"]
+        for frame, count in own.most_common(TOP_FUNCTIONS):
+            lines.append(f"{100 * count / total:7.1f} {100 * inclusive[frame] / total:8.1f}  {frame}")
+        return "\n".join(lines) + "\n"
+
+
+def profile_rerun(name: str = "dashboard") -> Optional[Profile]:
+    """
+    Maybe start a sampling profile of the current script run.
+
+    Call at the top of a Streamlit script. A fraction (sample rate) of runs
+    is profiled while profiling is enabled; the session ends when the
+    calling script's frame returns, or when stop() is called.
+
+    Returns:
+        Profile: The running session, or None if this run isn't profiled
+    """
+    if not is_enabled() or random.random() >= sample_rate():
+        return None
+    return Profile(name, mode=SAMPLE).start(root=sys._getframe(1))
+
+
+def recent_profiles(limit: int = 20) -> List[Dict[str, object]]:
+    """Newest profile files in PROFILING_DIR, for the admin page."""
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    entries = []
+    for entry in os.scandir(settings.PROFILING_DIR):
+        if entry.is_file() and entry.name.endswith((".folded", ".prof", ".txt")):
+            entries.append({'name': entry.name, 'path': entry.path,
+                            'size': entry.stat().st_size, 'modified': entry.stat().st_mtime})
+    entries.sort(key=lambda entry: entry['modified'], reverse=True)
+    return entries[:limit]
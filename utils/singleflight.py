@@ -0,0 +1,155 @@
+"""
+Single-flight deduplication of identical in-flight calls.
+When several callers ask for the same thing at the same time (e.g. teachers
+planning the same lesson), one call runs and every caller gets its result,
+so the model is called once and nobody else waits in the rate-limit queue.
+"""
+import copy
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from utils import metrics
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+SHARED_CALLS = metrics.counter("singleflight_shared_total", "Requests served by an identical call already in flight")
+
+
+def normalize(value: Any) -> Hashable:
+    """
+    Normalize a call argument for use in a dedup key.
+
+    Strings are case-folded with whitespace collapsed, so "Fractions " and
+    "fractions" coalesce; numbers compare by value (60 == 60.0 == "60");
+    lists, tuples and dicts are normalized element-wise.
+    """
+    if isinstance(value, str):
+        text = " ".join(value.split()).casefold()
+        try:
+            return float(text)
+        except ValueError:
+            return text
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), normalize(item)) for key, item in value.items()))
+    return repr(value)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers share it.
+
+    Nothing is cached once the call finishes: the next caller with the
+    same key starts a fresh call. Followers receive deep copies of the
+    result so no caller can mutate another's.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run func(*args, **kwargs), or wait for the identical call in flight.
+
+        Args:
+            key: Dedup key; calls with equal keys are treated as identical
+            func (callable): Work to run if no call with this key is in flight
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller's
+            call produced the result
+
+        Raises:
+            Whatever func raised, in the leader and in every follower
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.calls += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.shared += 1
+                SHARED_CALLS.inc()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"Coalesced {call.waiters} identical request(s) into one call: {key[0] if isinstance(key, tuple) else key}")
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running."""
+        with self._lock:
+            return len(self._calls)
+
+    def info(self) -> Dict[str, int]:
+        """Return counts of calls made and requests served by a shared call."""
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._calls)}
+
+
+_group = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group."""
+    return _group
+
+
+def single_flight(func: Callable) -> Callable:
+    """
+    Decorator: coalesce concurrent calls whose normalized arguments match.
+
+    Arguments are bound to func's signature (defaults applied) before
+    normalizing, so generate_lesson("Math", ..., duration=60) and
+    generate_lesson("math", ...) share one call.
+    """
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (name,) + tuple((param, normalize(value)) for param, value in bound.arguments.items())
+        result, _ = _group.do(key, func, *args, **kwargs)
+        return result
+
+    return wrapper
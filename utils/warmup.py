@@ -0,0 +1,175 @@
+"""
+Startup warm-up.
+Loads prompt templates, authenticates clients, prefetches the roster and
+primes the analytics caches on a background thread when the process starts,
+so the first teacher to open the dashboard gets a warm response.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class WarmupSkipped(Exception):
+    """Raised by a step that doesn't apply (e.g. Sheets not configured)."""
+
+
+class Warmup:
+    """
+    Runs named warm-up steps in order on a daemon thread.
+
+    A failing or skipped step doesn't stop the others; everything still
+    works cold, warm-up only moves the cost out of the first request.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        self.steps = steps
+        self._status = {name: {'name': name, 'status': PENDING, 'seconds': None, 'detail': None} for name, _ in steps}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.started_at = None
+
+    def _set(self, name: str, **values) -> None:
+        with self._lock:
+            self._status[name].update(values)
+
+    def run(self) -> None:
+        """Run every step in the calling thread."""
+        self.started_at = time.time()
+        for name, step in self.steps:
+            self._set(name, status=RUNNING)
+            started = time.time()
+            try:
+                detail, status = step(), DONE
+            except WarmupSkipped as e:
+                detail, status = str(e), SKIPPED
+            except Exception as e:
+                detail, status = str(e) or type(e).__name__, FAILED
+                logger.warning(f"Warm-up step '{name}' failed: {detail}")
+            self._set(name, status=status, seconds=round(time.time() - started, 2),
+                      detail=None if detail is None else str(detail))
+        logger.info(f"Warm-up finished in {time.time() - self.started_at:.1f}s")
+        self._done.set()
+
+    def start(self) -> 'Warmup':
+        """Run the steps on a background thread (idempotent)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm-up finishes. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness summary: ready once every step has finished, plus per-step details."""
+        with self._lock:
+            steps = [dict(step) for step in self._status.values()]
+        finished = sum(1 for step in steps if step['status'] in (DONE, SKIPPED, FAILED))
+        return {
+            'ready': self._done.is_set(),
+            'finished_steps': finished,
+            'total_steps': len(steps),
+            'failed': [step['name'] for step in steps if step['status'] == FAILED],
+            'steps': steps,
+        }
+
+
+def _sheets_configured() -> bool:
+    return bool(settings.GOOGLE_SHEET_ID)
+
+
+def warm_prompts():
+    """Read every prompt template into the prompt cache."""
+    from utils.helpers import load_prompt
+    names = ["lesson", "report", "parent"]
+    for name in names:
+        load_prompt(name)
+    return f"{len(names)} templates"
+
+
+def warm_sheets():
+    """Authenticate the Google Sheets client."""
+    if not _sheets_configured():
+        raise WarmupSkipped("Google Sheets not configured")
+    from integrations.google_sheets import get_sheets_client
+    get_sheets_client()
+
+
+def warm_roster():
+    """Download the roster and start its background refresher."""
+    if not _sheets_configured():
+        raise WarmupSkipped("Google Sheets not configured")
+    from integrations.roster_service import get_roster_service
+    service = get_roster_service()
+    snapshot = service.snapshot()
+    if service.last_error:
+        raise RuntimeError(service.last_error)
+    return f"{len(snapshot)} records"
+
+
+def warm_analytics():
+    """Build the per-snapshot views and default analytics the first pages render."""
+    if not _sheets_configured():
+        raise WarmupSkipped("Google Sheets not configured")
+    from core.logic import roster_views
+    from integrations.roster_service import get_roster_service
+    snapshot = get_roster_service().snapshot()
+    if not len(snapshot):
+        raise WarmupSkipped("Roster is empty")
+    return f"{roster_views.prime(snapshot)} views"
+
+
+def warm_model():
+    """Import the Gemini SDK and create the shared client (no API call is made)."""
+    if not settings.GOOGLE_API_KEY:
+        raise WarmupSkipped("GOOGLE_API_KEY not set")
+    from utils.helpers import get_genai_client
+    get_genai_client()
+
+
+STEPS = {
+    'prompts': warm_prompts,
+    'sheets': warm_sheets,
+    'roster': warm_roster,
+    'analytics': warm_analytics,
+    'model': warm_model,
+}
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def start_warmup() -> Optional[Warmup]:
+    """
+    Start the process-wide warm-up once (later calls return the same one).
+
+    Steps come from settings.WARMUP_STEPS, in order; unknown names are ignored.
+
+    Returns:
+        Warmup: The running or finished warm-up, or None if WARMUP_ENABLED is off
+    """
+    global _warmup
+    if not settings.WARMUP_ENABLED:
+        return None
+    with _warmup_lock:
+        if _warmup is None:
+            names = [name.strip() for name in settings.WARMUP_STEPS.split(",") if name.strip()]
+            unknown = [name for name in names if name not in STEPS]
+            if unknown:
+                logger.warning(f"Ignoring unknown warm-up steps: {', '.join(unknown)}")
+            _warmup = Warmup([(name, STEPS[name]) for name in names if name in STEPS]).start()
+        return _warmup